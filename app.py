@@ -1,12 +1,36 @@
+import config
+from server_mode import resolve_async_mode, is_cooperative, monkey_patch, run_blocking
+
+# Executado como servidor: escolher o modo e aplicar o monkey patch antes dos demais imports
+# (importado por outro script, como o benchmark, ou pelos processos do pool, fica em threads)
+ASYNC_MODE = resolve_async_mode(config.SERVER_MODE) if __name__ == '__main__' else 'threading'
+monkey_patch(ASYNC_MODE)
+
+import base64
+import binascii
+import io
+import json
 import logging
+import sqlite3
+import threading
+import uuid
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request, send_file
-from flask_socketio import SocketIO, emit
-from excel_processor import ExcelProcessor
-from file_monitor import FileMonitor
+from typing import Dict, Optional
+from flask import Blueprint, Flask, render_template, jsonify, request, send_file, Response
+from flask_socketio import SocketIO, join_room, leave_room
+from excel_processor import CompanyTable
+from file_monitor import MultiFileMonitor
 from database import Database
 from export_excel import ExcelExporter
-import config
+from expense_import import ExpenseImporter
+from snapshot import SnapshotStore
+from company_index import SORT_FIELDS, STATUSES
+from history import HistoryRecorder, parse_step, parse_time
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from refresh_worker import RefreshWorker
+from workbook_set import WorkbookSet
+from broadcaster import Broadcaster
+from rooms import RoomRouter, parse_rooms, ALL_ROOM
 
 # Configurar logging
 logging.basicConfig(
@@ -15,87 +39,345 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Criar aplicacao Flask
-app = Flask(__name__, template_folder=str(config.TEMPLATES_DIR), static_folder=str(config.STATIC_DIR))
+# Rotas HTTP (registradas no app por create_app)
+bp = Blueprint('dashboard', __name__)
+
+# Montados por create_app: os processos do pool (spawn) reexecutam este arquivo
+# ao iniciar e nao devem criar servidor, banco nem monitor
+app: Optional[Flask] = None
+socketio: Optional[SocketIO] = None
+db: Optional[Database] = None
+history: Optional[HistoryRecorder] = None
+monitor: Optional[MultiFileMonitor] = None
+
+
+# Destinatarios do envio em andamento nesta thread (greenlet, no modo cooperativo)
+_emit_context = threading.local()
+
+
+class SocketIOJSON:
+    """
+    JSON dos pacotes SocketIO: conta os bytes de cada evento em EMIT_BYTES
+
+    O pacote de um evento e codificado uma unica vez por envio (para todos os
+    clientes da sala), entao medir aqui nao serializa o payload de novo; o
+    tamanho e multiplicado pelos destinatarios contados em emit_event.
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        text = json.dumps(obj, *args, **kwargs)
+        # Evento: [nome, payload...]; handshake e demais pacotes nao entram
+        if isinstance(obj, list) and obj and isinstance(obj[0], str):
+            EMIT_BYTES.inc(len(text) * getattr(_emit_context, 'recipients', 1), event=obj[0])
+        return text
+
+    loads = staticmethod(json.loads)
+
+
+# Uma fonte por planilha de departamento; sem WATCH_SOURCES, só a pasta padrão
+WATCH_SOURCES = config.WATCH_SOURCES or [
+    {'name': 'principal', 'folder': config.WATCH_FOLDER, 'pattern': config.EXCEL_PATTERN}
+]
+# Servidor cooperativo: leitura e hash das planilhas vao para o pool, sem travar o laco de eventos
+workbooks = WorkbookSet(isolate=is_cooperative(ASYNC_MODE))
+# Servidor cooperativo: abas da exportacao consolidada sempre no pool, fora do laco de eventos
+exporter = ExcelExporter(max(config.EXPORT_WORKERS, 2) if is_cooperative(ASYNC_MODE) else config.EXPORT_WORKERS)
+
+# Dados atuais (versionados; cada publicação gera um delta para os clientes)
+snapshots = SnapshotStore()
+current_data = snapshots.data
+
+# Salas de inscricao dos clientes (empresa, status, resumo ou tudo)
+router = RoomRouter()
+
+# Identifica esta execução no ETag de /api/data (a versão recomeça se não houver snapshot gravado)
+BOOT_ID = uuid.uuid4().hex[:12]
+
+# Metricas expostas em /api/metrics
+STAGE_SECONDS = REGISTRY.histogram(
+    'dashboard_stage_seconds', 'Duracao de cada etapa da atualizacao', ['stage'])
+EMITS = REGISTRY.counter('dashboard_socketio_emits_total', 'Eventos SocketIO enviados', ['event'])
+EMIT_BYTES = REGISTRY.counter(
+    'dashboard_socketio_payload_bytes_total',
+    'Bytes de payload enviados via SocketIO (pacote codificado vezes destinatarios)', ['event'])
+CONNECTED_CLIENTS = REGISTRY.gauge('dashboard_connected_clients', 'Clientes SocketIO conectados')
+COMPANIES = REGISTRY.gauge('dashboard_companies', 'Empresas na versao atual dos dados')
+DATA_VERSION = REGISTRY.gauge('dashboard_data_version', 'Versao atual dos dados')
+SNAPSHOT_AGE = REGISTRY.gauge('dashboard_snapshot_age_seconds', 'Segundos desde a ultima publicacao')
+SNAPSHOT_AGE.set_function(
+    lambda: (datetime.now() - datetime.fromisoformat(current_data['last_update'])).total_seconds()
+    if current_data.get('last_update') else 0
+)
 
-# Inicializar SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Inicializar processador, monitor e banco de dados
-processor = ExcelProcessor()
-monitor = FileMonitor(config.WATCH_FOLDER, config.EXCEL_PATTERN, config.CHECK_INTERVAL)
-db = Database()
-exporter = ExcelExporter()
+def emit_event(event: str, payload: dict, room: str = None):
+    """
+    Envia evento para uma sala, um cliente (sid) ou todos, registrando tempo e quantidade
 
-# Dados atuais
-current_data = {
-    'companies': [],
-    'statistics': {},
-    'last_update': None,
-    'file_path': None
-}
+    Sala sem clientes nao recebe envio. Os bytes sao contados por SocketIOJSON
+    ao codificar o pacote, vezes os destinatarios no momento do envio.
+    """
+    recipients = sum(1 for _ in socketio.server.manager.get_participants('/', room))
+    if not recipients:
+        return
+    _emit_context.recipients = recipients
+    try:
+        with STAGE_SECONDS.time(stage='emit'):
+            socketio.emit(event, payload, to=room, namespace='/')
+    finally:
+        _emit_context.recipients = 1
+    EMITS.inc(event=event)
 
 
-def apply_adjustments_to_companies(companies):
-    """Aplica ajustes do banco de dados aos dados das empresas"""
-    for company in companies:
-        adjustment = db.get_company_adjustment(company['code'])
-        if adjustment:
-            # Aplicar ajustes se existirem
-            if adjustment.get('contract_value') is not None:
-                company['contract_value'] = adjustment['contract_value']
-            if adjustment.get('spent_value') is not None:
-                company['spent_value'] = adjustment['spent_value']
-            else:
-                # Se não há ajuste de spent_value, usar soma de lançamentos
-                total_expenses = db.get_expenses_by_company(company['code'])
-                if total_expenses > 0:
-                    company['spent_value'] = total_expenses
-        else:
-            # Se não há ajuste, usar soma de lançamentos
-            total_expenses = db.get_expenses_by_company(company['code'])
-            if total_expenses > 0:
-                company['spent_value'] = total_expenses
-        
-        # Recalcular percentual
-        if company['contract_value'] > 0:
-            company['percentage'] = round((company['spent_value'] / company['contract_value']) * 100, 2)
-        else:
-            company['percentage'] = 0
-        
-        # Recalcular status
-        if company['percentage'] > 90:
-            company['status'] = 'critical'
-        elif company['percentage'] > 70:
-            company['status'] = 'warning'
-        else:
-            company['status'] = 'ok'
-    
-    return companies
+# Envio em segundo plano: o recalculo nao espera os clientes receberem
+broadcaster = Broadcaster(lambda task: socketio.start_background_task(task), emit_event)
+BROADCAST_QUEUE = REGISTRY.gauge('dashboard_broadcast_queue', 'Eventos aguardando envio aos clientes')
+BROADCAST_QUEUE.set_function(broadcaster.pending)
 
 
+def broadcast(event: str, payload: dict, room: str = None):
+    """Enfileira evento para uma sala ou todos os clientes (enviado pela tarefa do broadcaster)"""
+    broadcaster.send(event, payload, room)
 
-@app.route('/')
+
+def require_app():
+    """Falha com mensagem clara se create_app ainda nao montou app, banco, SocketIO e monitor"""
+    if app is None:
+        raise RuntimeError("create_app() precisa ser chamado antes (banco, SocketIO e monitor sao montados nele)")
+
+
+def apply_adjustments_to_companies(table: CompanyTable) -> CompanyTable:
+    """Aplica ajustes do banco de dados aos dados das empresas"""
+    require_app()
+    # Buscar ajustes e totais de lançamentos de uma vez, em vez de consultar por empresa
+    adjustments = db.get_all_adjustments()
+    expense_totals = db.get_expense_totals_by_company()
+    index = table.index()
+
+    # Sem ajuste de spent_value, usar soma de lançamentos
+    for code, total_expenses in expense_totals.items():
+        position = index.get(code)
+        if position is not None and total_expenses > 0:
+            table.spent[position] = total_expenses
+
+    # Ajustes manuais têm prioridade sobre planilha e lançamentos
+    for adjustment in adjustments:
+        position = index.get(adjustment['company_code'])
+        if position is None:
+            continue
+        if adjustment.get('contract_value') is not None:
+            table.contract[position] = adjustment['contract_value']
+        if adjustment.get('spent_value') is not None:
+            table.spent[position] = adjustment['spent_value']
+
+    # Recalcular percentual e status de todas as empresas de uma vez
+    table.compute()
+    return table
+
+
+def refresh_current_data(files: Dict[str, str]):
+    """
+    Processa as planilhas alteradas (as demais vêm do cache), aplica os ajustes
+    do banco e publica uma nova versão dos dados
+
+    Args:
+        files: Nome da fonte -> caminho da planilha atual
+
+    Returns:
+        Delta em relação à versão anterior
+    """
+    require_app()
+    with STAGE_SECONDS.time(stage='process_file'):
+        table = workbooks.update(files)
+    with STAGE_SECONDS.time(stage='apply_adjustments'):
+        table = apply_adjustments_to_companies(table)
+    with STAGE_SECONDS.time(stage='statistics'):
+        statistics = table.statistics()
+
+    # Dicionários só na publicação (formato servido pela API e pelo socket)
+    companies = table.to_dicts()
+    delta = snapshots.publish(companies, statistics, '; '.join(files.values()))
+    COMPANIES.set(len(companies))
+    DATA_VERSION.set(delta['version'])
+
+    # Serializar /api/data e montar os índices de /api/companies agora, fora da requisição
+    with STAGE_SECONDS.time(stage='encode'):
+        snapshots.encoded(app.json.dumps)
+    with STAGE_SECONDS.time(stage='index'):
+        snapshots.index()
+
+    # Historico: so as empresas cujos valores mudaram
+    # (gravacoes no SQLite fora do laco de eventos no servidor cooperativo)
+    if config.HISTORY_ENABLED:
+        with STAGE_SECONDS.time(stage='history'):
+            run_blocking(ASYNC_MODE, history.record, delta)
+
+    # Gravar a versão publicada para o próximo início do servidor
+    if config.SNAPSHOT_PERSIST:
+        with STAGE_SECONDS.time(stage='save_snapshot'):
+            run_blocking(ASYNC_MODE, db.save_snapshot, snapshots.full(), workbooks.export_state())
+    return delta
+
+
+def warm_start() -> bool:
+    """
+    Carrega a última versão gravada para atender os clientes antes da primeira leitura
+
+    O estado das planilhas também é restaurado: quando o monitor encontrar o
+    arquivo, ele só é relido se a identidade (tamanho, mtime, hash) mudou.
+
+    Returns:
+        True se havia versão gravada
+    """
+    require_app()
+    snapshot = db.load_snapshot()
+    if not snapshot:
+        return False
+
+    workbooks.seed(snapshot['sources'])
+    snapshots.restore(snapshot)
+    router.seed(snapshot['companies'])
+    COMPANIES.set(len(snapshot['companies']))
+    DATA_VERSION.set(snapshot['version'])
+    logger.info(f"Dados restaurados da versao {snapshot['version']} "
+                f"({len(snapshot['companies'])} empresas, gravada em {snapshot['last_update']})")
+    return True
+
+
+
+@bp.route('/')
 def index():
     """Pagina principal"""
     return render_template('index.html')
 
 
-@app.route('/api/data')
+@bp.route('/api/data')
 def get_data():
-    """Retorna dados atuais em JSON"""
-    return jsonify(current_data)
+    """Retorna dados atuais em JSON (serializado uma vez por versão, com ETag e gzip)"""
+    encoded = snapshots.encoded(app.json.dumps)
+    etag = f'{BOOT_ID}-{encoded.version}'
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(encoded.gzip, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(encoded.body, mimetype='application/json')
+
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Sempre revalidar: o navegador reenvia o ETag e recebe 304 se nada mudou
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@bp.route('/api/companies')
+def get_companies():
+    """
+    Lista de empresas buscada, filtrada, ordenada e paginada no servidor
+
+    Parametros opcionais: q (inicio de palavra do nome ou trecho do codigo),
+    status (ok, warning, critical; separados por virgula), sort (name,
+    percentage, spent, contract), order (asc/desc), offset e limit.
+    """
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+    sort = request.args.get('sort', 'name')
+    order = request.args.get('order', 'asc')
+
+    try:
+        # type=int do Flask ignora valores invalidos em vez de falhar
+        offset = max(0, int(request.args['offset'])) if 'offset' in request.args else 0
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Parametros de paginacao invalidos'}), 400
+
+    if sort not in SORT_FIELDS or order not in ('asc', 'desc') or any(s not in STATUSES for s in statuses):
+        return jsonify({'error': 'Parametros de ordenacao ou filtro invalidos'}), 400
+
+    if limit is not None:
+        limit = max(1, min(limit, config.COMPANIES_MAX_PAGE_SIZE))
 
+    result = snapshots.index().query(request.args.get('q', ''), statuses, sort,
+                                     order == 'desc', offset, limit)
+    return jsonify(result)
 
-@app.route('/api/expenses', methods=['GET'])
+
+def encode_cursor(expense: dict) -> str:
+    """Gera cursor de paginacao a partir do ultimo lancamento da pagina"""
+    raw = f"{expense['expense_date']}|{expense['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Converte cursor de paginacao em (expense_date, id)"""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    expense_date, expense_id = raw.rsplit('|', 1)
+    return expense_date, int(expense_id)
+
+
+@bp.route('/api/history/<company_code>')
+def get_company_history(company_code):
+    """
+    Evolucao do gasto e do percentual de uma empresa
+
+    Parametros opcionais: from e to (data ou data/hora ISO; padrao: ultimos
+    30 dias) e step (segundos ou com sufixo m, h, d, w; ex.: 1h). Cada ponto
+    traz o ultimo valor conhecido ao fim do intervalo.
+    """
+    try:
+        end = parse_time(request.args['to']) if request.args.get('to') else int(datetime.now().timestamp())
+        start = parse_time(request.args['from']) if request.args.get('from') else end - 30 * 86400
+        step = parse_step(request.args['step']) if request.args.get('step') else None
+    except ValueError:
+        return jsonify({'error': 'Parametros from, to ou step invalidos'}), 400
+
+    if start > end:
+        return jsonify({'error': 'from deve ser anterior a to'}), 400
+
+    return jsonify(history.series(company_code, start, end, step))
+
+
+@bp.route('/api/expenses', methods=['GET'])
 def get_expenses():
-    """Obter lancamentos de gastos"""
+    """
+    Obter lancamentos de gastos
+
+    Parametros opcionais: company_code, date_from, date_to (AAAA-MM-DD),
+    limit e after. Com limit, a resposta e paginada:
+    {'expenses': [...], 'next': cursor da proxima pagina ou null}
+    """
     company_code = request.args.get('company_code')
-    expenses = db.get_expenses(company_code)
-    return jsonify(expenses)
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+
+    try:
+        # type=int do Flask ignora valores invalidos em vez de falhar
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return jsonify({'error': 'Parametros de paginacao invalidos'}), 400
+
+    if limit is None:
+        # Sem paginacao: lista completa, como antes
+        return jsonify(db.get_expenses(company_code, date_from=date_from, date_to=date_to))
+
+    limit = max(1, min(limit, config.EXPENSES_MAX_PAGE_SIZE))
+
+    # Buscar um item a mais para saber se existe proxima pagina
+    expenses = db.get_expenses(company_code, limit=limit + 1, after=after,
+                               date_from=date_from, date_to=date_to)
+    has_more = len(expenses) > limit
+    expenses = expenses[:limit]
 
+    return jsonify({
+        'expenses': expenses,
+        'next': encode_cursor(expenses[-1]) if has_more else None
+    })
 
-@app.route('/api/expenses', methods=['POST'])
+
+@bp.route('/api/expenses', methods=['POST'])
 def add_expense():
     """Adicionar novo lancamento"""
     data = request.json
@@ -114,6 +396,7 @@ def add_expense():
         notes=data.get('notes', ''),
         created_by=created_by
     )
+    version = None
     
     if success:
         # Obter valor total de lancamentos da empresa
@@ -126,35 +409,89 @@ def add_expense():
             spent_value=total_spent
         )
         
-        # Reprocessar dados para atualizar
-        current_file = monitor.get_current_file()
-        if current_file:
-            companies = processor.process_file(current_file)
-            companies = apply_adjustments_to_companies(companies)
-            statistics = processor.get_statistics(companies)
-            
-            current_data['companies'] = companies
-            current_data['statistics'] = statistics
-            current_data['last_update'] = datetime.now().isoformat()
-        
-        socketio.emit('update', current_data, namespace='/')
+        # Recalculo em segundo plano; a resposta informa a versao que tera a mudanca
+        version = request_refresh()
     
-    return jsonify({'success': success})
+    return jsonify({'success': success, 'version': version})
+
 
+@bp.route('/api/expenses/bulk', methods=['POST'])
+def import_expenses():
+    """
+    Importar lancamentos em lote
 
-@app.route('/api/expenses/<int:expense_id>', methods=['DELETE'])
+    Aceita JSON (lista de lancamentos ou {'expenses': [...]}) ou um arquivo
+    CSV/XLSX enviado no campo 'file'. Tudo e gravado em uma unica transacao;
+    se alguma linha for invalida nada e gravado e os erros sao devolvidos.
+    """
+    company_names = {c['code']: c['name'] for c in current_data.get('companies', [])}
+    importer = ExpenseImporter(company_names=company_names, created_by='sistema')
+
+    try:
+        upload = request.files.get('file')
+        if upload:
+            filename = (upload.filename or '').lower()
+            if filename.endswith('.csv'):
+                rows = importer.iter_csv(upload.stream)
+            elif filename.endswith(('.xlsx', '.xlsm')):
+                rows = importer.iter_xlsx(upload.stream)
+            else:
+                return jsonify({'success': False, 'error': 'Formato nao suportado (use CSV ou XLSX)'}), 400
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get('expenses')
+            if not isinstance(data, list):
+                return jsonify({'success': False, 'error': 'Envie uma lista de lancamentos'}), 400
+            rows = importer.iter_json(data)
+
+        count = db.add_expenses_bulk(importer.validate(rows))
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao gravar importacao: {e}")
+        return jsonify({'success': False, 'error': 'Erro ao gravar lancamentos'}), 500
+    except Exception as e:
+        # Arquivo ilegivel: codificacao, pacote XLSX corrompido, CSV malformado
+        logger.error(f"Erro ao ler arquivo de importacao: {e}")
+        return jsonify({'success': False, 'error': 'Arquivo invalido'}), 400
+
+    if count is None:
+        return jsonify({
+            'success': False,
+            'error': 'Nenhum lancamento importado',
+            'error_count': importer.error_count,
+            'errors': importer.errors
+        }), 400
+
+    if count:
+        # Mesmo efeito do lancamento individual: gasto da empresa = soma dos lancamentos
+        expense_totals = db.get_expense_totals_by_company()
+        for company_code, company_name in importer.companies:
+            db.set_company_adjustment(
+                company_code=company_code,
+                company_name=company_name,
+                spent_value=expense_totals.get(company_code, 0)
+            )
+
+    # Uma unica atualizacao ao final da importacao
+    version = request_refresh() if count else snapshots.version
+
+    return jsonify({'success': True, 'imported': count, 'version': version})
+
+
+@bp.route('/api/expenses/<int:expense_id>', methods=['DELETE'])
 def delete_expense(expense_id):
     """Deletar lancamento"""
     success = db.delete_expense(expense_id)
+    version = None
     
     if success:
-        # Recalcular valor gasto para todas as empresas
-        socketio.emit('update', current_data, namespace='/')
+        # Recalcular valor gasto para todas as empresas (em segundo plano)
+        version = request_refresh()
     
-    return jsonify({'success': success})
+    return jsonify({'success': success, 'version': version})
 
 
-@app.route('/api/download/expenses/<company_code>')
+@bp.route('/api/download/expenses/<company_code>')
 def download_expenses(company_code):
     """Baixar relatorio de movimentos da empresa"""
     try:
@@ -169,7 +506,7 @@ def download_expenses(company_code):
         
         expenses = db.get_expenses(company_code)
         
-        filepath = exporter.export_company_expenses(
+        output = exporter.export_company_expenses(
             company_name=company['name'],
             company_code=company_code,
             contract_value=company['contract_value'],
@@ -177,11 +514,12 @@ def download_expenses(company_code):
             expenses=expenses
         )
         
-        if not filepath:
+        if not output:
             return jsonify({'error': 'Erro ao gerar arquivo'}), 500
         
         return send_file(
-            filepath,
+            output,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
             download_name=f"Movimentos_{company_code}.xlsx"
         )
@@ -191,7 +529,50 @@ def download_expenses(company_code):
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/company/adjustment', methods=['GET'])
+def build_consolidated_export(data: dict):
+    """Gera o workbook consolidado de uma versao (guardado por snapshots.artifact)"""
+    expenses_by_company = {}
+    for expense in db.get_expenses():
+        expenses_by_company.setdefault(expense['company_code'], []).append(expense)
+
+    with STAGE_SECONDS.time(stage='export_all'):
+        output = exporter.export_all_companies(data['companies'], expenses_by_company, data['statistics'])
+    if not output:
+        return None
+    try:
+        return output.read()
+    finally:
+        output.close()
+
+
+@bp.route('/api/download/companies')
+def download_all_companies():
+    """
+    Baixar relatorio consolidado: aba de resumo e uma aba de movimentos por empresa
+
+    O arquivo e gerado uma vez por versao dos dados; downloads seguintes, ate a
+    proxima mudanca, reaproveitam o mesmo arquivo.
+    """
+    try:
+        version, body = snapshots.artifact('export_all', build_consolidated_export)
+
+        if body is None:
+            return jsonify({'error': 'Erro ao gerar arquivo'}), 500
+
+        return send_file(
+            io.BytesIO(body),
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=f"Movimentos_Consolidado_v{version}.xlsx",
+            etag=f'{BOOT_ID}-{version}'
+        )
+
+    except Exception as e:
+        logger.error(f"Erro ao baixar arquivo consolidado: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/company/adjustment', methods=['GET'])
 def get_adjustment():
     """Obter ajuste de valores da empresa"""
     company_code = request.args.get('company_code')
@@ -199,7 +580,7 @@ def get_adjustment():
     return jsonify(adjustment or {})
 
 
-@app.route('/api/company/adjustment', methods=['POST'])
+@bp.route('/api/company/adjustment', methods=['POST'])
 def set_adjustment():
     """Salvar ajuste de valores da empresa"""
     data = request.json
@@ -210,70 +591,159 @@ def set_adjustment():
         spent_value=float(data.get('spent_value')) if data.get('spent_value') else None,
         reason=data.get('reason', '')
     )
+    version = None
     
     if success:
-        # Reprocessar dados para atualizar
-        current_file = monitor.get_current_file()
-        if current_file:
-            companies = processor.process_file(current_file)
-            companies = apply_adjustments_to_companies(companies)
-            statistics = processor.get_statistics(companies)
-            
-            current_data['companies'] = companies
-            current_data['statistics'] = statistics
-            current_data['last_update'] = datetime.now().isoformat()
-        
-        socketio.emit('update', current_data, namespace='/')
+        # Recalculo em segundo plano; a resposta informa a versao que tera a mudanca
+        version = request_refresh()
     
-    return jsonify({'success': success})
+    return jsonify({'success': success, 'version': version})
+
+
+@bp.route('/api/metrics')
+def get_metrics():
+    """Metricas de desempenho no formato texto do Prometheus"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def subscribe_client(rooms: set):
+    """Coloca o cliente atual nas salas e envia os dados atuais delas"""
+    joined, left = router.subscribe(request.sid, rooms)
+    for room in left:
+        leave_room(room)
+    for room in joined:
+        join_room(room)
+    emit_event('update', router.snapshot_for(rooms, snapshots.full()), request.sid)
 
 
-@socketio.on('connect')
-def handle_connect():
-    """Quando cliente se conecta"""
+def handle_connect(auth=None):
+    """
+    Quando cliente se conecta
+
+    As salas podem vir no handshake ({'rooms': [...]}); sem elas, o
+    cliente recebe tudo (sala 'all').
+    """
     logger.info(f"Cliente conectado: {request.sid}")
+    CONNECTED_CLIENTS.inc()
+
+    rooms = {ALL_ROOM}
+    if isinstance(auth, dict) and auth.get('rooms') is not None:
+        try:
+            rooms = parse_rooms(auth['rooms'])
+        except ValueError as e:
+            logger.warning(f"Salas invalidas no handshake de {request.sid}: {e}")
+
     # Enviar dados atuais
-    emit('update', current_data)
+    subscribe_client(rooms)
+
+
+def handle_subscribe(data):
+    """Cliente trocou as salas: {'rooms': ['summary', 'company:123', 'status:critical', ...]}"""
+    try:
+        rooms = parse_rooms((data or {}).get('rooms') if isinstance(data, dict) else None)
+    except ValueError as e:
+        emit_event('error', {'message': f'Inscricao invalida: {e}'}, request.sid)
+        return
+    subscribe_client(rooms)
+
+
+def handle_resync():
+    """Cliente detectou versão faltando: reenviar dados completos das suas salas"""
+    logger.debug(f"Ressincronização solicitada: {request.sid}")
+    emit_event('update', router.snapshot_for(router.rooms_of(request.sid), snapshots.full()), request.sid)
 
 
-@socketio.on('disconnect')
 def handle_disconnect():
     """Quando cliente se desconecta"""
     logger.info(f"Cliente desconectado: {request.sid}")
+    router.unsubscribe(request.sid)
+    CONNECTED_CLIENTS.dec()
 
 
-def on_file_changed(file_path: str):
-    """Callback quando arquivo e detectado/modificado"""
-    try:
-        logger.info(f"Processando arquivo: {file_path}")
+@STAGE_SECONDS.timed(stage='recompute')
+def recompute_current_data():
+    """Recalcula os dados das planilhas atuais e envia o delta (executado pelo refresh_worker)"""
+    files = monitor.get_current_files()
+    if not files:
+        return
 
-        # Processar arquivo
-        companies = processor.process_file(file_path)
-        
-        # Aplicar ajustes do banco de dados
-        companies = apply_adjustments_to_companies(companies)
-        
-        statistics = processor.get_statistics(companies)
+    try:
+        logger.info(f"Processando arquivos: {', '.join(files.values())}")
 
-        # Atualizar dados
-        current_data['companies'] = companies
-        current_data['statistics'] = statistics
-        current_data['file_path'] = file_path
-        current_data['last_update'] = datetime.now().isoformat()
+        # Processar planilhas e aplicar ajustes do banco de dados
+        delta = refresh_current_data(files)
 
-        # Emitir atualizacao para todos os clientes conectados
-        socketio.emit('update', current_data, namespace='/')
-        logger.info(f"Dados atualizados: {len(companies)} empresas")
+        # Emitir somente as diferencas, e so para as salas afetadas
+        for event, payload, room in router.route(delta):
+            broadcast(event, payload, room)
+        logger.info(f"Dados atualizados: {len(current_data['companies'])} empresas (versao {delta['version']})")
 
     except Exception as e:
         logger.error(f"Erro ao processar arquivo: {e}")
         import traceback
         traceback.print_exc()
-        socketio.emit('error', {'message': str(e)}, namespace='/')
+        broadcast('error', {'message': str(e)})
+
+
+# Recalculo unico em segundo plano: pedidos proximos viram uma so execucao
+refresh_worker = RefreshWorker(
+    recompute_current_data,
+    lambda: snapshots.version,
+    debounce=config.REFRESH_DEBOUNCE,
+    max_delay=config.REFRESH_MAX_DELAY
+)
+
+
+def request_refresh():
+    """
+    Pede o recalculo apos uma mudanca no banco (lancamento, ajuste, importacao)
+
+    Returns:
+        Versao que vai refletir a mudanca, ou None se nao ha planilha: sem ela o
+        recalculo nao publica nada e o cliente nao deve esperar uma versao nova
+    """
+    if not monitor.get_current_files():
+        return None
+    return refresh_worker.request()
+
+
+@STAGE_SECONDS.timed(stage='on_file_changed')
+def on_file_changed(file_path: str):
+    """Callback quando arquivo e detectado/modificado"""
+    logger.info(f"Arquivo alterado: {file_path}")
+    refresh_worker.request()
+
+
+def create_app() -> Flask:
+    """
+    Monta o servidor: app Flask com as rotas, SocketIO, banco, historico e monitor
+
+    Fica fora do nivel do modulo porque os processos do pool (spawn) reexecutam
+    este arquivo ao iniciar e so precisam das funcoes de leitura. Chamadas
+    seguintes devolvem o mesmo app.
+    """
+    global app, socketio, db, history, monitor
+    if app is not None:
+        return app
+
+    app = Flask(__name__, template_folder=str(config.TEMPLATES_DIR), static_folder=str(config.STATIC_DIR))
+    app.register_blueprint(bp)
+
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE, json=SocketIOJSON)
+    for event, handler in (('connect', handle_connect), ('subscribe', handle_subscribe),
+                           ('resync', handle_resync), ('disconnect', handle_disconnect)):
+        socketio.on_event(event, handler)
+
+    db = Database()
+    history = HistoryRecorder(db)
+    monitor = MultiFileMonitor(WATCH_SOURCES, config.CHECK_INTERVAL,
+                               config.MONITOR_BACKEND, config.MONITOR_RESCAN_INTERVAL)
+    return app
 
 
 def start_monitor():
     """Inicia o monitor de arquivo"""
+    require_app()
     if monitor.start(on_file_changed):
         logger.info("Monitor de arquivo iniciado")
     else:
@@ -281,17 +751,33 @@ def start_monitor():
 
 
 if __name__ == '__main__':
+    create_app()
     try:
+        # Servir a ultima versao gravada enquanto o monitor revalida os arquivos
+        if config.SNAPSHOT_PERSIST:
+            warm_start()
+
         # Iniciar monitor
         start_monitor()
 
         # Executar servidor
-        logger.info(f"Iniciando servidor em http://{config.HOST}:{config.PORT}")
-        socketio.run(app, host=config.HOST, port=config.PORT, debug=False, allow_unsafe_werkzeug=True)
+        logger.info(f"Iniciando servidor em http://{config.HOST}:{config.PORT} (modo {ASYNC_MODE})")
+        if is_cooperative(ASYNC_MODE):
+            # Servidor WSGI do gevent/eventlet (com WebSocket), proprio para producao
+            socketio.run(app, host=config.HOST, port=config.PORT, debug=False)
+        else:
+            logger.warning("Servidor de desenvolvimento do Werkzeug (modo threading): "
+                           "instale o gevent (requirements.txt) para producao")
+            socketio.run(app, host=config.HOST, port=config.PORT, debug=False, allow_unsafe_werkzeug=True)
 
     except KeyboardInterrupt:
         logger.info("Encerrando...")
         monitor.stop()
+        refresh_worker.stop()
+        broadcaster.stop()
+        workbooks.close()
+        exporter.close()
+        db.close()
     except Exception as e:
         logger.error(f"Erro fatal: {e}")
         import traceback
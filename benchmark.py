@@ -0,0 +1,287 @@
+"""
+Benchmark do fluxo leitura do Excel -> ajustes -> publicação
+
+Gera um workbook sintético (.xlsm) com N empresas em VALIDAÇÕES e M linhas em
+LIQUIDAÇÃO 2025, popula um banco temporário com K lançamentos e ajustes e mede
+o tempo e o pico de memória de cada etapa. O resultado é salvo em JSON; com
+--baseline, a execução falha se alguma etapa ficar mais lenta que o limite.
+Com --check, confere que o leitor rápido de XML e o openpyxl produzem
+exatamente as mesmas empresas.
+
+Uso:
+    python benchmark.py --companies 500 --rows 50000 --expenses 20000 --output resultado.json
+    python benchmark.py --baseline resultado.json --threshold 1.25
+    python benchmark.py --check
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+
+from openpyxl import Workbook
+
+
+def generate_workbook(path: str, companies: int, rows: int, seed: int = 42) -> List[str]:
+    """
+    Gera workbook sintético no formato da planilha de controle
+
+    Args:
+        path: Arquivo de saída (.xlsm)
+        companies: Quantidade de empresas em VALIDAÇÕES
+        rows: Quantidade de linhas em LIQUIDAÇÃO 2025
+        seed: Semente do gerador aleatório
+
+    Returns:
+        Códigos das empresas geradas
+    """
+    rng = random.Random(seed)
+    codes = [str(10000 + i) for i in range(companies)]
+
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet('VALIDAÇÕES')
+    ws.append(['CÓDIGO', 'EMPRESA', 'CNPJ', 'OBJETO', 'INÍCIO', 'FIM', 'VALOR CONTRATO'])
+    for i, code in enumerate(codes):
+        ws.append([int(code), f'EMPRESA SINTÉTICA {i:05d} LTDA', f'{i:014d}', 'Serviços',
+                   None, None, round(rng.uniform(50_000, 5_000_000), 2)])
+
+    ws = wb.create_sheet('LIQUIDAÇÃO 2025')
+    ws.append(['DATA', 'CÓDIGO', 'EMPRESA', 'NF', 'EMPENHO', 'HISTÓRICO', 'VALOR LIQUIDADO'])
+    start = date(2025, 1, 1)
+    for i in range(rows):
+        code = rng.choice(codes)
+        ws.append([start + timedelta(days=i % 365), code, None, 100000 + i, None,
+                   'Liquidação', round(rng.uniform(100, 50_000), 2)])
+
+    wb.save(path)
+    return codes
+
+
+def seed_database(db, codes: List[str], expenses: int, adjustments: int, seed: int = 42) -> None:
+    """Popula o banco com K lançamentos e ajustes para empresas aleatórias"""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+
+    db.add_expenses_bulk(
+        (code, f'EMPRESA {code}', 'Lançamento sintético', round(rng.uniform(10, 10_000), 2),
+         (start + timedelta(days=rng.randrange(365))).isoformat(), 'Serviços', '', 'benchmark')
+        for code in (rng.choice(codes) for _ in range(expenses))
+    )
+
+    for code in rng.sample(codes, min(adjustments, len(codes))):
+        db.set_company_adjustment(code, f'EMPRESA {code}',
+                                  contract_value=round(rng.uniform(50_000, 5_000_000), 2),
+                                  reason='benchmark')
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Executa a função ``repeat`` vezes e retorna mediana/mínimo do tempo e pico de memória
+
+    O pico de memória é medido em uma execução extra, com tracemalloc ligado,
+    para que o custo do rastreamento não entre nos tempos.
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': round(statistics.median(times), 6),
+        'min_seconds': round(min(times), 6),
+        'peak_memory_mb': round(peak / 1024 / 1024, 3)
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    """Monta o cenário sintético e mede cada etapa"""
+    workdir = Path(tempfile.mkdtemp(prefix='dashboard_bench_'))
+    try:
+        workbook_path = str(workdir / 'CONTROLE_SINTETICO.xlsm')
+        codes = generate_workbook(workbook_path, args.companies, args.rows, args.seed)
+
+        # create_app cria o banco: apontar para o banco temporário
+        os.environ['DASHBOARD_DB'] = str(workdir / 'benchmark.db')
+        import app as dashboard
+        from excel_processor import ExcelProcessor, LIQUIDACAO_SHEET, read_sheet
+        dashboard.create_app()
+
+        seed_database(dashboard.db, codes, args.expenses, args.adjustments, args.seed)
+
+        results: Dict[str, Any] = {}
+        parsed = ExcelProcessor(use_cache=False).process_table(workbook_path)
+
+        results['process_file'] = measure(
+            lambda: ExcelProcessor(use_cache=False, incremental=False).process_file(workbook_path),
+            args.repeat)
+
+        results['process_file_openpyxl'] = measure(
+            lambda: ExcelProcessor(use_cache=False, incremental=False, fast_reader=False).process_file(workbook_path),
+            args.repeat)
+
+        # Abas lidas ao mesmo tempo em dois processos (pool já iniciado antes da medição)
+        parallel = ExcelProcessor(use_cache=False, incremental=False, parallel_sheets=True)
+        parallel.process_table(workbook_path)
+        results['process_file_parallel_sheets'] = measure(
+            lambda: parallel.process_table(workbook_path), args.repeat)
+        parallel.close()
+
+        # Soma da LIQUIDAÇÃO sem o parse: completa x incremental com 1% de linhas acrescentadas
+        rows = read_sheet(workbook_path, LIQUIDACAO_SHEET)[1]
+        grown = rows + rows[:max(1, len(rows) // 100)]
+        full = ExcelProcessor(use_cache=False, incremental=False)
+        results['liquidacao_sum_full'] = measure(
+            lambda: full._apply_liquidacao(grown, workbook_path), args.repeat)
+
+        incremental = ExcelProcessor(use_cache=False, incremental=True)
+        incremental._apply_liquidacao(rows, workbook_path)
+        state = incremental._liquidacao_state
+
+        def append():
+            incremental._liquidacao_state = state
+            incremental._apply_liquidacao(grown, workbook_path)
+
+        results['liquidacao_sum_append'] = measure(append, args.repeat)
+
+        results['apply_adjustments_to_companies'] = measure(
+            lambda: dashboard.apply_adjustments_to_companies(parsed.copy()),
+            args.repeat)
+
+        table = dashboard.apply_adjustments_to_companies(parsed.copy())
+        results['get_statistics'] = measure(table.statistics, args.repeat)
+        results['to_dicts'] = measure(table.to_dicts, args.repeat)
+        companies = table.to_dicts()
+
+        # Exportação da empresa com mais lançamentos
+        totals = dashboard.db.get_expense_counts_by_company()
+        busiest = max(totals, key=totals.get) if totals else codes[0]
+        company = next(c for c in companies if c['code'] == busiest)
+        expenses = dashboard.db.get_expenses(busiest)
+
+        def export():
+            output = dashboard.exporter.export_company_expenses(
+                company['name'], busiest, company['contract_value'], company['spent_value'], expenses)
+            output.close()
+
+        results['export_company_expenses'] = measure(export, args.repeat)
+
+        dashboard.snapshots.publish(companies, table.statistics(), workbook_path)
+        client = dashboard.app.test_client()
+        results['api_data'] = measure(lambda: client.get('/api/data').get_data(), args.repeat)
+
+        dashboard.db.close()
+
+        mismatches = check_fast_reader(workbook_path) if args.check else None
+
+        return {
+            'parameters': {
+                'companies': args.companies,
+                'rows': args.rows,
+                'expenses': args.expenses,
+                'adjustments': args.adjustments,
+                'repeat': args.repeat,
+                'seed': args.seed
+            },
+            'environment': {
+                'python': sys.version.split()[0],
+                'platform': sys.platform
+            },
+            'results': results,
+            'fast_reader_mismatches': mismatches
+        }
+    finally:
+        if args.keep:
+            print(f"Arquivos mantidos em: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def check_fast_reader(workbook_path: str) -> int:
+    """Compara as empresas lidas pelo leitor rápido e pelo openpyxl; retorna quantas diferem"""
+    from excel_processor import ExcelProcessor
+
+    fast = ExcelProcessor(use_cache=False, incremental=False, fast_reader=True).process_file(workbook_path)
+    slow = ExcelProcessor(use_cache=False, incremental=False, fast_reader=False).process_file(workbook_path)
+    if len(fast) != len(slow):
+        return abs(len(fast) - len(slow))
+    return sum(1 for a, b in zip(fast, slow) if a != b)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lista as etapas mais lentas que baseline * threshold"""
+    regressions = []
+    for stage, result in current['results'].items():
+        reference = baseline.get('results', {}).get(stage)
+        if not reference:
+            continue
+        if result['seconds'] > reference['seconds'] * threshold:
+            regressions.append(
+                f"{stage}: {result['seconds']:.4f}s (referência {reference['seconds']:.4f}s, "
+                f"limite {threshold:.2f}x)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=500, help='Empresas em VALIDAÇÕES (N)')
+    parser.add_argument('--rows', type=int, default=20000, help='Linhas em LIQUIDAÇÃO 2025 (M)')
+    parser.add_argument('--expenses', type=int, default=10000, help='Lançamentos no banco (K)')
+    parser.add_argument('--adjustments', type=int, default=50, help='Empresas com ajuste manual')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições por etapa')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Arquivo JSON de saída')
+    parser.add_argument('--baseline', help='JSON de execução anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Falha se uma etapa ficar mais lenta que baseline * threshold')
+    parser.add_argument('--keep', action='store_true', help='Manter workbook e banco gerados')
+    parser.add_argument('--check', action='store_true',
+                        help='Falha se o leitor rápido e o openpyxl lerem empresas diferentes')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    result = run(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+
+    if args.check and result['fast_reader_mismatches']:
+        print(f"\nLeitor rápido difere do openpyxl em {result['fast_reader_mismatches']} empresa(s)",
+              file=sys.stderr)
+        return 1
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print("\nRegressões de desempenho:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
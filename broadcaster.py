@@ -0,0 +1,62 @@
+"""
+Envio de eventos a todos os clientes em segundo plano
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """
+    Fila de eventos enviada por uma tarefa em segundo plano
+
+    Quem publica (ex.: o recálculo) só enfileira e segue; os eventos saem na
+    ordem em que foram enfileirados. Cada cliente já tem sua própria fila de
+    envio no Engine.IO, então um cliente lento não segura os demais.
+    """
+
+    def __init__(self, start_task: Callable[..., Any], emit: Callable[[str, Any, Optional[str]], None]):
+        """
+        Args:
+            start_task: Inicia a tarefa de envio (``socketio.start_background_task``:
+                thread ou greenlet, conforme o modo do servidor)
+            emit: Envia um evento (evento, payload, sala ou None = todos)
+        """
+        self.start_task = start_task
+        self.emit = emit
+        self._queue: queue.Queue = queue.Queue()
+        self._task: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def send(self, event: str, payload: Any, room: Optional[str] = None) -> None:
+        """Enfileira o evento (para uma sala ou todos os clientes) sem esperar o envio"""
+        with self._lock:
+            if self._task is None:
+                self._task = self.start_task(self._loop)
+        self._queue.put((event, payload, room))
+
+    def pending(self) -> int:
+        """Eventos ainda não enviados"""
+        return self._queue.qsize()
+
+    def stop(self) -> None:
+        """Encerra a tarefa após enviar os eventos já enfileirados"""
+        with self._lock:
+            if self._task is not None:
+                self._queue.put(None)
+                self._task = None
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            event, payload, room = item
+            try:
+                self.emit(event, payload, room)
+            except Exception as e:
+                logger.error(f"Erro ao enviar evento '{event}': {e}")
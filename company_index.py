@@ -0,0 +1,163 @@
+"""
+Índices da lista de empresas (busca, filtro por status, ordenação), montados uma vez por versão
+"""
+
+import unicodedata
+from bisect import bisect_left
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+
+# Campos aceitos em ``sort`` (apelidos -> campo da empresa)
+SORT_FIELDS = {
+    'name': 'name',
+    'percentage': 'percentage',
+    'spent': 'spent_value',
+    'spent_value': 'spent_value',
+    'contract': 'contract_value',
+    'contract_value': 'contract_value',
+}
+
+STATUSES = ('ok', 'warning', 'critical')
+
+
+def normalize(text: Any) -> str:
+    """Minúsculas e sem acento, para comparação na busca"""
+    decomposed = unicodedata.normalize('NFKD', str(text or '').lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _tokens(text: Any) -> List[str]:
+    """Palavras normalizadas do texto (separadas por qualquer caractere não alfanumérico)"""
+    return ''.join(ch if ch.isalnum() else ' ' for ch in normalize(text)).split()
+
+
+class CompanyIndex:
+    """
+    Índices de uma versão da lista de empresas
+
+    - ordens pré-calculadas (crescente e decrescente) para cada campo de ``SORT_FIELDS``;
+    - posições por status;
+    - índice de prefixos: palavras do nome, ordenadas, consultadas por bisect;
+    - códigos normalizados, para a busca por qualquer trecho do código.
+    """
+
+    def __init__(self, companies: List[Dict[str, Any]], version: int = 0):
+        """
+        Args:
+            companies: Empresas publicadas (já ordenadas por nome)
+            version: Versão dos dados indexados
+        """
+        self.version = version
+        self.companies = companies
+        positions = range(len(companies))
+
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+        for field in set(SORT_FIELDS.values()):
+            if field == 'name':
+                ascending = list(positions)
+                descending = ascending[::-1]
+            else:
+                values = [company.get(field) or 0 for company in companies]
+                ascending = sorted(positions, key=lambda i: (values[i], i))
+                descending = sorted(positions, key=lambda i: (-values[i], i))
+            self._orders[(field, False)] = ascending
+            self._orders[(field, True)] = descending
+
+        self._by_status: Dict[str, Set[int]] = {status: set() for status in STATUSES}
+        for position, company in enumerate(companies):
+            self._by_status.setdefault(company.get('status') or 'ok', set()).add(position)
+
+        # (palavra, posição) ordenados
+        entries = []
+        for position, company in enumerate(companies):
+            for token in set(_tokens(company.get('name'))):
+                entries.append((token, position))
+        entries.sort()
+        self._prefix_keys = [token for token, _ in entries]
+        self._prefix_positions = [position for _, position in entries]
+
+        # Códigos são curtos: a busca percorre todos, aceitando qualquer trecho (como antes do índice)
+        self._codes = [normalize(company.get('code')) for company in companies]
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        """Posições das empresas com alguma palavra do nome começando por ``prefix``"""
+        matches = set()
+        index = bisect_left(self._prefix_keys, prefix)
+        while index < len(self._prefix_keys) and self._prefix_keys[index].startswith(prefix):
+            matches.add(self._prefix_positions[index])
+            index += 1
+        return matches
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """
+        Posições que casam com todas as palavras da busca (None = sem busca)
+
+        Cada palavra da busca precisa ser início de uma palavra do nome ou
+        qualquer trecho do código.
+        """
+        terms = _tokens(query)
+        if not terms:
+            return None
+
+        result: Optional[Set[int]] = None
+        for term in terms:
+            matches = self._prefix_matches(term)
+            matches.update(position for position, code in enumerate(self._codes) if term in code)
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
+
+    def status_counts(self, positions: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """Quantidade de empresas por status (entre ``positions``, se informado)"""
+        if positions is None:
+            return {status: len(members) for status, members in self._by_status.items()}
+        positions = set(positions)
+        return {status: len(members & positions) for status, members in self._by_status.items()}
+
+    def query(self, q: str = '', statuses: Iterable[str] = (), sort: str = 'name',
+              descending: bool = False, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Busca, filtra, ordena e pagina
+
+        Args:
+            q: Texto da busca (nome ou código)
+            statuses: Status aceitos (vazio = todos)
+            sort: Campo de ``SORT_FIELDS``
+            descending: Ordem decrescente
+            offset: Posição inicial da página
+            limit: Tamanho da página (None = até o fim)
+
+        Returns:
+            {'version', 'total', 'offset', 'limit', 'counts', 'companies'}
+        """
+        field = SORT_FIELDS[sort]
+        matches = self.search(q)
+
+        allowed = None
+        if statuses:
+            allowed = set()
+            for status in statuses:
+                allowed |= self._by_status.get(status, set())
+
+        selected = matches
+        if allowed is not None:
+            selected = allowed if selected is None else selected & allowed
+
+        order = self._orders[(field, descending)]
+        if selected is None:
+            total = len(order)
+            page = order[offset:offset + limit if limit is not None else None]
+        else:
+            filtered = [position for position in order if position in selected]
+            total = len(filtered)
+            page = filtered[offset:offset + limit if limit is not None else None]
+
+        return {
+            'version': self.version,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            # Contagem por status considera só a busca, para os filtros mostrarem quantas há em cada um
+            'counts': self.status_counts(matches),
+            'companies': [self.companies[position] for position in page]
+        }
@@ -7,6 +7,18 @@ WATCH_FOLDER = r"C:\Users\danielcoelho\Desktop\Nova pasta"
 # Padrão do arquivo Excel a procurar
 EXCEL_PATTERN = "*.xlsm"
 
+# Várias planilhas (uma por departamento): lista de {"name", "folder", "pattern"}.
+# Ex.: [{"name": "Obras", "folder": r"D:\Obras", "pattern": "*.xlsm"}, ...]
+# Vazia = usar somente WATCH_FOLDER/EXCEL_PATTERN
+WATCH_SOURCES = []
+
+# Processos usados para ler ao mesmo tempo várias planilhas alteradas (0 ou 1 = sem pool)
+EXCEL_WORKERS = min(4, os.cpu_count() or 1)
+
+# Modo do servidor: "auto" (gevent ou eventlet, o primeiro instalado; senão threads),
+# "gevent", "eventlet" ou "threading" (servidor de desenvolvimento do Werkzeug)
+SERVER_MODE = "auto"
+
 # Porta do servidor
 PORT = 5000
 
@@ -16,6 +28,12 @@ HOST = "127.0.0.1"
 # Intervalo de verificação de arquivo (em segundos)
 CHECK_INTERVAL = 2
 
+# Detecção de mudanças: "auto" (inotify no Linux, polling nos demais), "inotify" ou "polling"
+MONITOR_BACKEND = "auto"
+
+# Com inotify, intervalo (em segundos) da verificação completa de segurança
+MONITOR_RESCAN_INTERVAL = 60
+
 # Diretório base do projeto
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -24,3 +42,66 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 
 # Diretório de arquivos estáticos
 STATIC_DIR = BASE_DIR / "static"
+
+# Leitura do Excel em modo streaming (read_only): só as abas e colunas usadas
+EXCEL_STREAMING = True
+
+# Reaproveitar o resultado do Excel enquanto o arquivo não mudar
+EXCEL_CACHE = True
+
+# Na aba LIQUIDAÇÃO, somar só as linhas novas quando o arquivo apenas ganhou linhas no final
+EXCEL_INCREMENTAL = True
+
+# Processos que montam as abas da exportação consolidada de todas as empresas (0 ou 1 = sem pool)
+EXPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Em modo streaming, ler o XML das abas direto do arquivo (cai para o openpyxl se o arquivo for incomum)
+EXCEL_FAST_READER = True
+
+# Ler VALIDAÇÕES e LIQUIDAÇÃO ao mesmo tempo, cada aba em um processo (útil em servidor com vários núcleos)
+EXCEL_PARALLEL_SHEETS = False
+
+# Gravar cada versão publicada no banco e servi-la ao reiniciar, antes da primeira leitura do Excel
+SNAPSHOT_PERSIST = True
+
+# Recálculo em segundo plano: espera (s) por novos pedidos antes de recalcular
+REFRESH_DEBOUNCE = 0.3
+
+# Espera máxima (s) de um pedido de recálculo durante uma rajada contínua
+REFRESH_MAX_DELAY = 2.0
+
+# Tamanho máximo de página na listagem de lançamentos (/api/expenses?limit=)
+EXPENSES_MAX_PAGE_SIZE = 500
+
+# Tamanho máximo de página na listagem de empresas (/api/companies?limit=)
+COMPANIES_MAX_PAGE_SIZE = 200
+
+# Máximo de salas (empresas, status, resumo) por cliente SocketIO
+SUBSCRIPTION_MAX_ROOMS = 100
+
+# Gravar o histórico de gasto/percentual das empresas a cada versão publicada
+HISTORY_ENABLED = True
+
+# Máximo de pontos por série em /api/history (o intervalo é aumentado para caber)
+HISTORY_MAX_POINTS = 500
+
+# Arquivo do banco de dados SQLite (pode ser trocado pela variável DASHBOARD_DB)
+DB_PATH = os.environ.get('DASHBOARD_DB', 'dashboard.db')
+
+# Banco de dados: conexões reaproveitadas no pool
+DB_POOL_SIZE = 8
+
+# Tempo máximo (em segundos) esperando lock do SQLite ou conexão livre
+DB_BUSY_TIMEOUT = 5.0
+
+# Quantidade de comandos SQL compilados mantidos por conexão
+DB_STATEMENT_CACHE = 256
+
+# PRAGMAs aplicados a cada conexão (WAL permite leituras durante escritas)
+DB_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,       # ~16 MB
+    'mmap_size': 268435456,     # 256 MB
+    'temp_store': 'MEMORY',
+}
@@ -4,78 +4,330 @@ Gerenciador de banco de dados SQLite para o dashboard
 
 import sqlite3
 import os
+import json
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterable
 import logging
+import config
+from expense_import import ImportValidationError
+from metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
-DB_PATH = 'dashboard.db'
+DB_METHOD_SECONDS = REGISTRY.histogram(
+    'dashboard_db_method_seconds', 'Duração dos métodos do banco de dados', ['method'])
+
+
+def _timed(func):
+    """Registra a duração de cada chamada do método no histograma do banco"""
+    return DB_METHOD_SECONDS.timed(method=func.__name__)(func)
+
+DB_PATH = config.DB_PATH
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite reaproveitadas entre as threads da aplicação"""
+
+    def __init__(self, db_path: str, max_size: int = config.DB_POOL_SIZE,
+                 timeout: float = config.DB_BUSY_TIMEOUT, pragmas: Dict[str, Any] = None):
+        """
+        Args:
+            db_path: Caminho do arquivo do banco
+            max_size: Número máximo de conexões abertas
+            timeout: Tempo máximo (s) esperando um lock ou uma conexão livre
+            pragmas: PRAGMAs aplicados a cada nova conexão
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = config.DB_PRAGMAS if pragmas is None else pragmas
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._on_connect: List[Callable[[sqlite3.Connection], None]] = []
+        self._on_close: List[Callable[[sqlite3.Connection], None]] = []
+
+    def on_connect(self, callback: Callable[[sqlite3.Connection], None]) -> None:
+        """Registra função chamada para cada conexão nova (após os PRAGMAs)"""
+        self._on_connect.append(callback)
+
+    def on_close(self, callback: Callable[[sqlite3.Connection], None]) -> None:
+        """Registra função chamada antes de uma conexão ser fechada"""
+        self._on_close.append(callback)
+
+    def _create(self) -> sqlite3.Connection:
+        """Abre e configura uma nova conexão"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=config.DB_STATEMENT_CACHE
+        )
+        conn.row_factory = sqlite3.Row
+
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+
+        for callback in self._on_connect:
+            callback(conn)
+
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Fecha uma conexão e libera sua vaga no pool"""
+        try:
+            for callback in self._on_close:
+                callback(conn)
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Erro ao fechar conexão: {e}")
+        finally:
+            with self._lock:
+                self._size -= 1
+
+    def acquire(self) -> sqlite3.Connection:
+        """Obtém uma conexão livre, criando uma nova se o pool ainda não estiver cheio"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._size < self.max_size
+            if can_create:
+                self._size += 1
+
+        if can_create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Nenhuma conexão livre no pool")
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Devolve a conexão ao pool"""
+        self._idle.put(conn)
+
+    @staticmethod
+    def _healthy(conn: sqlite3.Connection) -> bool:
+        """Desfaz a transação pendente e confere se a conexão ainda responde"""
+        try:
+            conn.rollback()
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão: commit ao final, rollback em caso de erro"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            # Erros comuns (duplicidade, restrição, banco ocupado) não invalidam a
+            # conexão: só é descartada se o rollback ou o SELECT 1 falharem
+            if not self._healthy(conn):
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.release(conn)
+
+    def close_all(self) -> None:
+        """Fecha todas as conexões livres do pool"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+# Triggers que mantêm company_expense_totals e expense_summary em dia com expenses.
+# Quando a contagem chega a zero o total é zerado, evitando resíduos de ponto flutuante.
+EXPENSE_TOTALS_TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS expenses_totals_insert AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO company_expense_totals (company_code, total, expense_count)
+        VALUES (NEW.company_code, NEW.amount, 1)
+        ON CONFLICT(company_code) DO UPDATE SET
+            total = total + excluded.total,
+            expense_count = expense_count + 1;
+        UPDATE expense_summary SET
+            total = total + NEW.amount,
+            expense_count = expense_count + 1
+        WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS expenses_totals_delete AFTER DELETE ON expenses
+    BEGIN
+        UPDATE company_expense_totals SET
+            total = CASE WHEN expense_count <= 1 THEN 0 ELSE total - OLD.amount END,
+            expense_count = expense_count - 1
+        WHERE company_code = OLD.company_code;
+        UPDATE expense_summary SET
+            total = CASE WHEN expense_count <= 1 THEN 0 ELSE total - OLD.amount END,
+            expense_count = expense_count - 1
+        WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS expenses_totals_update AFTER UPDATE OF amount, company_code ON expenses
+    BEGIN
+        UPDATE company_expense_totals SET
+            total = CASE WHEN expense_count <= 1 THEN 0 ELSE total - OLD.amount END,
+            expense_count = expense_count - 1
+        WHERE company_code = OLD.company_code;
+        INSERT INTO company_expense_totals (company_code, total, expense_count)
+        VALUES (NEW.company_code, NEW.amount, 1)
+        ON CONFLICT(company_code) DO UPDATE SET
+            total = total + excluded.total,
+            expense_count = expense_count + 1;
+        UPDATE expense_summary SET
+            total = total - OLD.amount + NEW.amount
+        WHERE id = 1;
+    END;
+'''
 
 
 class Database:
     """Gerenciador de banco de dados"""
 
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, pool_size: int = config.DB_POOL_SIZE):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path, max_size=pool_size)
         self.init_db()
 
     def get_connection(self):
-        """Obter conexão com o banco de dados"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Obter conexão do pool (usar com ``with``: commit automático ao final)"""
+        return self.pool.connection()
+
+    def close(self):
+        """Fechar as conexões abertas com o banco de dados"""
+        self.pool.close_all()
 
     def init_db(self):
         """Inicializar banco de dados com tabelas"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            # Tabela de lançamentos de gastos
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS expenses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    company_code TEXT NOT NULL,
-                    company_name TEXT NOT NULL,
-                    description TEXT,
-                    amount REAL NOT NULL,
-                    expense_date TEXT NOT NULL,
-                    category TEXT,
-                    notes TEXT,
-                    created_by TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Tabela de ajustes de valores
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS company_adjustments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    company_code TEXT NOT NULL UNIQUE,
-                    company_name TEXT NOT NULL,
-                    contract_value REAL,
-                    spent_value REAL,
-                    reason TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # Tabela de lançamentos de gastos
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS expenses (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        company_code TEXT NOT NULL,
+                        company_name TEXT NOT NULL,
+                        description TEXT,
+                        amount REAL NOT NULL,
+                        expense_date TEXT NOT NULL,
+                        category TEXT,
+                        notes TEXT,
+                        created_by TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+
+                # Tabela de ajustes de valores
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS company_adjustments (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        company_code TEXT NOT NULL UNIQUE,
+                        company_name TEXT NOT NULL,
+                        contract_value REAL,
+                        spent_value REAL,
+                        reason TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
             
-            # Tabela de usuarios
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT NOT NULL UNIQUE,
-                    password TEXT NOT NULL,
-                    full_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+                # Tabela de usuarios
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        username TEXT NOT NULL UNIQUE,
+                        password TEXT NOT NULL,
+                        full_name TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+
+                # Totais de lançamentos mantidos por triggers (por empresa e geral)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS company_expense_totals (
+                        company_code TEXT PRIMARY KEY,
+                        total REAL NOT NULL DEFAULT 0,
+                        expense_count INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS expense_summary (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        total REAL NOT NULL DEFAULT 0,
+                        expense_count INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+
+                cursor.executescript(EXPENSE_TOTALS_TRIGGERS)
+
+                # Última versão publicada dos dados, para servir logo ao reiniciar
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS data_snapshot (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        version INTEGER NOT NULL,
+                        companies TEXT NOT NULL,
+                        statistics TEXT NOT NULL,
+                        file_path TEXT,
+                        last_update TEXT,
+                        sources TEXT NOT NULL,
+                        saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+
+                # Histórico por empresa: uma linha só quando os valores mudam
+                # (WITHOUT ROWID: linhas de uma empresa ficam juntas, ordenadas pelo tempo)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS company_history (
+                        company_code TEXT NOT NULL,
+                        recorded_at INTEGER NOT NULL,
+                        contract_value REAL,
+                        spent_value REAL,
+                        percentage REAL,
+                        PRIMARY KEY (company_code, recorded_at)
+                    ) WITHOUT ROWID
+                ''')
+
+                # Índices para listagem paginada por empresa e por data
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_expenses_company_date
+                    ON expenses (company_code, expense_date, id)
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_expenses_date
+                    ON expenses (expense_date, id)
+                ''')
+
+                # Banco criado antes dos totais: calcular a partir dos lançamentos
+                cursor.execute('SELECT id FROM expense_summary WHERE id = 1')
+                needs_rebuild = cursor.fetchone() is None
+
+            if needs_rebuild:
+                self.rebuild_expense_totals()
 
-            conn.commit()
-            conn.close()
             logger.info("Banco de dados inicializado com sucesso")
 
         except Exception as e:
@@ -83,6 +335,7 @@ class Database:
 
     # ============ EXPENSES ============
 
+    @_timed
     def add_expense(self, company_code: str, company_name: str, amount: float,
                    description: str = "", expense_date: str = None,
                    category: str = "", notes: str = "", created_by: str = None) -> bool:
@@ -91,17 +344,14 @@ class Database:
             if expense_date is None:
                 expense_date = datetime.now().strftime('%Y-%m-%d')
 
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO expenses 
-                (company_code, company_name, description, amount, expense_date, category, notes, created_by)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (company_code, company_name, description, amount, expense_date, category, notes, created_by))
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                    INSERT INTO expenses 
+                    (company_code, company_name, description, amount, expense_date, category, notes, created_by)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (company_code, company_name, description, amount, expense_date, category, notes, created_by))
 
             logger.info(f"Lançamento adicionado: {company_name} - R${amount}")
             return True
@@ -110,26 +360,88 @@ class Database:
             logger.error(f"Erro ao adicionar lançamento: {e}")
             return False
 
-    def get_expenses(self, company_code: str = None) -> List[Dict[str, Any]]:
-        """Obter lançamentos de gastos"""
+    @_timed
+    def add_expenses_bulk(self, rows: Iterable[Tuple]) -> Optional[int]:
+        """
+        Adicionar vários lançamentos em uma única transação
+
+        Args:
+            rows: Iterável (pode ser gerador) de tuplas (company_code, company_name,
+                description, amount, expense_date, category, notes, created_by)
+
+        Returns:
+            Quantidade inserida, ou None se alguma linha é inválida (nada é gravado)
+
+        Raises:
+            Erros de leitura das linhas (ex.: arquivo corrompido) e do banco;
+            a transação é desfeita
+        """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.executemany('''
+                    INSERT INTO expenses 
+                    (company_code, company_name, description, amount, expense_date, category, notes, created_by)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                count = cursor.rowcount
+
+            logger.info(f"Lançamentos importados em lote: {count}")
+            return count
+
+        except ImportValidationError as e:
+            logger.warning(f"Importação cancelada: {e}")
+            return None
+
+    @_timed
+    def get_expenses(self, company_code: str = None, limit: Optional[int] = None,
+                     after: Optional[Tuple[str, int]] = None, date_from: str = None,
+                     date_to: str = None) -> List[Dict[str, Any]]:
+        """
+        Obter lançamentos de gastos, do mais recente para o mais antigo
+
+        Args:
+            company_code: Filtrar por empresa
+            limit: Quantidade máxima de lançamentos (None = todos)
+            after: Cursor (expense_date, id) do último lançamento da página anterior
+            date_from: Data inicial (inclusive, AAAA-MM-DD)
+            date_to: Data final (inclusive, AAAA-MM-DD)
+        """
+        try:
+            conditions = []
+            params: List[Any] = []
 
             if company_code:
-                cursor.execute('''
-                    SELECT * FROM expenses 
-                    WHERE company_code = ?
-                    ORDER BY expense_date DESC
-                ''', (company_code,))
-            else:
-                cursor.execute('''
-                    SELECT * FROM expenses 
-                    ORDER BY expense_date DESC
-                ''')
+                conditions.append('company_code = ?')
+                params.append(company_code)
 
-            rows = cursor.fetchall()
-            conn.close()
+            if date_from:
+                conditions.append('expense_date >= ?')
+                params.append(date_from)
+
+            if date_to:
+                conditions.append('expense_date <= ?')
+                params.append(date_to)
+
+            if after:
+                # Paginação por chave: continua logo após o último item já entregue
+                conditions.append('(expense_date, id) < (?, ?)')
+                params.extend(after)
+
+            query = 'SELECT * FROM expenses'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += ' ORDER BY expense_date DESC, id DESC'
+
+            if limit is not None:
+                query += ' LIMIT ?'
+                params.append(limit)
+
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
 
             return [dict(row) for row in rows]
 
@@ -137,15 +449,14 @@ class Database:
             logger.error(f"Erro ao obter lançamentos: {e}")
             return []
 
+    @_timed
     def delete_expense(self, expense_id: int) -> bool:
         """Deletar lançamento de gasto"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
-            conn.commit()
-            conn.close()
+                cursor.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
 
             logger.info(f"Lançamento {expense_id} deletado")
             return True
@@ -156,50 +467,48 @@ class Database:
 
     # ============ ADJUSTMENTS ============
 
+    @_timed
     def set_company_adjustment(self, company_code: str, company_name: str,
                               contract_value: float = None, spent_value: float = None,
                               reason: str = "") -> bool:
         """Definir ou atualizar ajuste de valores da empresa"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            # Verificar se já existe
-            cursor.execute('SELECT id FROM company_adjustments WHERE company_code = ?', (company_code,))
-            exists = cursor.fetchone()
-
-            if exists:
-                # Atualizar
-                updates = []
-                params = []
-
-                if contract_value is not None:
-                    updates.append('contract_value = ?')
-                    params.append(contract_value)
-
-                if spent_value is not None:
-                    updates.append('spent_value = ?')
-                    params.append(spent_value)
-
-                if reason:
-                    updates.append('reason = ?')
-                    params.append(reason)
-
-                updates.append('updated_at = CURRENT_TIMESTAMP')
-                params.append(company_code)
-
-                query = f'UPDATE company_adjustments SET {", ".join(updates)} WHERE company_code = ?'
-                cursor.execute(query, params)
-            else:
-                # Inserir
-                cursor.execute('''
-                    INSERT INTO company_adjustments 
-                    (company_code, company_name, contract_value, spent_value, reason)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (company_code, company_name, contract_value, spent_value, reason))
-
-            conn.commit()
-            conn.close()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # Verificar se já existe
+                cursor.execute('SELECT id FROM company_adjustments WHERE company_code = ?', (company_code,))
+                exists = cursor.fetchone()
+
+                if exists:
+                    # Atualizar
+                    updates = []
+                    params = []
+
+                    if contract_value is not None:
+                        updates.append('contract_value = ?')
+                        params.append(contract_value)
+
+                    if spent_value is not None:
+                        updates.append('spent_value = ?')
+                        params.append(spent_value)
+
+                    if reason:
+                        updates.append('reason = ?')
+                        params.append(reason)
+
+                    updates.append('updated_at = CURRENT_TIMESTAMP')
+                    params.append(company_code)
+
+                    query = f'UPDATE company_adjustments SET {", ".join(updates)} WHERE company_code = ?'
+                    cursor.execute(query, params)
+                else:
+                    # Inserir
+                    cursor.execute('''
+                        INSERT INTO company_adjustments 
+                        (company_code, company_name, contract_value, spent_value, reason)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (company_code, company_name, contract_value, spent_value, reason))
 
             logger.info(f"Ajuste salvo para {company_name}")
             return True
@@ -208,15 +517,15 @@ class Database:
             logger.error(f"Erro ao salvar ajuste: {e}")
             return False
 
+    @_timed
     def get_company_adjustment(self, company_code: str) -> Optional[Dict[str, Any]]:
         """Obter ajuste de valores da empresa"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('SELECT * FROM company_adjustments WHERE company_code = ?', (company_code,))
-            row = cursor.fetchone()
-            conn.close()
+                cursor.execute('SELECT * FROM company_adjustments WHERE company_code = ?', (company_code,))
+                row = cursor.fetchone()
 
             return dict(row) if row else None
 
@@ -224,15 +533,15 @@ class Database:
             logger.error(f"Erro ao obter ajuste: {e}")
             return None
 
+    @_timed
     def get_all_adjustments(self) -> List[Dict[str, Any]]:
         """Obter todos os ajustes"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('SELECT * FROM company_adjustments ORDER BY company_name')
-            rows = cursor.fetchall()
-            conn.close()
+                cursor.execute('SELECT * FROM company_adjustments ORDER BY company_name')
+                rows = cursor.fetchall()
 
             return [dict(row) for row in rows]
 
@@ -240,46 +549,315 @@ class Database:
             logger.error(f"Erro ao obter ajustes: {e}")
             return []
 
+    # ============ SNAPSHOT ============
+
+    @_timed
+    def save_snapshot(self, snapshot: Dict[str, Any], sources: Dict[str, Any]) -> bool:
+        """
+        Gravar a versão publicada dos dados (substitui a anterior)
+
+        Args:
+            snapshot: Dados publicados (companies, statistics, last_update, file_path, version)
+            sources: Estado das planilhas (identidade do arquivo e leitura sem ajustes)
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    INSERT INTO data_snapshot
+                    (id, version, companies, statistics, file_path, last_update, sources, saved_at)
+                    VALUES (1, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(id) DO UPDATE SET
+                        version = excluded.version,
+                        companies = excluded.companies,
+                        statistics = excluded.statistics,
+                        file_path = excluded.file_path,
+                        last_update = excluded.last_update,
+                        sources = excluded.sources,
+                        saved_at = excluded.saved_at
+                ''', (
+                    snapshot['version'],
+                    json.dumps(snapshot['companies'], ensure_ascii=False),
+                    json.dumps(snapshot['statistics'], ensure_ascii=False),
+                    snapshot.get('file_path'),
+                    snapshot.get('last_update'),
+                    json.dumps(sources, ensure_ascii=False)
+                ))
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar snapshot: {e}")
+            return False
+
+    @_timed
+    def load_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Obter a última versão gravada dos dados (com o estado das planilhas em 'sources')"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('SELECT * FROM data_snapshot WHERE id = 1')
+                row = cursor.fetchone()
+
+            if not row:
+                return None
+
+            return {
+                'version': row['version'],
+                'companies': json.loads(row['companies']),
+                'statistics': json.loads(row['statistics']),
+                'file_path': row['file_path'],
+                'last_update': row['last_update'],
+                'sources': json.loads(row['sources'])
+            }
+
+        except Exception as e:
+            logger.error(f"Erro ao carregar snapshot: {e}")
+            return None
+
+    # ============ HISTORY ============
+
+    @_timed
+    def add_history(self, rows: Iterable[Tuple]) -> bool:
+        """
+        Gravar pontos do histórico
+
+        Args:
+            rows: Tuplas (company_code, recorded_at, contract_value, spent_value, percentage),
+                com recorded_at em segundos (epoch); valores None marcam empresa removida
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO company_history
+                    (company_code, recorded_at, contract_value, spent_value, percentage)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao gravar histórico: {e}")
+            return False
+
+    @_timed
+    def get_latest_history(self) -> Dict[str, Tuple]:
+        """Obter o último ponto gravado de cada empresa: código -> (contrato, gasto, percentual)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # Coluna sem agregação junto de MAX(): o SQLite devolve a linha do máximo
+                cursor.execute('''
+                    SELECT company_code, MAX(recorded_at), contract_value, spent_value, percentage
+                    FROM company_history
+                    GROUP BY company_code
+                ''')
+                rows = cursor.fetchall()
+
+            return {row[0]: (row[2], row[3], row[4]) for row in rows}
+
+        except Exception as e:
+            logger.error(f"Erro ao obter último histórico: {e}")
+            return {}
+
+    @_timed
+    def get_history(self, company_code: str, start: int, end: int, step: int) -> List[Tuple]:
+        """
+        Obter o histórico de uma empresa reduzido a um ponto por intervalo
+
+        Em cada intervalo de ``step`` segundos a partir de ``start`` fica o último
+        ponto gravado. O último ponto antes de ``start`` vem primeiro, com
+        intervalo -1, para servir de valor inicial.
+
+        Returns:
+            Tuplas (intervalo, recorded_at, contract_value, spent_value, percentage)
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT -1, recorded_at, contract_value, spent_value, percentage
+                    FROM company_history
+                    WHERE company_code = ? AND recorded_at < ?
+                    ORDER BY recorded_at DESC
+                    LIMIT 1
+                ''', (company_code, start))
+                rows = cursor.fetchall()
+
+                cursor.execute('''
+                    SELECT (recorded_at - ?) / ? AS bucket, MAX(recorded_at),
+                           contract_value, spent_value, percentage
+                    FROM company_history
+                    WHERE company_code = ? AND recorded_at BETWEEN ? AND ?
+                    GROUP BY bucket
+                    ORDER BY bucket
+                ''', (start, step, company_code, start, end))
+                rows += cursor.fetchall()
+
+            return [tuple(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Erro ao obter histórico: {e}")
+            return []
+
     # ============ STATISTICS ============
 
+    @_timed
     def get_expenses_by_company(self, company_code: str) -> float:
         """Obter total de gastos lançados para uma empresa"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT SUM(amount) as total FROM expenses 
-                WHERE company_code = ?
-            ''', (company_code,))
+                cursor.execute('''
+                    SELECT total FROM company_expense_totals 
+                    WHERE company_code = ?
+                ''', (company_code,))
 
-            row = cursor.fetchone()
-            conn.close()
+                row = cursor.fetchone()
 
-            return row['total'] if row['total'] else 0
+            return row['total'] if row and row['total'] else 0
 
         except Exception as e:
             logger.error(f"Erro ao obter gastos: {e}")
             return 0
 
+    @_timed
+    def get_expense_totals_by_company(self) -> Dict[str, float]:
+        """Obter total de gastos lançados de todas as empresas em uma única consulta"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT company_code, total FROM company_expense_totals 
+                    WHERE expense_count > 0
+                ''')
+
+                rows = cursor.fetchall()
+
+            return {row['company_code']: row['total'] or 0 for row in rows}
+
+        except Exception as e:
+            logger.error(f"Erro ao obter gastos por empresa: {e}")
+            return {}
+
+    @_timed
+    def get_expense_counts_by_company(self) -> Dict[str, int]:
+        """Obter quantidade de lançamentos de cada empresa"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT company_code, expense_count FROM company_expense_totals 
+                    WHERE expense_count > 0
+                ''')
+
+                rows = cursor.fetchall()
+
+            return {row['company_code']: row['expense_count'] for row in rows}
+
+        except Exception as e:
+            logger.error(f"Erro ao obter quantidade de lançamentos: {e}")
+            return {}
+
+    @_timed
     def get_total_expenses(self) -> float:
         """Obter total de todos os gastos lançados"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('SELECT SUM(amount) as total FROM expenses')
-            row = cursor.fetchone()
-            conn.close()
+                cursor.execute('SELECT total FROM expense_summary WHERE id = 1')
+                row = cursor.fetchone()
 
-            return row['total'] if row['total'] else 0
+            return row['total'] if row and row['total'] else 0
 
         except Exception as e:
             logger.error(f"Erro ao obter total de gastos: {e}")
             return 0
 
+    @_timed
+    def rebuild_expense_totals(self) -> bool:
+        """Recalcular os totais materializados a partir da tabela expenses"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('DELETE FROM company_expense_totals')
+                cursor.execute('''
+                    INSERT INTO company_expense_totals (company_code, total, expense_count)
+                    SELECT company_code, SUM(amount), COUNT(*) FROM expenses
+                    GROUP BY company_code
+                ''')
+
+                cursor.execute('DELETE FROM expense_summary')
+                cursor.execute('''
+                    INSERT INTO expense_summary (id, total, expense_count)
+                    SELECT 1, COALESCE(SUM(amount), 0), COUNT(*) FROM expenses
+                ''')
+
+            logger.info("Totais de lançamentos recalculados")
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao recalcular totais de lançamentos: {e}")
+            return False
+
+    @_timed
+    def check_expense_totals(self, tolerance: float = 0.005) -> List[Dict[str, Any]]:
+        """
+        Comparar os totais materializados com a soma da tabela expenses
+
+        Args:
+            tolerance: Diferença máxima aceita entre os valores
+
+        Returns:
+            Lista de divergências (vazia se tudo estiver consistente); o código
+            '*' representa o total geral
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT company_code, SUM(total) AS total, SUM(expense_count) AS expense_count,
+                           SUM(actual_total) AS actual_total, SUM(actual_count) AS actual_count
+                    FROM (
+                        SELECT company_code, total, expense_count, 0 AS actual_total, 0 AS actual_count
+                        FROM company_expense_totals
+                        UNION ALL
+                        SELECT company_code, 0, 0, SUM(amount), COUNT(*)
+                        FROM expenses GROUP BY company_code
+                        UNION ALL
+                        SELECT '*', total, expense_count, 0, 0 FROM expense_summary
+                        UNION ALL
+                        SELECT '*', 0, 0, COALESCE(SUM(amount), 0), COUNT(*) FROM expenses
+                    )
+                    GROUP BY company_code
+                    HAVING ABS(SUM(total) - SUM(actual_total)) > ?
+                        OR SUM(expense_count) != SUM(actual_count)
+                ''', (tolerance,))
+
+                rows = cursor.fetchall()
+
+            mismatches = [dict(row) for row in rows]
+            if mismatches:
+                logger.warning(f"Totais de lançamentos divergentes: {len(mismatches)}")
+            return mismatches
+
+        except Exception as e:
+            logger.error(f"Erro ao verificar totais de lançamentos: {e}")
+            return []
+
     # ============ USERS ============
 
+    @_timed
     def create_user(self, username: str, password: str, full_name: str = "") -> bool:
         """Criar novo usuário"""
         try:
@@ -288,16 +866,13 @@ class Database:
             # Hash da senha
             password_hash = hashlib.sha256(password.encode()).hexdigest()
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO users (username, password, full_name)
-                VALUES (?, ?, ?)
-            ''', (username, password_hash, full_name))
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                    INSERT INTO users (username, password, full_name)
+                    VALUES (?, ?, ?)
+                ''', (username, password_hash, full_name))
 
             logger.info(f"Usuário criado: {username}")
             return True
@@ -306,6 +881,7 @@ class Database:
             logger.error(f"Erro ao criar usuário: {e}")
             return False
 
+    @_timed
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Autenticar usuário"""
         try:
@@ -314,16 +890,15 @@ class Database:
             # Hash da senha
             password_hash = hashlib.sha256(password.encode()).hexdigest()
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT * FROM users 
-                WHERE username = ? AND password = ?
-            ''', (username, password_hash))
+                cursor.execute('''
+                    SELECT * FROM users 
+                    WHERE username = ? AND password = ?
+                ''', (username, password_hash))
 
-            row = cursor.fetchone()
-            conn.close()
+                row = cursor.fetchone()
 
             return dict(row) if row else None
 
@@ -331,15 +906,15 @@ class Database:
             logger.error(f"Erro ao autenticar usuário: {e}")
             return None
 
+    @_timed
     def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Obter dados do usuário"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('SELECT id, username, full_name FROM users WHERE id = ?', (user_id,))
-            row = cursor.fetchone()
-            conn.close()
+                cursor.execute('SELECT id, username, full_name FROM users WHERE id = ?', (user_id,))
+                row = cursor.fetchone()
 
             return dict(row) if row else None
 
@@ -347,15 +922,15 @@ class Database:
             logger.error(f"Erro ao obter usuário: {e}")
             return None
 
+    @_timed
     def user_exists(self, username: str) -> bool:
         """Verificar se usuário existe"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
-            row = cursor.fetchone()
-            conn.close()
+                cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
+                row = cursor.fetchone()
 
             return row is not None
 
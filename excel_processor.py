@@ -4,15 +4,35 @@ Usa apenas openpyxl que é mais leve
 """
 
 from openpyxl import load_workbook
-from typing import List, Dict, Any
+from openpyxl.styles.numbers import builtin_format_code, is_date_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import from_excel, from_ISO8601, CALENDAR_MAC_1904, WINDOWS_EPOCH
+from xml.etree import ElementTree
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
+import hashlib
 import logging
+import multiprocessing
+import posixpath
+import zipfile
+import config
+from metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+EXCEL_PARSES = REGISTRY.counter('dashboard_excel_parses_total', 'Leituras completas do arquivo Excel')
+EXCEL_CACHE_HITS = REGISTRY.counter('dashboard_excel_cache_hits_total', 'Leituras evitadas pelo cache do Excel')
+EXCEL_FAST_FALLBACKS = REGISTRY.counter(
+    'dashboard_excel_fast_reader_fallbacks_total', 'Arquivos lidos pelo openpyxl porque o leitor rápido não os trata')
+
 
 class CompanyData:
     """Classe para armazenar dados de uma empresa"""
+    __slots__ = ('code', 'name', 'contract_value', 'spent_value')
+
     def __init__(self, code: str, name: str, contract_value: float, spent_value: float):
         self.code = code
         self.name = name
@@ -42,15 +62,506 @@ class CompanyData:
             return 'ok'
 
 
+class CompanyTable:
+    """
+    Tabela colunar de empresas, ordenada por nome
+
+    Códigos e nomes ficam em listas e os valores em arrays de float; percentual,
+    status e totais são calculados de uma vez para todas as linhas em ``compute``.
+    Os dicionários só são montados em ``to_dicts``, na hora de publicar/serializar.
+    Com várias planilhas, ``sources`` guarda por linha a origem de cada valor.
+    """
+    __slots__ = ('codes', 'names', 'contract', 'spent', 'percentage', 'status', 'sources', '_index')
+
+    def __init__(self, codes: Iterable[str] = (), names: Iterable[str] = (),
+                 contract: Iterable[float] = (), spent: Iterable[float] = ()):
+        self.codes: List[str] = list(codes)
+        self.names: List[str] = list(names)
+        self.contract = array('d', contract)
+        self.spent = array('d', spent)
+        self.percentage = array('d')
+        self.status: List[str] = []
+        self.sources: Optional[List[List[Dict[str, Any]]]] = None
+        self._index: Optional[Dict[str, int]] = None
+        self.compute()
+
+    @classmethod
+    def from_companies(cls, companies: Iterable[CompanyData]) -> 'CompanyTable':
+        """Monta a tabela a partir dos registros lidos do Excel, ordenando por nome"""
+        rows = sorted(companies, key=lambda c: c.name)
+        return cls((c.code for c in rows), (c.name for c in rows),
+                   (c.contract_value for c in rows), (c.spent_value for c in rows))
+
+    @classmethod
+    def from_dicts(cls, companies: List[Dict[str, Any]]) -> 'CompanyTable':
+        """Monta a tabela a partir de dicionários no formato de ``to_dicts`` (mantém a ordem)"""
+        return cls((c['code'] for c in companies), (c['name'] for c in companies),
+                   (c['contract_value'] for c in companies), (c['spent_value'] for c in companies))
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list]) -> 'CompanyTable':
+        """Monta a tabela a partir do formato de ``to_columns``"""
+        return cls(columns['codes'], columns['names'], columns['contract'], columns['spent'])
+
+    def to_columns(self) -> Dict[str, list]:
+        """Colunas de entrada (código, nome, contrato, gasto) em listas, para gravar em JSON"""
+        return {
+            'codes': list(self.codes),
+            'names': list(self.names),
+            'contract': self.contract.tolist(),
+            'spent': self.spent.tolist()
+        }
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def copy(self) -> 'CompanyTable':
+        """Cópia independente (as colunas de valores são copiadas, as de texto compartilhadas)"""
+        table = CompanyTable.__new__(CompanyTable)
+        table.codes = self.codes
+        table.names = self.names
+        table.contract = array('d', self.contract)
+        table.spent = array('d', self.spent)
+        table.percentage = array('d', self.percentage)
+        table.status = list(self.status)
+        table.sources = self.sources
+        table._index = self._index
+        return table
+
+    def index(self) -> Dict[str, int]:
+        """Código -> posição na tabela"""
+        if self._index is None:
+            self._index = {code: i for i, code in enumerate(self.codes)}
+        return self._index
+
+    def compute(self) -> None:
+        """Recalcula percentual (arredondado a 2 casas) e status de todas as linhas"""
+        percentage = [round(spent / contract * 100, 2) if contract > 0 else 0.0
+                      for contract, spent in zip(self.contract, self.spent)]
+        self.percentage = array('d', percentage)
+        self.status = ['critical' if p > 90 else 'warning' if p > 70 else 'ok' for p in percentage]
+
+    def statistics(self) -> Dict[str, Any]:
+        """Totais e utilização média da tabela"""
+        if not self.codes:
+            return {
+                'total_contracted': 0,
+                'total_spent': 0,
+                'average_utilization': 0,
+                'companies_count': 0
+            }
+
+        total_contracted = sum(self.contract)
+        total_spent = sum(self.spent)
+        average_utilization = (total_spent / total_contracted * 100) if total_contracted > 0 else 0
+
+        return {
+            'total_contracted': total_contracted,
+            'total_spent': total_spent,
+            'average_utilization': round(average_utilization, 2),
+            'companies_count': len(self.codes)
+        }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Materializa a tabela como lista de dicionários (formato da API)"""
+        if self.sources is not None:
+            companies = self._build_dicts()
+            for company, sources in zip(companies, self.sources):
+                company['sources'] = [dict(source) for source in sources]
+            return companies
+        return self._build_dicts()
+
+    def _build_dicts(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'code': code,
+                'name': name,
+                'contract_value': contract,
+                'spent_value': spent,
+                'percentage': percentage,
+                'status': status
+            }
+            for code, name, contract, spent, percentage, status in zip(
+                self.codes, self.names, self.contract, self.spent, self.percentage, self.status)
+        ]
+
+
+# Abas lidas da planilha de controle
+VALIDACOES_SHEET = 'VALIDAÇÕES'
+LIQUIDACAO_SHEET = 'LIQUIDAÇÃO 2025'
+
+# Colunas lidas de cada aba (índices a partir de 0)
+VALIDACOES_COLUMNS = (0, 1, 6)    # Código, Empresa, Valor Contrato
+LIQUIDACAO_COLUMNS = (1, 6)       # Código, Valor Liquidado
+# Trechos da impressão digital incremental antes de recalculá-la como um só
+LIQUIDACAO_MAX_SEGMENTS = 64
+
+
+def _iter_columns(ws, columns, streaming: bool):
+    """
+    Itera sobre as linhas de dados (sem cabeçalho) devolvendo apenas as colunas pedidas
+
+    Args:
+        ws: Planilha openpyxl
+        columns: Índices das colunas desejadas
+        streaming: Se True, limita a leitura às colunas até a maior pedida
+
+    Yields:
+        Tuplas com os valores das colunas, na ordem de ``columns``
+    """
+    if streaming:
+        rows = ws.iter_rows(min_row=2, max_col=max(columns) + 1, values_only=True)
+    else:
+        rows = ws.iter_rows(min_row=2, values_only=True)
+
+    for row in rows:
+        if not row or len(row) <= max(columns):
+            continue
+        yield tuple(row[i] for i in columns)
+
+
+class FastReaderError(Exception):
+    """Workbook com estrutura que o leitor rápido não trata (usa-se o openpyxl)"""
+
+
+# Partes e namespaces do pacote OOXML usados pelo leitor rápido
+_CT_NS = '{http://schemas.openxmlformats.org/package/2006/content-types}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_WORKBOOK_TYPES = (
+    'application/vnd.ms-excel.template.macroEnabled.main+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml',
+    'application/vnd.ms-excel.sheet.macroEnabled.main+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml',
+)
+_SHARED_STRINGS_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+_WORKSHEET_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet'
+
+_ROW_TAG = _MAIN_NS + 'row'
+_CELL_TAG = _MAIN_NS + 'c'
+_VALUE_TAG = _MAIN_NS + 'v'
+_INLINE_TAG = _MAIN_NS + 'is'
+_TEXT_TAG = _MAIN_NS + 't'
+_RUN_TAG = _MAIN_NS + 'r'
+_DIMENSION_TAG = _MAIN_NS + 'dimension'
+_DATA_TAG = _MAIN_NS + 'sheetData'
+
+# Letras da coluna -> índice (a partir de 1)
+_COLUMN_INDEX: Dict[str, int] = {}
+
+
+def _column_index(coordinate: str) -> int:
+    letters = coordinate.rstrip('0123456789')
+    index = _COLUMN_INDEX.get(letters)
+    if index is None:
+        index = _COLUMN_INDEX[letters] = column_index_from_string(letters)
+    return index
+
+
+def _text_content(node) -> str:
+    """Texto de um <si>/<is>: o <t> direto mais os <t> das partes formatadas (<r>)"""
+    parts = []
+    text = node.find(_TEXT_TAG)
+    if text is not None and text.text:
+        parts.append(text.text)
+    for run in node.iterfind(_RUN_TAG):
+        text = run.find(_TEXT_TAG)
+        if text is not None and text.text:
+            parts.append(text.text)
+    return ''.join(parts)
+
+
+class FastWorksheet:
+    """Aba lida direto do XML; imita ``iter_rows(values_only=True)`` do openpyxl em modo read_only"""
+
+    def __init__(self, workbook: 'FastWorkbook', path: str):
+        self.workbook = workbook
+        self.path = path
+        self.max_row = self._read_max_row()
+
+    def _read_max_row(self) -> Optional[int]:
+        """Última linha declarada em <dimension> (o openpyxl ignora linhas além dela)"""
+        with self.workbook.archive.open(self.path) as source:
+            for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+                if element.tag == _DATA_TAG:
+                    return None
+                if event == 'end' and element.tag == _DIMENSION_TAG:
+                    return range_boundaries(element.get('ref'))[3]
+        return None
+
+    def iter_rows(self, min_row: int = 1, max_col: Optional[int] = None, values_only: bool = True):
+        """
+        Itera sobre as linhas com os valores das colunas 1..max_col
+
+        Linhas ausentes no XML viram tuplas de None, como no openpyxl.
+        """
+        if max_col is None or not values_only:
+            raise FastReaderError("leitor rápido exige max_col e values_only")
+
+        max_row = self.max_row
+        empty_row = (None,) * max_col
+        counter = min_row
+        index = 0
+        row_number = 0
+
+        with self.workbook.archive.open(self.path) as source:
+            sheet_data = None
+            for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == _DATA_TAG:
+                        sheet_data = element
+                    continue
+                if element.tag != _ROW_TAG:
+                    continue
+
+                number = element.get('r')
+                row_number = int(float(number)) if number else row_number + 1
+                index = row_number
+                if max_row is not None and index > max_row:
+                    break
+
+                # Linhas ausentes
+                for _ in range(counter, index):
+                    counter += 1
+                    yield empty_row
+
+                if counter <= index:
+                    counter += 1
+                    yield self._read_row(element, max_col)
+
+                # Descartar as linhas já lidas (mantém a memória constante)
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+        if max_row is not None and max_row < index:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+    def _read_row(self, row, max_col: int) -> tuple:
+        values = [None] * max_col
+        column = 0
+        for cell in row:
+            if cell.tag != _CELL_TAG:
+                continue
+            coordinate = cell.get('r')
+            column = _column_index(coordinate) if coordinate else column + 1
+            if column <= max_col:
+                values[column - 1] = self._cell_value(cell)
+        return tuple(values)
+
+    def _cell_value(self, cell):
+        """Valor da célula com as mesmas conversões do openpyxl (data_only)"""
+        data_type = cell.get('t', 'n')
+        if data_type == 'inlineStr':
+            child = cell.find(_INLINE_TAG)
+            return _text_content(child) if child is not None else None
+
+        value = cell.findtext(_VALUE_TAG) or None
+        if value is None:
+            return None
+
+        if data_type == 'n':
+            value = float(value) if ('.' in value or 'E' in value or 'e' in value) else int(value)
+            style = cell.get('s')
+            if style and int(style) in self.workbook.date_styles:
+                try:
+                    return from_excel(value, self.workbook.epoch)
+                except (OverflowError, ValueError):
+                    return '#VALUE!'
+            return value
+        if data_type == 's':
+            return self.workbook.shared_strings[int(value)]
+        if data_type == 'b':
+            return bool(int(value))
+        if data_type == 'd':
+            return from_ISO8601(value)
+        # 'str' (resultado de fórmula), 'e' (erro) e demais: texto como está
+        return value
+
+
+class FastWorkbook:
+    """
+    Leitor mínimo de .xlsx/.xlsm direto do zip
+
+    Resolve as abas por workbook.xml e seus rels, carrega a tabela de strings
+    compartilhadas e os estilos de data e lê as abas em streaming com iterparse,
+    sem montar o modelo de células do openpyxl. Qualquer estrutura fora do
+    esperado lança FastReaderError na abertura.
+    """
+
+    def __init__(self, file_path: str):
+        try:
+            self.archive = zipfile.ZipFile(file_path)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise FastReaderError(f"zip inválido: {e}")
+
+        try:
+            self._load()
+        except FastReaderError:
+            self.archive.close()
+            raise
+        except (KeyError, ValueError, IndexError, ElementTree.ParseError) as e:
+            self.archive.close()
+            raise FastReaderError(f"estrutura não reconhecida: {e}")
+
+    def _xml(self, path: str):
+        return ElementTree.fromstring(self.archive.read(path))
+
+    def _load(self) -> None:
+        content_types = self._xml('[Content_Types].xml')
+        overrides = {o.get('ContentType'): o.get('PartName') for o in content_types.iter(_CT_NS + 'Override')}
+
+        workbook_part = next((overrides[t] for t in _WORKBOOK_TYPES if t in overrides), None)
+        if workbook_part is None:
+            raise FastReaderError("workbook não encontrado em [Content_Types].xml")
+        workbook_part = workbook_part.lstrip('/')
+
+        workbook = self._xml(workbook_part)
+        if workbook.tag != _MAIN_NS + 'workbook':
+            raise FastReaderError(f"namespace não suportado: {workbook.tag}")
+
+        properties = workbook.find(_MAIN_NS + 'workbookPr')
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        self.epoch = CALENDAR_MAC_1904 if date1904 else WINDOWS_EPOCH
+
+        # Relações do workbook: Id -> caminho da aba no zip
+        folder, name = posixpath.split(workbook_part)
+        rels = self._xml(posixpath.join(folder, '_rels', name + '.rels'))
+        targets = {}
+        for rel in rels.iter(_PKG_REL_NS + 'Relationship'):
+            if rel.get('Type') != _WORKSHEET_REL or rel.get('TargetMode') == 'External':
+                continue
+            target = rel.get('Target')
+            if target.startswith('/'):
+                target = target.lstrip('/')
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            targets[rel.get('Id')] = target
+
+        self.sheetnames: List[str] = []
+        self._sheet_paths: Dict[str, str] = {}
+        names = set(self.archive.namelist())
+        for sheet in workbook.iter(_MAIN_NS + 'sheet'):
+            path = targets.get(sheet.get(_REL_NS + 'id'))
+            if path is None or path not in names:
+                raise FastReaderError(f"aba sem planilha associada: {sheet.get('name')}")
+            self.sheetnames.append(sheet.get('name'))
+            self._sheet_paths[sheet.get('name')] = path
+
+        # Strings compartilhadas
+        self.shared_strings: List[str] = []
+        strings_part = overrides.get(_SHARED_STRINGS_TYPE)
+        if strings_part is not None:
+            with self.archive.open(strings_part.lstrip('/')) as source:
+                for _, element in ElementTree.iterparse(source):
+                    if element.tag == _MAIN_NS + 'si':
+                        self.shared_strings.append(_text_content(element).replace('x005F_', ''))
+                        element.clear()
+
+        # Estilos (índice em cellXfs) cujo formato numérico é de data
+        self.date_styles = set()
+        if 'xl/styles.xml' in names:
+            styles = self._xml('xl/styles.xml')
+            custom = {int(fmt.get('numFmtId')): fmt.get('formatCode')
+                      for fmt in styles.iter(_MAIN_NS + 'numFmt')}
+            cell_xfs = styles.find(_MAIN_NS + 'cellXfs')
+            if cell_xfs is not None:
+                for index, xf in enumerate(cell_xfs.iterfind(_MAIN_NS + 'xf')):
+                    number_format = int(xf.get('numFmtId', 0))
+                    fmt = custom[number_format] if number_format in custom else builtin_format_code(number_format)
+                    if is_date_format(fmt):
+                        self.date_styles.add(index)
+
+    def __getitem__(self, name: str) -> FastWorksheet:
+        return FastWorksheet(self, self._sheet_paths[name])
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+def open_workbook(file_path: str, streaming: bool = True, fast: bool = config.EXCEL_FAST_READER):
+    """
+    Abre o workbook para leitura dos valores
+
+    Em modo streaming, usa o leitor rápido quando possível e cai para o
+    openpyxl se o arquivo tiver algo que ele não trata.
+    """
+    if fast and streaming:
+        try:
+            return FastWorkbook(file_path)
+        except FastReaderError as e:
+            EXCEL_FAST_FALLBACKS.inc()
+            logger.info(f"Leitor rápido indisponível ({e}), usando openpyxl")
+    return load_workbook(file_path, read_only=streaming, data_only=True, keep_links=False)
+
+
 class ExcelProcessor:
     """Processador de arquivos Excel usando openpyxl"""
 
-    def __init__(self):
+    def __init__(self, streaming: bool = config.EXCEL_STREAMING, use_cache: bool = config.EXCEL_CACHE,
+                 incremental: bool = config.EXCEL_INCREMENTAL,
+                 parallel_sheets: bool = config.EXCEL_PARALLEL_SHEETS,
+                 fast_reader: bool = config.EXCEL_FAST_READER):
+        """
+        Args:
+            streaming: Abre o workbook em modo somente leitura (read_only),
+                lendo as linhas sob demanda em vez de carregar todas as células
+            use_cache: Reaproveita o último resultado se o arquivo não mudou
+            incremental: Na LIQUIDAÇÃO, soma só as linhas acrescentadas desde a última leitura
+            parallel_sheets: Lê VALIDAÇÕES e LIQUIDAÇÃO ao mesmo tempo, cada uma em um processo
+            fast_reader: Em modo streaming, lê o XML das abas direto do zip em vez do openpyxl
+        """
+        self.streaming = streaming
+        self.use_cache = use_cache
+        self.incremental = incremental
+        self.parallel_sheets = parallel_sheets
+        self.fast_reader = fast_reader
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Estado da última leitura da LIQUIDAÇÃO: arquivo, quantidade, trechos e impressão digital das linhas, totais
+        self._liquidacao_state: Dict[str, Any] = {}
         self.companies: Dict[str, CompanyData] = {}
         self.last_data = {
             'companies': [],
             'statistics': {}
         }
+        # Cache do último arquivo processado: identidade -> tabela de empresas
+        self._cache_identity: Optional[Tuple[str, int, int, str]] = None
+        self._cache_result: Optional[CompanyTable] = None
+
+    @staticmethod
+    def file_identity(file_path: str) -> Optional[Tuple[str, int, int, str]]:
+        """
+        Calcula a identidade do arquivo: caminho, tamanho, mtime e hash do conteúdo
+
+        Args:
+            file_path: Caminho do arquivo Excel
+
+        Returns:
+            Tupla (caminho, tamanho, mtime_ns, sha256) ou None se não for possível ler
+        """
+        try:
+            path = Path(file_path).resolve()
+            stat = path.stat()
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            return (str(path), stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        except OSError as e:
+            logger.debug(f"Erro ao calcular identidade do arquivo: {e}")
+            return None
+
+    def invalidate_cache(self) -> None:
+        """Descarta o resultado em cache, forçando nova leitura do arquivo"""
+        self._cache_identity = None
+        self._cache_result = None
+
+    def close(self) -> None:
+        """Encerra os processos usados na leitura paralela das abas"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
 
     def process_file(self, file_path: str) -> List[Dict[str, Any]]:
         """
@@ -62,141 +573,312 @@ class ExcelProcessor:
         Returns:
             Lista de dicionários com dados das empresas
         """
+        return self.process_table(file_path).to_dicts()
+
+    def process_table(self, file_path: str, identity: Optional[Tuple[str, int, int, str]] = None) -> CompanyTable:
+        """
+        Processa arquivo Excel e retorna a tabela colunar de empresas
+
+        Args:
+            file_path: Caminho do arquivo Excel
+            identity: Identidade já calculada por quem chama (``file_identity``),
+                para não ler o arquivo inteiro de novo só para o hash
+
+        Returns:
+            CompanyTable ordenada por nome (vazia em caso de erro)
+        """
         try:
             if not Path(file_path).exists():
                 logger.error(f"Arquivo não encontrado: {file_path}")
-                return []
+                return CompanyTable()
 
-            # Carregar workbook
-            wb = load_workbook(file_path, data_only=True)
+            # Arquivo igual ao último processado: devolver cópia do cache
+            if not self.use_cache:
+                identity = None
+            elif identity is None:
+                identity = self.file_identity(file_path)
+            if identity is not None and identity == self._cache_identity and self._cache_result is not None:
+                logger.debug(f"Usando dados em cache para {file_path}")
+                EXCEL_CACHE_HITS.inc()
+                return self._cache_result.copy()
 
-            # Verificar se as abas existem
-            sheet_names = wb.sheetnames
-            
-            if 'VALIDAÇÕES' not in sheet_names:
-                logger.error(f"Aba 'VALIDAÇÕES' não encontrada. Abas disponíveis: {sheet_names}")
-                return []
+            self.companies = {}
+            EXCEL_PARSES.inc()
 
-            if 'LIQUIDAÇÃO 2025' not in sheet_names:
-                logger.error(f"Aba 'LIQUIDAÇÃO 2025' não encontrada. Abas disponíveis: {sheet_names}")
-                return []
+            source = str(Path(file_path).resolve())
+            if self.parallel_sheets:
+                if not self._process_sheets_parallel(file_path, source):
+                    return CompanyTable()
+            elif not self._process_sheets(file_path, source):
+                return CompanyTable()
 
-            # Processar abas
-            self._process_validacoes(wb['VALIDAÇÕES'])
-            self._process_liquidacao(wb['LIQUIDAÇÃO 2025'])
+            # Montar tabela colunar (já ordenada por nome)
+            table = CompanyTable.from_companies(self.companies.values())
 
-            # Converter para lista de dicionários
-            result = [company.to_dict() for company in self.companies.values()]
+            logger.info(f"Processadas {len(table)} empresas")
 
-            # Ordenar por nome
-            result.sort(key=lambda x: x['name'])
+            if identity is not None:
+                self._cache_identity = identity
+                self._cache_result = table.copy()
 
-            logger.info(f"Processadas {len(result)} empresas")
-            return result
+            return table
 
         except Exception as e:
             logger.error(f"Erro ao processar arquivo: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return CompanyTable()
+
+    def _process_sheets(self, file_path: str, source: str) -> bool:
+        """
+        Lê as duas abas no próprio processo, uma depois da outra
+
+        Returns:
+            False se alguma aba não existe
+        """
+        # Carregar workbook (em modo streaming só as abas acessadas são lidas)
+        wb = open_workbook(file_path, self.streaming, self.fast_reader)
 
-    def _process_validacoes(self, ws) -> None:
-        """Processa aba VALIDAÇÕES"""
         try:
-            logger.info("Processando aba VALIDAÇÕES...")
-            
-            # Iterar sobre as linhas
-            for row_idx, row in enumerate(ws.iter_rows(values_only=True), 1):
-                if row_idx == 1:  # Pular cabeçalho
-                    continue
-                
-                if not row or len(row) < 7:
-                    continue
+            # Verificar se as abas existem
+            sheet_names = wb.sheetnames
 
-                # Colunas: 0=Código, 1=Empresa, 6=Valor Contrato
-                codigo = str(row[0]).strip() if row[0] else ""
-                empresa = str(row[1]).strip() if row[1] else ""
-                valor = row[6] if row[6] else 0
+            for sheet in (VALIDACOES_SHEET, LIQUIDACAO_SHEET):
+                if sheet not in sheet_names:
+                    logger.error(f"Aba '{sheet}' não encontrada. Abas disponíveis: {sheet_names}")
+                    return False
 
-                # Pular linhas vazias
-                if not codigo or not empresa:
-                    continue
+            # Processar abas
+            self._process_validacoes(wb[VALIDACOES_SHEET])
+            self._process_liquidacao(wb[LIQUIDACAO_SHEET], source=source)
+            return True
+        finally:
+            # No modo read_only o arquivo fica aberto até o close
+            wb.close()
+
+    def _process_sheets_parallel(self, file_path: str, source: str) -> bool:
+        """
+        Lê VALIDAÇÕES e LIQUIDAÇÃO ao mesmo tempo, cada uma em um processo do pool
 
-                try:
-                    valor_float = float(valor) if isinstance(valor, (int, float)) else 0
-                    if valor_float > 0:  # Só adicionar se tiver valor
-                        self.companies[codigo] = CompanyData(codigo, empresa, valor_float, 0)
-                        logger.debug(f"Empresa adicionada: {codigo} - {empresa} - R${valor_float}")
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Erro ao processar valor: {e}")
-                    continue
+        Os processos só devolvem as linhas normalizadas; a montagem das empresas e
+        a soma dos gastos (inclusive a incremental) são feitas aqui, com o mesmo
+        código do caminho sequencial, então o resultado é idêntico.
 
-            logger.info(f"Total de empresas após VALIDAÇÕES: {len(self.companies)}")
+        Returns:
+            False se alguma aba não existe
 
+        Raises:
+            O erro do processo que falhou ao ler uma aba (como no caminho
+            sequencial, o resultado não vai para o cache)
+        """
+        if self._pool is None:
+            # spawn: o servidor tem threads, e fork com threads pode travar o filho
+            self._pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+
+        results = {}
+        try:
+            futures = {sheet: self._pool.submit(read_sheet, file_path, sheet, self.streaming, self.fast_reader)
+                       for sheet in (VALIDACOES_SHEET, LIQUIDACAO_SHEET)}
+            for sheet, future in futures.items():
+                try:
+                    results[sheet] = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao ler a aba '{sheet}': {e}")
+                    raise
+        except BrokenProcessPool:
+            # Processo morto: recriar o pool na próxima leitura
+            self.close()
+            raise
+
+        for sheet, result in results.items():
+            if result[1] is None:
+                logger.error(f"Aba '{sheet}' não encontrada. Abas disponíveis: {result[0]}")
+                return False
+
+        try:
+            logger.info("Processando aba VALIDAÇÕES...")
+            self._load_validacoes(results[VALIDACOES_SHEET][1])
         except Exception as e:
             logger.error(f"Erro ao processar VALIDAÇÕES: {e}")
-            import traceback
-            traceback.print_exc()
 
-    def _process_liquidacao(self, ws) -> None:
-        """Processa aba LIQUIDAÇÃO 2025"""
         try:
             logger.info("Processando aba LIQUIDAÇÃO 2025...")
-            
-            # Dicionário para acumular gastos por código
-            gastos_por_codigo = {}
+            rows = results[LIQUIDACAO_SHEET][1]
+            self._apply_liquidacao(rows, source)
+        except Exception as e:
+            self._liquidacao_state = {}
+            logger.error(f"Erro ao processar LIQUIDAÇÃO 2025: {e}")
 
-            # Iterar sobre as linhas
-            for row_idx, row in enumerate(ws.iter_rows(values_only=True), 1):
-                if row_idx == 1:  # Pular cabeçalho
-                    continue
-                
-                if not row or len(row) < 7:
-                    continue
+        return True
 
-                # Colunas: 1=Código, 6=Valor Liquidado
-                codigo = str(row[1]).strip() if row[1] else ""
-                valor = row[6] if row[6] else 0
+    def _process_validacoes(self, ws) -> None:
+        """Processa aba VALIDAÇÕES"""
+        try:
+            logger.info("Processando aba VALIDAÇÕES...")
+            self._load_validacoes(read_validacoes(ws, self.streaming))
 
-                # Pular linhas vazias
-                if not codigo:
-                    continue
+        except Exception as e:
+            logger.error(f"Erro ao processar VALIDAÇÕES: {e}")
+            import traceback
+            traceback.print_exc()
 
-                try:
-                    valor_float = float(valor) if isinstance(valor, (int, float)) else 0
-                    if valor_float > 0:
-                        if codigo not in gastos_por_codigo:
-                            gastos_por_codigo[codigo] = 0
-                        gastos_por_codigo[codigo] += valor_float
-                        logger.debug(f"Gasto registrado: {codigo} - R${valor_float}")
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Erro ao processar valor: {e}")
-                    continue
+    def _load_validacoes(self, records: List[Tuple[str, str, float]]) -> None:
+        """Cria as empresas a partir das linhas normalizadas da VALIDAÇÕES"""
+        for codigo, empresa, valor_float in records:
+            self.companies[codigo] = CompanyData(codigo, empresa, valor_float, 0)
+            logger.debug(f"Empresa adicionada: {codigo} - {empresa} - R${valor_float}")
+
+        logger.info(f"Total de empresas após VALIDAÇÕES: {len(self.companies)}")
+
+    @staticmethod
+    def _liquidacao_row_key(codigo, valor) -> Tuple[str, float]:
+        """Normaliza uma linha da LIQUIDAÇÃO em (código, valor); serve de impressão digital da linha"""
+        codigo = str(codigo).strip() if codigo else ""
+        valor = valor if valor else 0
+        try:
+            valor_float = float(valor) if isinstance(valor, (int, float)) else 0
+        except (ValueError, TypeError) as e:
+            logger.debug(f"Erro ao processar valor: {e}")
+            valor_float = 0
+        return codigo, valor_float
+
+    @staticmethod
+    def _add_liquidacao_rows(gastos_por_codigo: Dict[str, float], rows) -> None:
+        """Acumula os valores das linhas normalizadas no dicionário de gastos"""
+        for codigo, valor_float in rows:
+            # Pular linhas vazias ou sem valor
+            if codigo and valor_float > 0:
+                gastos_por_codigo[codigo] = gastos_por_codigo.get(codigo, 0) + valor_float
+
+    def _process_liquidacao(self, ws, source: Optional[str] = None) -> None:
+        """
+        Processa aba LIQUIDAÇÃO 2025
 
-            # Atualizar gastos nas empresas
-            for codigo, gasto in gastos_por_codigo.items():
-                if codigo in self.companies:
-                    company = self.companies[codigo]
-                    company.spent_value = gasto
-                    logger.debug(f"Gasto atualizado para {codigo}: R${gasto}")
+        No modo incremental, compara a impressão digital das linhas com a da
+        leitura anterior do mesmo arquivo: se só houve linhas acrescentadas no
+        final, soma apenas essas linhas aos totais anteriores; se alguma linha
+        anterior mudou, refaz a soma completa.
 
-            logger.info(f"Total de empresas após LIQUIDAÇÃO: {len(self.companies)}")
+        Args:
+            ws: Planilha LIQUIDAÇÃO 2025
+            source: Arquivo de origem (o estado incremental é descartado se mudar)
+        """
+        try:
+            logger.info("Processando aba LIQUIDAÇÃO 2025...")
+            self._apply_liquidacao(read_liquidacao(ws, self.streaming), source)
 
         except Exception as e:
+            self._liquidacao_state = {}
             logger.error(f"Erro ao processar LIQUIDAÇÃO 2025: {e}")
             import traceback
             traceback.print_exc()
 
-    def get_statistics(self, companies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    @staticmethod
+    def _liquidacao_fingerprint(rows: List[Tuple[str, float]], bounds: Iterable[int],
+                                fingerprint: int = 0, start: int = 0) -> int:
+        """
+        Impressão digital das linhas normalizadas, encadeada por trecho
+
+        Cada trecho ``rows[início:fim]`` (um por leitura que acrescentou linhas)
+        entra como ``hash((anterior, tupla do trecho))``: o ``hash`` de tuplas é
+        calculado em C e cada linha é visitada uma vez, seja para conferir as
+        linhas anteriores, seja para acrescentar as novas. O valor só é
+        comparado dentro do mesmo processo (o hash de str muda entre processos).
+
+        Args:
+            rows: Linhas normalizadas
+            bounds: Fim de cada trecho, em ordem crescente
+            fingerprint: Impressão digital das linhas antes de ``start``
+            start: Início do primeiro trecho
+        """
+        for end in bounds:
+            fingerprint = hash((fingerprint, tuple(rows[start:end])))
+            start = end
+        return fingerprint
+
+    def _apply_liquidacao(self, rows: Iterable[Tuple[str, float]], source: Optional[str] = None) -> None:
+        """
+        Soma os gastos das linhas normalizadas da LIQUIDAÇÃO e atualiza as empresas
+
+        Sem modo incremental (ou sem arquivo de origem), é a soma simples. No modo
+        incremental, as linhas são lidas uma única vez: se as primeiras
+        ``count`` têm a mesma impressão digital da leitura anterior, só as
+        seguintes são somadas aos totais anteriores; senão a soma completa é
+        feita sobre as mesmas linhas, sem reler a aba.
+
+        Args:
+            rows: Linhas normalizadas (código, valor), na ordem da planilha
+            source: Arquivo de origem (o estado incremental é descartado se mudar)
+        """
+        if not self.incremental or source is None:
+            gastos_por_codigo: Dict[str, float] = {}
+            self._add_liquidacao_rows(gastos_por_codigo, rows)
+            self._liquidacao_state = {}
+            mode = 'completo'
+            count = None
+        else:
+            rows = rows if isinstance(rows, list) else list(rows)
+            count = len(rows)
+            gastos_por_codigo = None
+            previous = self._liquidacao_state
+            if previous.get('source') == source and count >= previous['count']:
+                prefix = previous['count']
+                fingerprint = self._liquidacao_fingerprint(rows, previous['bounds'])
+                if fingerprint == previous['fingerprint']:
+                    # Só linhas acrescentadas (ou nenhuma): somar a partir dos totais anteriores
+                    gastos_por_codigo = dict(previous['totals'])
+                    self._add_liquidacao_rows(gastos_por_codigo, rows[prefix:])
+                    bounds = previous['bounds']
+                    if prefix < count:
+                        bounds = bounds + [count]
+                        fingerprint = self._liquidacao_fingerprint(rows, [count], fingerprint, prefix)
+                        mode = 'incremental'
+                    else:
+                        mode = 'inalterado'
+
+            if gastos_por_codigo is None:
+                # Primeira leitura ou linha anterior alterada/removida: soma completa
+                gastos_por_codigo = {}
+                self._add_liquidacao_rows(gastos_por_codigo, rows)
+                mode = 'completo'
+                bounds = []
+
+            if not bounds or len(bounds) > LIQUIDACAO_MAX_SEGMENTS:
+                # Um trecho só (custa uma passada a mais, a cada tantos acréscimos)
+                bounds = [count]
+                fingerprint = self._liquidacao_fingerprint(rows, bounds)
+
+            self._liquidacao_state = {
+                'source': source,
+                'count': count,
+                'bounds': bounds,
+                'fingerprint': fingerprint,
+                'totals': dict(gastos_por_codigo)
+            }
+
+        # Atualizar gastos nas empresas
+        for codigo, gasto in gastos_por_codigo.items():
+            if codigo in self.companies:
+                company = self.companies[codigo]
+                company.spent_value = gasto
+                logger.debug(f"Gasto atualizado para {codigo}: R${gasto}")
+
+        lines = f"{count} linhas, " if count is not None else ""
+        logger.info(f"Total de empresas após LIQUIDAÇÃO: {len(self.companies)} ({lines}soma {mode})")
+
+    def get_statistics(self, companies) -> Dict[str, Any]:
         """
         Calcula estatísticas gerais
 
         Args:
-            companies: Lista de empresas
+            companies: CompanyTable ou lista de empresas
 
         Returns:
             Dicionário com estatísticas
         """
+        if isinstance(companies, CompanyTable):
+            return companies.statistics()
+
         if not companies:
             return {
                 'total_contracted': 0,
@@ -218,10 +900,69 @@ class ExcelProcessor:
 
     def get_data(self) -> Dict[str, Any]:
         """Retorna os dados atuais processados"""
-        companies = [company.to_dict() for company in self.companies.values()]
-        companies.sort(key=lambda x: x['name'])
-        
+        table = CompanyTable.from_companies(self.companies.values())
+
         return {
-            'companies': companies,
-            'statistics': self.get_statistics(companies)
+            'companies': table.to_dicts(),
+            'statistics': table.statistics()
         }
+
+
+def read_validacoes(ws, streaming: bool = True) -> List[Tuple[str, str, float]]:
+    """
+    Lê a aba VALIDAÇÕES e normaliza as linhas
+
+    Returns:
+        Lista de (código, empresa, valor do contrato), só linhas com código,
+        nome e valor positivo
+    """
+    records = []
+    # Iterar sobre as linhas (colunas: 0=Código, 1=Empresa, 6=Valor Contrato)
+    for codigo, empresa, valor in _iter_columns(ws, VALIDACOES_COLUMNS, streaming):
+        codigo = str(codigo).strip() if codigo else ""
+        empresa = str(empresa).strip() if empresa else ""
+        valor = valor if valor else 0
+
+        # Pular linhas vazias
+        if not codigo or not empresa:
+            continue
+
+        try:
+            valor_float = float(valor) if isinstance(valor, (int, float)) else 0
+            if valor_float > 0:  # Só adicionar se tiver valor
+                records.append((codigo, empresa, valor_float))
+        except (ValueError, TypeError) as e:
+            logger.debug(f"Erro ao processar valor: {e}")
+            continue
+    return records
+
+
+def read_liquidacao(ws, streaming: bool = True) -> Iterator[Tuple[str, float]]:
+    """
+    Lê a aba LIQUIDAÇÃO 2025 e normaliza as linhas sob demanda
+
+    Yields:
+        (código, valor liquidado) na ordem da planilha, uma por linha
+    """
+    # Iterar sobre as linhas (colunas: 1=Código, 6=Valor Liquidado)
+    for codigo, valor in _iter_columns(ws, LIQUIDACAO_COLUMNS, streaming):
+        yield ExcelProcessor._liquidacao_row_key(codigo, valor)
+
+
+def read_sheet(file_path: str, sheet: str, streaming: bool = True,
+               fast: bool = True) -> Tuple[List[str], Optional[list]]:
+    """
+    Abre o workbook e lê uma das abas (executado nos processos do pool)
+
+    Returns:
+        (abas do workbook, linhas normalizadas) - linhas é None se a aba não existe
+    """
+    wb = open_workbook(file_path, streaming, fast)
+    try:
+        if sheet not in wb.sheetnames:
+            return wb.sheetnames, None
+        reader = read_validacoes if sheet == VALIDACOES_SHEET else read_liquidacao
+        # Lista: as linhas voltam ao processo principal serializadas
+        return wb.sheetnames, list(reader(wb[sheet], streaming))
+    finally:
+        wb.close()
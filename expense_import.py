@@ -0,0 +1,206 @@
+"""
+Importação de lançamentos em lote (JSON, CSV ou XLSX)
+"""
+
+import csv
+import io
+from datetime import datetime, date
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, IO
+import logging
+
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+# Nomes de coluna aceitos para cada campo (comparados em minúsculas, sem acento)
+COLUMN_ALIASES = {
+    'company_code': ('company_code', 'codigo', 'cod', 'code'),
+    'company_name': ('company_name', 'empresa', 'nome', 'name'),
+    'amount': ('amount', 'valor', 'value'),
+    'description': ('description', 'descricao'),
+    'expense_date': ('expense_date', 'data', 'date'),
+    'category': ('category', 'categoria'),
+    'notes': ('notes', 'observacoes', 'obs'),
+}
+
+# Máximo de erros devolvidos na resposta
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportValidationError(ValueError):
+    """Lançado ao final da leitura quando alguma linha é inválida"""
+
+
+def _normalize_header(name: Any) -> str:
+    """Normaliza nome de coluna para comparação"""
+    text = str(name or '').strip().lower()
+    for accented, plain in (('ç', 'c'), ('ã', 'a'), ('á', 'a'), ('â', 'a'), ('é', 'e'),
+                            ('ê', 'e'), ('í', 'i'), ('ó', 'o'), ('õ', 'o'), ('ô', 'o'), ('ú', 'u')):
+        text = text.replace(accented, plain)
+    return text.replace(' ', '_')
+
+
+def _resolve_columns(headers: Iterable[Any]) -> Dict[str, int]:
+    """Mapeia campo -> índice da coluna a partir do cabeçalho"""
+    normalized = [_normalize_header(h) for h in headers]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for index, name in enumerate(normalized):
+            if name in aliases:
+                columns[field] = index
+                break
+    return columns
+
+
+def _parse_amount(value: Any) -> float:
+    """Converte valor numérico, aceitando formato brasileiro (1.234,56)"""
+    if isinstance(value, bool):
+        raise ValueError("valor inválido")
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value or '').strip().replace('R$', '').replace(' ', '')
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    return float(text)
+
+
+def _parse_date(value: Any) -> str:
+    """Converte data para AAAA-MM-DD (aceita AAAA-MM-DD, DD/MM/AAAA e datas do Excel)"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+
+    text = str(value).strip()
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {text}")
+
+
+class ExpenseImporter:
+    """Lê e valida lançamentos em lote, linha a linha"""
+
+    def __init__(self, company_names: Optional[Dict[str, str]] = None, created_by: str = 'sistema'):
+        """
+        Args:
+            company_names: Código -> nome, usado quando a linha não traz o nome da empresa
+            created_by: Valor gravado em created_by
+        """
+        self.company_names = company_names or {}
+        self.created_by = created_by
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.companies: set = set()
+        self.total_rows = 0
+
+    # ============ LEITURA ============
+
+    @staticmethod
+    def iter_json(items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Linhas a partir de uma lista JSON de objetos (aceita os mesmos nomes de coluna do CSV)"""
+        for item in items:
+            if not isinstance(item, dict):
+                yield {}
+                continue
+            keys = list(item.keys())
+            yield {field: item[keys[index]] for field, index in _resolve_columns(keys).items()}
+
+    @staticmethod
+    def _iter_table(rows: Iterator[Iterable[Any]]) -> Iterator[Dict[str, Any]]:
+        """Linhas a partir de uma tabela cuja primeira linha é o cabeçalho"""
+        headers = next(rows, None)
+        if headers is None:
+            return
+        columns = _resolve_columns(headers)
+        for row in rows:
+            row = list(row)
+            if not any(value not in (None, '') for value in row):
+                continue  # linha em branco
+            yield {field: row[index] if index < len(row) else None for field, index in columns.items()}
+
+    @classmethod
+    def iter_csv(cls, stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+        """Linhas a partir de um CSV (separador ',' ou ';', UTF-8 com ou sem BOM)"""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from cls._iter_table(csv.reader(text, dialect))
+
+    @classmethod
+    def iter_xlsx(cls, stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+        """Linhas a partir da primeira aba de um XLSX (lida em modo streaming)"""
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            yield from cls._iter_table(wb.worksheets[0].iter_rows(values_only=True))
+        finally:
+            wb.close()
+
+    # ============ VALIDAÇÃO ============
+
+    def _add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line, 'error': message})
+
+    def validate(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple]:
+        """
+        Valida as linhas e gera tuplas prontas para o INSERT
+
+        As linhas inválidas são registradas em ``errors``; ao final, se houver
+        alguma, lança ImportValidationError para que a transação seja desfeita.
+
+        Yields:
+            (company_code, company_name, description, amount, expense_date,
+             category, notes, created_by)
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        for line, row in enumerate(rows, 1):
+            self.total_rows += 1
+
+            code = str(row.get('company_code') or '').strip()
+            if code.endswith('.0'):
+                code = code[:-2]  # código numérico lido do Excel como float
+            if not code:
+                self._add_error(line, 'company_code obrigatório')
+                continue
+
+            name = str(row.get('company_name') or '').strip() or self.company_names.get(code)
+            if not name:
+                self._add_error(line, f'Empresa {code} desconhecida')
+                continue
+
+            try:
+                amount = _parse_amount(row.get('amount'))
+            except (ValueError, TypeError):
+                self._add_error(line, f"Valor inválido: {row.get('amount')!r}")
+                continue
+
+            try:
+                expense_date = _parse_date(row['expense_date']) if row.get('expense_date') else today
+            except ValueError as e:
+                self._add_error(line, str(e))
+                continue
+
+            self.companies.add((code, name))
+            yield (
+                code,
+                name,
+                str(row.get('description') or ''),
+                amount,
+                expense_date,
+                str(row.get('category') or ''),
+                str(row.get('notes') or ''),
+                self.created_by
+            )
+
+        if self.error_count:
+            raise ImportValidationError(f"{self.error_count} linha(s) inválida(s)")
@@ -3,18 +3,95 @@ Módulo para exportar dados em Excel
 """
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, IO, Iterable
+import io
+import math
+import multiprocessing
+import re
+import tempfile
+import zipfile
 import logging
+import config
 
 logger = logging.getLogger(__name__)
 
+# Acima deste tamanho o arquivo gerado passa da memória para um temporário anônimo
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+CURRENCY_FORMAT = 'R$ #,##0.00'
+
+# Caracteres proibidos em nome de aba; o Excel aceita no máximo 31 caracteres
+INVALID_TITLE_CHARS = re.compile(r"[\[\]:*?/\\']")
+MAX_TITLE_LENGTH = 31
+
+SUMMARY_TITLE = 'Resumo'
+
+STATUS_LABELS = {
+    'ok': 'Dentro do Orçamento',
+    'warning': 'Atenção',
+    'critical': 'Crítico'
+}
+
+
+def sheet_titles(companies: Iterable[Dict[str, Any]]) -> List[str]:
+    """Nomes de aba válidos e únicos ("código - nome") para cada empresa"""
+    titles = []
+    used = {SUMMARY_TITLE.lower()}
+    for company in companies:
+        base = INVALID_TITLE_CHARS.sub(' ', f"{company['code']} - {company['name']}").strip()
+        title = base[:MAX_TITLE_LENGTH].strip()
+        suffix = 2
+        while title.lower() in used:
+            tail = f" ({suffix})"
+            title = base[:MAX_TITLE_LENGTH - len(tail)].strip() + tail
+            suffix += 1
+        used.add(title.lower())
+        titles.append(title)
+    return titles
+
+
+def build_company_sheets(items: List[Dict[str, Any]], generated_at: str) -> List[bytes]:
+    """
+    Gera o XML das abas de movimentos de um lote de empresas (executado nos processos do pool)
+
+    Args:
+        items: Empresas do lote (title, name, code, contract_value, spent_value, expenses)
+        generated_at: Data do relatório, igual em todas as abas
+
+    Returns:
+        XML de cada aba, na ordem de ``items``
+    """
+    exporter = ExcelExporter()
+    wb = exporter._new_workbook()
+    sheets = [wb.create_sheet(item['title']) for item in items]
+    # Mesma ordem de estilos do workbook final: o XML da aba referencia os estilos pelo índice
+    exporter._prime_styles(sheets[0])
+
+    for ws, item in zip(sheets, items):
+        exporter._write_movements(ws, item['name'], item['code'], item['contract_value'],
+                                  item['spent_value'], item['expenses'], generated_at)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    with zipfile.ZipFile(buffer) as archive:
+        return [archive.read(ws.path[1:]) for ws in sheets]
+
 
 class ExcelExporter:
     """Exportador de dados para Excel"""
 
-    def __init__(self):
+    def __init__(self, workers: int = config.EXPORT_WORKERS):
+        """
+        Args:
+            workers: Processos que montam as abas da exportação consolidada
+                (0 ou 1 = monta no próprio processo)
+        """
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
         self.thin_border = Border(
             left=Side(style='thin'),
             right=Side(style='thin'),
@@ -22,140 +99,316 @@ class ExcelExporter:
             bottom=Side(style='thin')
         )
 
+        # Estilos compartilhados: criados uma vez e registrados como estilos nomeados
+        header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
+        total_fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
+        left = Alignment(horizontal='left', vertical='center')
+        bold = Font(bold=True)
+
+        self.styles = {
+            'mov_title': dict(font=Font(bold=True, size=14, color="1F4E78")),
+            'mov_company': dict(font=Font(bold=True, size=11)),
+            'mov_code': dict(font=Font(size=10)),
+            'mov_label': dict(font=bold),
+            'mov_currency': dict(number_format=CURRENCY_FORMAT),
+            'mov_percent': dict(number_format='0.00%'),
+            'mov_header': dict(font=Font(bold=True, color="FFFFFF", size=12), fill=header_fill,
+                               alignment=Alignment(horizontal='center', vertical='center'),
+                               border=self.thin_border),
+            'mov_cell': dict(border=self.thin_border, alignment=left),
+            'mov_cell_currency': dict(border=self.thin_border, alignment=left,
+                                      number_format=CURRENCY_FORMAT),
+            'mov_total': dict(border=self.thin_border, fill=total_fill),
+            'mov_total_label': dict(font=bold, border=self.thin_border, fill=total_fill),
+            'mov_total_currency': dict(font=bold, border=self.thin_border, fill=total_fill,
+                                       number_format=CURRENCY_FORMAT),
+            'mov_cell_percent': dict(border=self.thin_border, alignment=left, number_format='0.00%'),
+            'mov_total_percent': dict(font=bold, border=self.thin_border, fill=total_fill,
+                                      number_format='0.00%'),
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: o servidor tem threads, e fork com threads pode travar o filho
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def close(self) -> None:
+        """Encerra os processos do pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _new_workbook(self) -> Workbook:
+        """Cria workbook em modo write-only com os estilos nomeados registrados"""
+        wb = Workbook(write_only=True)
+        for name, attrs in self.styles.items():
+            wb.add_named_style(NamedStyle(name=name, **attrs))
+        return wb
+
+    @staticmethod
+    def _cell(ws, value, style: Optional[str] = None) -> WriteOnlyCell:
+        """Cria célula para o modo write-only, opcionalmente com estilo nomeado"""
+        cell = WriteOnlyCell(ws, value=value)
+        if style:
+            cell.style = style
+        return cell
+
+    def _prime_styles(self, ws) -> None:
+        """Registra todos os estilos no workbook em ordem fixa (mesmos índices em qualquer workbook)"""
+        for name in self.styles:
+            # O índice é atribuído na primeira leitura de style_id
+            self._cell(ws, None, name).style_id
+
+    def _write_movements(self, ws, company_name: str, company_code: str,
+                         contract_value: float, spent_value: float,
+                         expenses: Iterable[Dict[str, Any]], generated_at: str) -> int:
+        """
+        Grava na aba o relatório de movimentos de uma empresa
+
+        Returns:
+            Quantidade de lançamentos gravados
+        """
+        cell = lambda value, style=None: self._cell(ws, value, style)
+
+        # Configurar largura das colunas (antes de gravar as linhas)
+        ws.column_dimensions['A'].width = 12
+        ws.column_dimensions['B'].width = 25
+        ws.column_dimensions['C'].width = 15
+        ws.column_dimensions['D'].width = 15
+        ws.column_dimensions['E'].width = 20
+        ws.column_dimensions['F'].width = 20
+        ws.column_dimensions['G'].width = 20
+
+        # Cabeçalho com informações da empresa
+        ws.append([cell("RELATÓRIO DE MOVIMENTOS", 'mov_title')])
+        ws.merged_cells.add('A1:F1')
+
+        ws.append([cell(f"Empresa: {company_name}", 'mov_company')])
+        ws.merged_cells.add('A2:F2')
+
+        ws.append([cell(f"Código: {company_code}", 'mov_code')])
+        ws.merged_cells.add('A3:F3')
+
+        # Informações financeiras
+        available = contract_value - spent_value
+        percentage = (spent_value / contract_value * 100) if contract_value > 0 else 0
+
+        ws.append([cell("Data do Relatório:", 'mov_label'), generated_at])
+        ws.append([cell("Valor do Contrato:", 'mov_label'), cell(contract_value, 'mov_currency')])
+        ws.append([cell("Valor Gasto:", 'mov_label'), cell(spent_value, 'mov_currency')])
+        ws.append([cell("Valor Disponível:", 'mov_label'), cell(available, 'mov_currency')])
+        ws.append([cell("Percentual Utilizado:", 'mov_label'), cell(percentage / 100, 'mov_percent')])
+        ws.append([])
+
+        # Cabecalho da tabela
+        headers = ['Data', 'Descricao', 'Categoria', 'Valor', 'Quem Registrou', 'Observacoes', 'Data de Criacao']
+        ws.append([cell(header, 'mov_header') for header in headers])
+
+        # Dados dos lancamentos (total acumulado durante a gravação)
+        total = 0
+        count = 0
+        for expense in expenses:
+            amount = expense.get('amount', 0)
+            total += amount or 0
+            count += 1
+            ws.append([
+                cell(expense.get('expense_date', ''), 'mov_cell'),
+                cell(expense.get('description', ''), 'mov_cell'),
+                cell(expense.get('category', ''), 'mov_cell'),
+                cell(amount, 'mov_cell_currency'),
+                cell(expense.get('created_by', 'N/A'), 'mov_cell'),
+                cell(expense.get('notes', ''), 'mov_cell'),
+                expense.get('created_at', '')
+            ])
+
+        # Rodapé com totalizações
+        if count:
+            ws.append([])
+            ws.append([
+                cell(None, 'mov_total'),
+                cell("TOTAL", 'mov_total_label'),
+                cell(None, 'mov_total'),
+                cell(total, 'mov_total_currency'),
+                cell(None, 'mov_total'),
+                cell(None, 'mov_total')
+            ])
+
+        return count
+
+    def _write_summary(self, ws, companies: List[Dict[str, Any]], titles: List[str],
+                       counts: Dict[str, int], statistics: Dict[str, Any], generated_at: str) -> None:
+        """Grava a aba de resumo: uma linha por empresa e os totais gerais"""
+        cell = lambda value, style=None: self._cell(ws, value, style)
+
+        for column, width in zip('ABCDEFGHI', (12, 40, 18, 18, 18, 12, 20, 12, 32)):
+            ws.column_dimensions[column].width = width
+
+        ws.append([cell("RESUMO CONSOLIDADO", 'mov_title')])
+        ws.merged_cells.add('A1:F1')
+        ws.append([cell("Data do Relatório:", 'mov_label'), generated_at])
+        ws.append([cell("Empresas:", 'mov_label'), statistics.get('companies_count', len(companies))])
+        ws.append([cell("Total Contratado:", 'mov_label'),
+                   cell(statistics.get('total_contracted', 0), 'mov_currency')])
+        ws.append([cell("Total Gasto:", 'mov_label'), cell(statistics.get('total_spent', 0), 'mov_currency')])
+        ws.append([cell("Utilização Média:", 'mov_label'),
+                   cell((statistics.get('average_utilization', 0) or 0) / 100, 'mov_percent')])
+        ws.append([])
+
+        headers = ['Código', 'Empresa', 'Valor do Contrato', 'Valor Gasto', 'Valor Disponível',
+                   'Utilizado', 'Status', 'Lançamentos', 'Aba']
+        ws.append([cell(header, 'mov_header') for header in headers])
+
+        total_contract = 0
+        total_spent = 0
+        for company, title in zip(companies, titles):
+            contract_value = company.get('contract_value', 0) or 0
+            spent_value = company.get('spent_value', 0) or 0
+            total_contract += contract_value
+            total_spent += spent_value
+            ws.append([
+                cell(company['code'], 'mov_cell'),
+                cell(company['name'], 'mov_cell'),
+                cell(contract_value, 'mov_cell_currency'),
+                cell(spent_value, 'mov_cell_currency'),
+                cell(contract_value - spent_value, 'mov_cell_currency'),
+                cell((company.get('percentage', 0) or 0) / 100, 'mov_cell_percent'),
+                cell(STATUS_LABELS.get(company.get('status'), company.get('status')), 'mov_cell'),
+                cell(counts.get(company['code'], 0), 'mov_cell'),
+                cell(title, 'mov_cell')
+            ])
+
+        ws.append([
+            cell(None, 'mov_total'),
+            cell("TOTAL", 'mov_total_label'),
+            cell(total_contract, 'mov_total_currency'),
+            cell(total_spent, 'mov_total_currency'),
+            cell(total_contract - total_spent, 'mov_total_currency'),
+            cell(total_spent / total_contract if total_contract > 0 else 0, 'mov_total_percent'),
+            cell(None, 'mov_total'),
+            cell(sum(counts.get(company['code'], 0) for company in companies), 'mov_total'),
+            cell(None, 'mov_total')
+        ])
+
     def export_company_expenses(self, company_name: str, company_code: str, 
                                contract_value: float, spent_value: float,
-                               expenses: List[Dict[str, Any]]) -> str:
+                               expenses: List[Dict[str, Any]]) -> Optional[IO[bytes]]:
         """
         Exporta lançamentos de uma empresa para Excel
+
+        As linhas são gravadas em modo streaming (write-only) e o arquivo é
+        gerado direto em um buffer, sem passar pela pasta downloads/.
         
         Args:
             company_name: Nome da empresa
             company_code: Código da empresa
             contract_value: Valor total do contrato
             spent_value: Valor gasto
-            expenses: Lista de lançamentos
+            expenses: Lista (ou iterável) de lançamentos
             
         Returns:
-            Caminho do arquivo gerado
+            Buffer posicionado no início com o conteúdo .xlsx, ou None em caso de erro
         """
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Movimentos"
-
-            # Configurar largura das colunas
-            ws.column_dimensions['A'].width = 12
-            ws.column_dimensions['B'].width = 25
-            ws.column_dimensions['C'].width = 15
-            ws.column_dimensions['D'].width = 15
-            ws.column_dimensions['E'].width = 20
-            ws.column_dimensions['F'].width = 20
-            ws.column_dimensions['G'].width = 20
-
-            # Cabeçalho com informações da empresa
-            header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-
-            ws['A1'] = "RELATÓRIO DE MOVIMENTOS"
-            ws['A1'].font = Font(bold=True, size=14, color="1F4E78")
-            ws.merge_cells('A1:F1')
-
-            ws['A2'] = f"Empresa: {company_name}"
-            ws['A2'].font = Font(bold=True, size=11)
-            ws.merge_cells('A2:F2')
-
-            ws['A3'] = f"Código: {company_code}"
-            ws['A3'].font = Font(size=10)
-            ws.merge_cells('A3:F3')
-
-            # Informações financeiras
-            ws['A4'] = "Data do Relatório:"
-            ws['B4'] = datetime.now().strftime('%d/%m/%Y %H:%M')
-            ws['A4'].font = Font(bold=True)
-
-            ws['A5'] = "Valor do Contrato:"
-            ws['B5'] = contract_value
-            ws['B5'].number_format = 'R$ #,##0.00'
-            ws['A5'].font = Font(bold=True)
-
-            ws['A6'] = "Valor Gasto:"
-            ws['B6'] = spent_value
-            ws['B6'].number_format = 'R$ #,##0.00'
-            ws['A6'].font = Font(bold=True)
-
-            available = contract_value - spent_value
-            ws['A7'] = "Valor Disponível:"
-            ws['B7'] = available
-            ws['B7'].number_format = 'R$ #,##0.00'
-            ws['A7'].font = Font(bold=True)
-
-            percentage = (spent_value / contract_value * 100) if contract_value > 0 else 0
-            ws['A8'] = "Percentual Utilizado:"
-            ws['B8'] = percentage / 100
-            ws['B8'].number_format = '0.00%'
-            ws['A8'].font = Font(bold=True)
-
-            # Cabecalho da tabela
-            row = 10
-            headers = ['Data', 'Descricao', 'Categoria', 'Valor', 'Quem Registrou', 'Observacoes', 'Data de Criacao']
-            
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row, column=col)
-                cell.value = header
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = self.thin_border
-
-            # Dados dos lancamentos
-            row = 11
-            for expense in expenses:
-                ws.cell(row=row, column=1).value = expense.get('expense_date', '')
-                ws.cell(row=row, column=2).value = expense.get('description', '')
-                ws.cell(row=row, column=3).value = expense.get('category', '')
-                ws.cell(row=row, column=4).value = expense.get('amount', 0)
-                ws.cell(row=row, column=5).value = expense.get('created_by', 'N/A')
-                ws.cell(row=row, column=6).value = expense.get('notes', '')
-                ws.cell(row=row, column=7).value = expense.get('created_at', '')
-
-                # Formatar valores monetários
-                ws.cell(row=row, column=4).number_format = 'R$ #,##0.00'
-
-                # Aplicar bordas
-                for col in range(1, 7):
-                    ws.cell(row=row, column=col).border = self.thin_border
-                    ws.cell(row=row, column=col).alignment = Alignment(horizontal='left', vertical='center')
-
-                row += 1
-
-            # Rodapé com totalizações
-            if expenses:
-                total_row = row + 1
-                ws.cell(row=total_row, column=2).value = "TOTAL"
-                ws.cell(row=total_row, column=2).font = Font(bold=True)
-                ws.cell(row=total_row, column=4).value = sum(e.get('amount', 0) for e in expenses)
-                ws.cell(row=total_row, column=4).font = Font(bold=True)
-                ws.cell(row=total_row, column=4).number_format = 'R$ #,##0.00'
-
-                for col in range(1, 7):
-                    ws.cell(row=total_row, column=col).border = self.thin_border
-                    ws.cell(row=total_row, column=col).fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
-
-            # Salvar arquivo
-            filename = f"Movimentos_{company_code}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            filepath = f"downloads/{filename}"
-            
-            # Criar pasta downloads se não existir
-            import os
-            os.makedirs('downloads', exist_ok=True)
-            
-            wb.save(filepath)
-            logger.info(f"Arquivo exportado: {filepath}")
-            
-            return filepath
+            wb = self._new_workbook()
+            ws = wb.create_sheet("Movimentos")
+            count = self._write_movements(ws, company_name, company_code, contract_value, spent_value,
+                                          expenses, datetime.now().strftime('%d/%m/%Y %H:%M'))
+
+            # Gerar o arquivo em memória (ou temporário anônimo, se ficar grande)
+            output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            wb.save(output)
+            output.seek(0)
+            logger.info(f"Arquivo exportado: {company_code} ({count} lançamentos)")
+
+            return output
 
         except Exception as e:
             logger.error(f"Erro ao exportar para Excel: {e}")
             import traceback
             traceback.print_exc()
             return None
+
+    def export_all_companies(self, companies: List[Dict[str, Any]],
+                             expenses_by_company: Dict[str, List[Dict[str, Any]]],
+                             statistics: Dict[str, Any]) -> Optional[IO[bytes]]:
+        """
+        Exporta um único workbook com a aba de resumo e uma aba de movimentos por empresa
+
+        Com ``workers`` > 1, as abas das empresas são montadas em lotes nos
+        processos do pool; o workbook final é gravado com abas vazias no lugar
+        delas, que depois são trocadas pelo XML gerado nos processos.
+
+        Args:
+            companies: Empresas publicadas (com ajustes aplicados)
+            expenses_by_company: Código -> lançamentos da empresa
+            statistics: Estatísticas gerais
+
+        Returns:
+            Buffer posicionado no início com o conteúdo .xlsx, ou None em caso de erro
+        """
+        try:
+            generated_at = datetime.now().strftime('%d/%m/%Y %H:%M')
+            titles = sheet_titles(companies)
+            counts = {code: len(expenses) for code, expenses in expenses_by_company.items()}
+            parallel = self.workers > 1 and len(companies) > 1
+
+            wb = self._new_workbook()
+            summary = wb.create_sheet(SUMMARY_TITLE)
+            self._prime_styles(summary)
+            self._write_summary(summary, companies, titles, counts, statistics, generated_at)
+
+            items = [{
+                'title': title,
+                'name': company['name'],
+                'code': company['code'],
+                'contract_value': company.get('contract_value', 0) or 0,
+                'spent_value': company.get('spent_value', 0) or 0,
+                'expenses': expenses_by_company.get(company['code'], [])
+            } for company, title in zip(companies, titles)]
+
+            futures = []
+            if parallel:
+                # Lotes menores que o total por processo, para dividir melhor empresas grandes e pequenas
+                size = max(1, math.ceil(len(items) / (self.workers * 4)))
+                futures = [self._get_pool().submit(build_company_sheets, items[i:i + size], generated_at)
+                           for i in range(0, len(items), size)]
+
+            sheets = []
+            for item in items:
+                ws = wb.create_sheet(item['title'])
+                sheets.append(ws)
+                if not parallel:
+                    self._write_movements(ws, item['name'], item['code'], item['contract_value'],
+                                          item['spent_value'], item['expenses'], generated_at)
+
+            output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            wb.save(output)
+            output.seek(0)
+
+            if parallel:
+                parts = [xml for future in futures for xml in future.result()]
+                output = self._replace_parts(output, {ws.path[1:]: xml for ws, xml in zip(sheets, parts)})
+
+            logger.info(f"Exportação consolidada: {len(companies)} empresas, "
+                        f"{sum(counts.values())} lançamentos")
+            return output
+
+        except Exception as e:
+            logger.error(f"Erro na exportação consolidada: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    @staticmethod
+    def _replace_parts(source: IO[bytes], parts: Dict[str, bytes]) -> IO[bytes]:
+        """Copia o .xlsx trocando o conteúdo das partes informadas (caminho no zip -> bytes)"""
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        with zipfile.ZipFile(source) as src, zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                data = parts.get(info.filename)
+                dst.writestr(info, data if data is not None else src.read(info))
+        source.close()
+        output.seek(0)
+        return output
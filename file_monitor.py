@@ -1,18 +1,145 @@
 import os
+import sys
 import time
+import select
+import struct
+import fnmatch
 import threading
 import logging
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
+class PollingBackend:
+    """Detecta mudanças verificando a pasta periodicamente (qualquer sistema de arquivos)"""
+
+    name = 'polling'
+    # Sem notificação de fechamento, é preciso confirmar que o arquivo parou de mudar
+    needs_stability_check = True
+
+    def __init__(self, folder_path: Path, pattern: str):
+        self.folder_path = folder_path
+        self.pattern = pattern
+
+    def wait(self, timeout: float) -> bool:
+        """Aguarda o próximo ciclo; sempre pede nova verificação"""
+        time.sleep(timeout)
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Detecta mudanças via inotify (Linux): reage a close-write e rename na hora"""
+
+    name = 'inotify'
+    needs_stability_check = False
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_IGNORED = 0x00008000
+    IN_Q_OVERFLOW = 0x00004000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    _EVENT = struct.Struct('iIII')
+    _WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, folder_path: Path, pattern: str):
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify disponível apenas no Linux")
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.folder_path = folder_path
+        self.pattern = pattern
+
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Falha em inotify_init1")
+
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(str(folder_path)), self._WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Falha em inotify_add_watch: {folder_path}")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Aguarda eventos da pasta
+
+        Returns:
+            True se algum arquivo do padrão foi gravado, renomeado ou removido
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        relevant = False
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buffer:
+                break
+
+            offset = 0
+            while offset + self._EVENT.size <= len(buffer):
+                _, mask, _, length = self._EVENT.unpack_from(buffer, offset)
+                offset += self._EVENT.size
+                name = buffer[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+
+                if mask & (self.IN_DELETE_SELF | self.IN_IGNORED):
+                    raise OSError(f"Pasta monitorada removida: {self.folder_path}")
+                if mask & self.IN_Q_OVERFLOW or fnmatch.fnmatch(name, self.pattern):
+                    relevant = True
+
+        return relevant
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+def create_backend(name: str, folder_path: Path, pattern: str):
+    """
+    Cria o backend de detecção de mudanças
+
+    Args:
+        name: 'auto' (inotify quando disponível), 'inotify' ou 'polling'
+        folder_path: Pasta monitorada
+        pattern: Padrão de arquivo
+
+    Returns:
+        Instância do backend; cai para polling se o inotify não puder ser usado
+    """
+    if name in ('auto', 'inotify'):
+        try:
+            return InotifyBackend(folder_path, pattern)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify indisponível ({e}), usando polling")
+    return PollingBackend(folder_path, pattern)
+
+
 class FileMonitor:
     """Monitor de arquivo Excel com detecção de mudanças"""
 
-    def __init__(self, folder_path: str, pattern: str = "*.xlsm", check_interval: int = 2):
+    def __init__(self, folder_path: str, pattern: str = "*.xlsm", check_interval: int = 2,
+                 backend: str = "auto", rescan_interval: int = 60):
         """
         Inicializa o monitor
 
@@ -20,10 +147,15 @@ class FileMonitor:
             folder_path: Caminho da pasta a monitorar
             pattern: Padrão de arquivo (ex: *.xlsm)
             check_interval: Intervalo de verificação em segundos
+            backend: 'auto', 'inotify' ou 'polling'
+            rescan_interval: Com inotify, intervalo (s) da verificação completa de segurança
         """
         self.folder_path = Path(folder_path)
         self.pattern = pattern
         self.check_interval = check_interval
+        self.backend_name = backend
+        self.rescan_interval = rescan_interval
+        self.backend = None
         self.is_running = False
         self.thread: Optional[threading.Thread] = None
         self.on_file_changed: Optional[Callable] = None
@@ -45,11 +177,12 @@ class FileMonitor:
             return False
 
         self.on_file_changed = on_file_changed
+        self.backend = create_backend(self.backend_name, self.folder_path, self.pattern)
         self.is_running = True
         self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.thread.start()
 
-        logger.info(f"Monitor iniciado para: {self.folder_path}")
+        logger.info(f"Monitor iniciado para: {self.folder_path} ({self.backend.name})")
         return True
 
     def stop(self):
@@ -57,42 +190,65 @@ class FileMonitor:
         self.is_running = False
         if self.thread:
             self.thread.join(timeout=5)
+        if self.backend:
+            self.backend.close()
         logger.info("Monitor parado")
 
     def _monitor_loop(self):
         """Loop de monitoramento"""
+        self._check_file()
+        last_scan = time.monotonic()
+
         while self.is_running:
             try:
-                self._check_file()
-                time.sleep(self.check_interval)
+                changed = self.backend.wait(self.check_interval)
+                stable = not self.backend.needs_stability_check
+
+                # Verificação completa periódica caso eventos se percam (ex.: pastas de rede)
+                if not changed and time.monotonic() - last_scan >= self.rescan_interval:
+                    changed, stable = True, False
+
+                if changed:
+                    self._check_file(stable=stable)
+                    last_scan = time.monotonic()
+            except OSError as e:
+                logger.warning(f"Backend {self.backend.name} falhou ({e}), usando polling")
+                self.backend.close()
+                self.backend = PollingBackend(self.folder_path, self.pattern)
             except Exception as e:
                 logger.error(f"Erro no monitor: {e}")
                 time.sleep(self.check_interval)
 
-    def _check_file(self):
-        """Verifica se o arquivo foi modificado"""
+    def _check_file(self, stable: bool = False):
+        """
+        Verifica se o arquivo foi modificado
+
+        Args:
+            stable: True quando o evento já garante que a gravação terminou
+                (close-write/rename), dispensando a espera de estabilidade
+        """
         try:
-            # Procurar arquivo que corresponde ao padrão
-            files = list(self.folder_path.glob(self.pattern))
+            # Procurar arquivo que corresponde ao padrão (um stat por arquivo)
+            candidates = []
+            for path in self.folder_path.glob(self.pattern):
+                try:
+                    candidates.append((path.stat().st_mtime, path))
+                except OSError:
+                    # Arquivo pode estar sendo acessado ou já foi removido
+                    continue
 
-            if not files:
+            if not candidates:
                 logger.debug(f"Nenhum arquivo encontrado com padrão {self.pattern}")
                 return
 
             # Usar o arquivo mais recente
-            latest_file = max(files, key=lambda p: p.stat().st_mtime)
-
-            # Verificar se é um arquivo novo ou foi modificado
-            try:
-                current_mtime = latest_file.stat().st_mtime
-            except OSError:
-                # Arquivo pode estar sendo acessado
-                return
+            current_mtime, latest_file = max(candidates, key=lambda c: c[0])
 
             # Se é um arquivo novo ou foi modificado
             if latest_file != self.current_file or current_mtime != self.last_modified_time:
-                # Aguardar um pouco para garantir que o arquivo foi completamente salvo
-                time.sleep(1)
+                if not stable:
+                    # Aguardar um pouco para garantir que o arquivo foi completamente salvo
+                    time.sleep(1)
 
                 # Verificar novamente se o arquivo não está sendo modificado
                 try:
@@ -114,3 +270,55 @@ class FileMonitor:
     def get_current_file(self) -> Optional[str]:
         """Retorna o caminho do arquivo atual"""
         return str(self.current_file) if self.current_file else None
+
+
+class MultiFileMonitor:
+    """Monitora várias pastas/planilhas (uma por departamento), com um FileMonitor por fonte"""
+
+    def __init__(self, sources: List[Dict[str, str]], check_interval: int = 2,
+                 backend: str = "auto", rescan_interval: int = 60):
+        """
+        Args:
+            sources: Lista de {"name", "folder", "pattern"}
+            check_interval: Intervalo de verificação em segundos
+            backend: 'auto', 'inotify' ou 'polling'
+            rescan_interval: Com inotify, intervalo (s) da verificação completa de segurança
+        """
+        self.monitors: Dict[str, FileMonitor] = {}
+        for source in sources:
+            self.monitors[source['name']] = FileMonitor(
+                source['folder'], source.get('pattern', '*.xlsm'), check_interval, backend, rescan_interval)
+
+    def start(self, on_file_changed: Callable) -> bool:
+        """
+        Inicia o monitoramento de todas as fontes
+
+        Returns:
+            True se ao menos uma fonte iniciou
+        """
+        started = False
+        for name, monitor in self.monitors.items():
+            if monitor.start(on_file_changed):
+                started = True
+            else:
+                logger.error(f"Fonte '{name}' não monitorada")
+        return started
+
+    def stop(self):
+        """Para o monitoramento de todas as fontes"""
+        for monitor in self.monitors.values():
+            if monitor.is_running:
+                monitor.stop()
+
+    def get_current_files(self) -> Dict[str, str]:
+        """Retorna nome da fonte -> caminho da planilha atual (só fontes com arquivo)"""
+        files = {}
+        for name, monitor in self.monitors.items():
+            file_path = monitor.get_current_file()
+            if file_path:
+                files[name] = file_path
+        return files
+
+    def get_current_file(self) -> Optional[str]:
+        """Retorna a planilha atual da primeira fonte que tem arquivo"""
+        return next(iter(self.get_current_files().values()), None)
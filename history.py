@@ -0,0 +1,131 @@
+"""
+Histórico de gasto e percentual das empresas, gravado a cada versão publicada
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Sufixos aceitos em ``step`` (ex.: 15m, 1h, 1d); sem sufixo = segundos
+STEP_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_step(value: str) -> int:
+    """Converte '90', '15m', '1h', '1d'... em segundos (ValueError se inválido)"""
+    value = value.strip().lower()
+    unit = STEP_UNITS.get(value[-1:]) if value else None
+    number = int(value[:-1] if unit else value)
+    seconds = number * (unit or 1)
+    if seconds <= 0:
+        raise ValueError('step deve ser positivo')
+    return seconds
+
+
+def parse_time(value: str) -> int:
+    """Converte data ou data/hora ISO (horário local) em segundos (ValueError se inválido)"""
+    return int(datetime.fromisoformat(value.strip()).timestamp())
+
+
+class HistoryRecorder:
+    """Grava no banco só as empresas cujos valores mudaram desde o último ponto"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Database onde o histórico é gravado
+        """
+        self.db = db
+        # Código -> (contrato, gasto, percentual) do último ponto gravado
+        self._last: Optional[Dict[str, Tuple]] = None
+        self._lock = threading.Lock()
+
+    def record(self, delta: Dict[str, Any], timestamp: Optional[float] = None) -> int:
+        """
+        Grava os pontos de uma publicação
+
+        Args:
+            delta: Delta retornado por ``SnapshotStore.publish``
+            timestamp: Momento da publicação (padrão: agora)
+
+        Returns:
+            Quantidade de pontos gravados
+        """
+        recorded_at = int(timestamp if timestamp is not None else time.time())
+
+        with self._lock:
+            if self._last is None:
+                self._last = self.db.get_latest_history()
+
+            rows = []
+            for company in delta['added'] + delta['changed']:
+                values = (company.get('contract_value'), company.get('spent_value'),
+                          company.get('percentage'))
+                if self._last.get(company['code']) != values:
+                    rows.append((company['code'], recorded_at) + values)
+            for code in delta['removed']:
+                if self._last.get(code, (None, None, None)) != (None, None, None):
+                    rows.append((code, recorded_at, None, None, None))
+
+            if rows and self.db.add_history(rows):
+                for row in rows:
+                    self._last[row[0]] = row[2:]
+
+        if rows:
+            logger.debug(f"Histórico: {len(rows)} pontos gravados")
+        return len(rows)
+
+    def series(self, company_code: str, start: int, end: int,
+               step: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Série de uma empresa com um ponto por intervalo (último valor conhecido)
+
+        Cada ponto leva o fim do seu intervalo como ``time`` (o último, ``end``).
+
+        Args:
+            company_code: Código da empresa
+            start: Início em segundos (epoch)
+            end: Fim em segundos (epoch)
+            step: Intervalo em segundos; aumentado para no máximo
+                ``config.HISTORY_MAX_POINTS`` pontos (None = só esse limite)
+
+        Returns:
+            {'company_code', 'from', 'to', 'step', 'points'}, cada ponto com
+            time, contract_value, spent_value e percentage
+        """
+        span = max(end - start, 1)
+        step = max(step or 1, math.ceil(span / config.HISTORY_MAX_POINTS))
+
+        # Intervalos [start + i*step, start + (i+1)*step); ``end`` entra no último
+        buckets = max(math.ceil(span / step), 1)
+        values_by_bucket = {}
+        for row in self.db.get_history(company_code, start, end, step):
+            values_by_bucket[min(row[0], buckets - 1)] = row[2:]
+
+        points = []
+        current = values_by_bucket.get(-1)
+        for bucket in range(buckets):
+            current = values_by_bucket.get(bucket, current)
+            # Antes do primeiro ponto (ou com a empresa removida) não há valor
+            if current is None or current[1] is None:
+                continue
+            points.append({
+                'time': datetime.fromtimestamp(min(start + (bucket + 1) * step, end)).isoformat(),
+                'contract_value': current[0],
+                'spent_value': current[1],
+                'percentage': current[2]
+            })
+
+        return {
+            'company_code': company_code,
+            'from': datetime.fromtimestamp(start).isoformat(),
+            'to': datetime.fromtimestamp(end).isoformat(),
+            'step': step,
+            'points': points
+        }
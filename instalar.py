@@ -8,7 +8,8 @@ packages = [
     'python-engineio==4.8.0',
     'openpyxl==3.1.2',
     'Werkzeug==3.0.1',
-    'PyJWT==2.11.0'
+    'PyJWT==2.11.0',
+    'gevent==26.9.0'
 ]
 
 print("=" * 60)
@@ -0,0 +1,225 @@
+"""
+Teste de carga: muitos clientes SocketIO conectados ao dashboard
+
+Abre N clientes simulados contra um servidor já em execução e mede a
+latência de conexão (até o primeiro 'update' com os dados completos) e o
+tempo de propagação de cada atualização até todos os clientes. As
+atualizações podem vir de fora (planilha salva) ou ser disparadas com
+--updates, regravando o ajuste de uma empresa com os mesmos valores.
+
+Precisa do cliente do python-socketio:
+    pip install "python-socketio[client]"
+
+Uso:
+    python app.py                      # em outro terminal
+    python loadtest.py --clients 300 --updates 5 --output carga.json
+    python loadtest.py --url http://127.0.0.1:5000 --clients 100 --duration 60
+    python loadtest.py --clients 300 --updates 5 --rooms summary
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import requests
+    import socketio
+except ImportError:  # pragma: no cover
+    print('Instale o cliente: pip install "python-socketio[client]"', file=sys.stderr)
+    raise
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, float]]:
+    """Mínimo, mediana, p95 e máximo em milissegundos"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 1),
+        'median_ms': round(statistics.median(ordered) * 1000, 1),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1)
+    }
+
+
+class SimulatedClient:
+    """Cliente que registra quando recebeu cada versão dos dados"""
+
+    def __init__(self, url: str, transport: str, rooms: Optional[List[str]] = None):
+        self.url = url
+        self.transport = transport
+        self.rooms = rooms
+        self.client = socketio.Client(reconnection=False)
+        self.first_update = threading.Event()
+        self.connect_seconds: Optional[float] = None
+        # Versão -> (momento do recebimento, last_update publicado pelo servidor)
+        self.received: Dict[int, tuple] = {}
+        self.errors = 0
+        self.client.on('update', self._on_data)
+        self.client.on('delta', self._on_data)
+        self.client.on('summary', self._on_data)
+
+    def _on_data(self, data):
+        now = time.time()
+        if not self.first_update.is_set():
+            self.first_update.set()
+        if isinstance(data, dict) and data.get('version'):
+            self.received.setdefault(data['version'], (now, data.get('last_update')))
+
+    def connect(self, timeout: float) -> bool:
+        started = time.perf_counter()
+        try:
+            self.client.connect(self.url, transports=[self.transport], wait_timeout=timeout,
+                                auth={'rooms': self.rooms} if self.rooms else None)
+        except Exception:
+            self.errors += 1
+            return False
+        if not self.first_update.wait(timeout):
+            self.errors += 1
+            return False
+        self.connect_seconds = time.perf_counter() - started
+        return True
+
+    def disconnect(self):
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+
+def trigger_update(url: str, company_code: str) -> Optional[int]:
+    """
+    Pede um recálculo regravando o ajuste da empresa com os mesmos valores
+
+    Returns:
+        Versão que vai conter a mudança (informada pelo servidor)
+    """
+    current = requests.get(f'{url}/api/company/adjustment',
+                           params={'company_code': company_code}, timeout=10).json()
+    payload = {
+        'company_code': company_code,
+        'company_name': current.get('company_name') or company_code,
+        'contract_value': current.get('contract_value'),
+        'spent_value': current.get('spent_value'),
+        'reason': current.get('reason') or 'teste de carga'
+    }
+    response = requests.post(f'{url}/api/company/adjustment', json=payload, timeout=10).json()
+    return response.get('version')
+
+
+def run(args) -> Dict[str, Any]:
+    """Conecta os clientes, aguarda/dispara atualizações e consolida as medições"""
+    rooms = args.rooms.split(',') if args.rooms else None
+    clients = [SimulatedClient(args.url, args.transport, rooms) for _ in range(args.clients)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        connected = list(pool.map(lambda c: c.connect(args.timeout), clients))
+    connect_wall = time.perf_counter() - started
+    active = [c for c, ok in zip(clients, connected) if ok]
+    print(f"{len(active)}/{len(clients)} clientes conectados em {connect_wall:.2f}s", file=sys.stderr)
+
+    # Versões disparadas aqui: momento do pedido, para medir do POST até o cliente
+    triggered: Dict[int, float] = {}
+    try:
+        if args.updates and active:
+            company_code = args.company or requests.get(
+                f'{args.url}/api/companies', params={'limit': 1}, timeout=10).json()['companies'][0]['code']
+            for _ in range(args.updates):
+                requested = time.time()
+                version = trigger_update(args.url, company_code)
+                if version:
+                    triggered.setdefault(version, requested)
+                time.sleep(args.interval)
+            # Aguardar a última versão chegar
+            deadline = time.time() + args.timeout
+            last = max(triggered) if triggered else 0
+            while time.time() < deadline and any(last not in c.received for c in active):
+                time.sleep(0.1)
+        else:
+            time.sleep(args.duration)
+    finally:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(SimulatedClient.disconnect, clients))
+
+    # Versões recebidas depois da conexão (a primeira de cada cliente é a carga inicial)
+    initial = {c: min(c.received) for c in active if c.received}
+    versions = sorted({v for c in active for v in c.received if v > initial.get(c, v)})
+
+    publish_to_client: List[float] = []
+    request_to_client: List[float] = []
+    per_version = []
+    for version in versions:
+        receipts = [c.received[version] for c in active if version in c.received]
+        arrivals = [at for at, _ in receipts]
+        published = receipts[0][1]
+        if published:
+            published_at = datetime.fromisoformat(published).timestamp()
+            publish_to_client.extend(at - published_at for at in arrivals)
+        if version in triggered:
+            request_to_client.extend(at - triggered[version] for at in arrivals)
+        per_version.append({
+            'version': version,
+            'clients': len(arrivals),
+            # Tempo entre o primeiro e o último cliente receberem a versão
+            'spread_ms': round((max(arrivals) - min(arrivals)) * 1000, 1)
+        })
+
+    return {
+        'parameters': {
+            'url': args.url,
+            'clients': args.clients,
+            'transport': args.transport,
+            'rooms': args.rooms or 'all',
+            'concurrency': args.concurrency,
+            'updates': args.updates
+        },
+        'connected': len(active),
+        'connect_errors': sum(c.errors for c in clients),
+        'connect_wall_seconds': round(connect_wall, 3),
+        'connect_latency': summarize([c.connect_seconds for c in active]),
+        # Do publish no servidor até o cliente (servidor e teste na mesma máquina)
+        'propagation': summarize(publish_to_client),
+        # Do pedido de recálculo até o cliente (inclui o debounce do refresh_worker)
+        'request_to_client': summarize(request_to_client),
+        'versions': per_version
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Endereço do dashboard')
+    parser.add_argument('--clients', type=int, default=200, help='Clientes simulados')
+    parser.add_argument('--concurrency', type=int, default=20, help='Conexões abertas ao mesmo tempo')
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    parser.add_argument('--rooms', help='Salas dos clientes, separadas por vírgula (ex.: summary,status:critical; '
+                                        'padrão: all, recebe tudo)')
+    parser.add_argument('--updates', type=int, default=0,
+                        help='Atualizações a disparar (0 = só observar durante --duration)')
+    parser.add_argument('--interval', type=float, default=2.0, help='Espera (s) entre atualizações disparadas')
+    parser.add_argument('--company', help='Empresa cujo ajuste é regravado (padrão: a primeira da lista)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Tempo (s) observando sem disparar')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Espera máxima (s) por conexão e entrega')
+    parser.add_argument('--output', help='Arquivo JSON de saída')
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+
+    return 0 if result['connected'] == args.clients else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
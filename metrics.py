@@ -0,0 +1,220 @@
+"""
+Métricas internas (contadores, medidores e histogramas) no formato texto do Prometheus
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Limites padrão dos histogramas de latência (em segundos)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    """Escapa valor de label conforme o formato de exposição"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Base: guarda valores por combinação de labels"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        """Linhas de amostra no formato de exposição"""
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Contador que só aumenta"""
+
+    type_name = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Gauge(_Metric):
+    """Medidor que pode subir e descer, ou ser calculado na leitura"""
+
+    type_name = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Calcula o valor no momento da coleta (somente para medidores sem labels)"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            yield f'{self.name} {_format_value(self._function())}'
+            return
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo (latências)"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # labels -> [contagem por faixa..., soma, total]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco ``with``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels):
+        """Decorador que mede cada chamada da função"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(state[-1]) if state else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_format_value(state[-2])}'
+            yield f'{self.name}_count{labels} {int(state[-1])}'
+
+
+class Registry:
+    """Conjunto de métricas expostas em /api/metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Gera o texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Registro usado pela aplicação
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,106 @@
+"""
+Thread de recálculo dos dados com agrupamento (debounce) de pedidos próximos
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshWorker:
+    """Executa o recálculo em segundo plano, juntando rajadas de pedidos em uma única execução"""
+
+    def __init__(self, refresh: Callable[[], None], current_version: Callable[[], int],
+                 debounce: float = 0.3, max_delay: float = 2.0):
+        """
+        Args:
+            refresh: Função que recalcula e publica uma nova versão dos dados
+            current_version: Função que retorna a versão publicada atual
+            debounce: Espera (s) por novos pedidos antes de recalcular
+            max_delay: Espera máxima (s) desde o primeiro pedido pendente,
+                mesmo que continuem chegando pedidos
+        """
+        self.refresh = refresh
+        self.current_version = current_version
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._pending = False
+        self._pending_version = 0
+        self._first_request = 0.0
+        self._last_request = 0.0
+        self._running = False
+        self._running_version = 0
+
+    def start(self) -> None:
+        """Inicia a thread (chamadas repetidas não têm efeito)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name='refresh-worker', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Para a thread após o recálculo em andamento"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def request(self) -> int:
+        """
+        Pede um recálculo
+
+        Returns:
+            Versão dos dados que vai refletir as mudanças feitas antes deste pedido
+        """
+        self.start()
+
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._pending = True
+                self._first_request = now
+                # Se há um recálculo rodando, ele pode não ver esta mudança: vale o próximo
+                base = self._running_version if self._running else self.current_version()
+                self._pending_version = base + 1
+            self._last_request = now
+            self._cond.notify_all()
+            return self._pending_version
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+
+                # Aguardar a rajada terminar (ou o limite máximo de espera)
+                while not self._stopped:
+                    deadline = min(self._last_request + self.debounce,
+                                   self._first_request + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                self._pending = False
+                self._running = True
+                self._running_version = self._pending_version
+
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Erro no recálculo em segundo plano: {e}")
+            finally:
+                with self._cond:
+                    self._running = False
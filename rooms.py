@@ -0,0 +1,178 @@
+"""
+Salas de inscrição dos clientes SocketIO e roteamento de cada mudança só para as salas afetadas
+
+Salas:
+    all              delta completo a cada versão (padrão, comportamento anterior)
+    summary          só versão e estatísticas (evento 'summary')
+    company:<código> mudanças de uma empresa (evento 'companies')
+    status:<status>  empresas que estão (ou saíram) do status ok, warning ou critical
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import logging
+
+import config
+from company_index import STATUSES
+
+logger = logging.getLogger(__name__)
+
+ALL_ROOM = 'all'
+SUMMARY_ROOM = 'summary'
+COMPANY_PREFIX = 'company:'
+STATUS_PREFIX = 'status:'
+
+
+def parse_rooms(rooms: Any) -> Set[str]:
+    """
+    Valida a lista de salas pedida pelo cliente
+
+    Sem 'all', a sala 'summary' é incluída: ela leva a versão de cada
+    publicação, usada pelo cliente para detectar versões perdidas.
+
+    Raises:
+        ValueError: Lista inválida, sala desconhecida ou salas demais
+    """
+    if not isinstance(rooms, (list, tuple)) or not rooms:
+        raise ValueError('rooms deve ser uma lista não vazia')
+    if len(rooms) > config.SUBSCRIPTION_MAX_ROOMS:
+        raise ValueError(f'no máximo {config.SUBSCRIPTION_MAX_ROOMS} salas por cliente')
+
+    parsed = set()
+    for room in rooms:
+        if not isinstance(room, str):
+            raise ValueError(f'sala inválida: {room!r}')
+        if room in (ALL_ROOM, SUMMARY_ROOM):
+            parsed.add(room)
+        elif room.startswith(COMPANY_PREFIX) and len(room) > len(COMPANY_PREFIX):
+            parsed.add(room)
+        elif room.startswith(STATUS_PREFIX) and room[len(STATUS_PREFIX):] in STATUSES:
+            parsed.add(room)
+        else:
+            raise ValueError(f'sala inválida: {room!r}')
+
+    if ALL_ROOM not in parsed:
+        parsed.add(SUMMARY_ROOM)
+    return parsed
+
+
+class RoomRouter:
+    """Guarda as salas de cada cliente e monta os eventos de cada publicação por sala"""
+
+    def __init__(self):
+        # Cliente -> salas; sala -> quantidade de clientes
+        self._rooms_by_sid: Dict[str, Set[str]] = {}
+        self._members: Dict[str, int] = {}
+        # Último status conhecido de cada empresa (para avisar a sala do status anterior)
+        self._status: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, sid: str, rooms: Set[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Troca as salas do cliente
+
+        Returns:
+            (salas a entrar, salas a sair)
+        """
+        with self._lock:
+            previous = self._rooms_by_sid.get(sid, set())
+            self._rooms_by_sid[sid] = set(rooms)
+            joined, left = rooms - previous, previous - rooms
+            for room in joined:
+                self._members[room] = self._members.get(room, 0) + 1
+            for room in left:
+                self._leave(room)
+            return joined, left
+
+    def unsubscribe(self, sid: str) -> None:
+        """Remove o cliente (desconexão)"""
+        with self._lock:
+            for room in self._rooms_by_sid.pop(sid, set()):
+                self._leave(room)
+
+    def _leave(self, room: str) -> None:
+        count = self._members.get(room, 0) - 1
+        if count > 0:
+            self._members[room] = count
+        else:
+            self._members.pop(room, None)
+
+    def rooms_of(self, sid: str) -> Set[str]:
+        """Salas atuais do cliente (padrão: 'all')"""
+        with self._lock:
+            return set(self._rooms_by_sid.get(sid, {ALL_ROOM}))
+
+    def members(self) -> Dict[str, int]:
+        """Clientes por sala"""
+        with self._lock:
+            return dict(self._members)
+
+    def seed(self, companies: Iterable[Dict[str, Any]]) -> None:
+        """Carrega o status das empresas de uma versão restaurada (sem gerar eventos)"""
+        with self._lock:
+            self._status = {company['code']: company.get('status') or 'ok' for company in companies}
+
+    def snapshot_for(self, rooms: Set[str], data: Dict[str, Any]) -> Dict[str, Any]:
+        """Versão atual filtrada para as salas (evento 'update' da inscrição e da ressincronização)"""
+        if ALL_ROOM in rooms:
+            return dict(data, rooms=sorted(rooms))
+
+        codes = {room[len(COMPANY_PREFIX):] for room in rooms if room.startswith(COMPANY_PREFIX)}
+        statuses = {room[len(STATUS_PREFIX):] for room in rooms if room.startswith(STATUS_PREFIX)}
+        companies = [
+            company for company in data['companies']
+            if company['code'] in codes or (company.get('status') or 'ok') in statuses
+        ]
+        return dict(data, companies=companies, rooms=sorted(rooms))
+
+    def route(self, delta: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], str]]:
+        """
+        Monta os eventos de uma publicação, só para salas com clientes
+
+        Ordem: empresas ('companies'), depois 'summary' e o delta completo
+        ('delta', sala 'all'). Assim, quando o resumo da versão chega, as
+        empresas da mesma versão já foram aplicadas.
+
+        Returns:
+            Lista de (evento, payload, sala)
+        """
+        version = delta['version']
+        with self._lock:
+            active = self._members
+            changes: Dict[str, Dict[str, list]] = {}
+
+            def add(room: str, key: str, value: Any) -> None:
+                if room in active:
+                    changes.setdefault(room, {'changed': [], 'removed': []})[key].append(value)
+
+            for company in delta['added'] + delta['changed']:
+                code = company['code']
+                status = company.get('status') or 'ok'
+                previous = self._status.get(code)
+                self._status[code] = status
+
+                add(COMPANY_PREFIX + code, 'changed', company)
+                add(STATUS_PREFIX + status, 'changed', company)
+                if previous is not None and previous != status:
+                    add(STATUS_PREFIX + previous, 'removed', code)
+
+            for code in delta['removed']:
+                previous = self._status.pop(code, None)
+                add(COMPANY_PREFIX + code, 'removed', code)
+                if previous is not None:
+                    add(STATUS_PREFIX + previous, 'removed', code)
+
+            events = [('companies', dict(entry, version=version), room) for room, entry in changes.items()]
+
+            if SUMMARY_ROOM in active:
+                events.append(('summary', {
+                    'version': version,
+                    'base_version': delta['base_version'],
+                    'statistics': delta['statistics'],
+                    'last_update': delta['last_update'],
+                    'file_path': delta['file_path']
+                }, SUMMARY_ROOM))
+            if ALL_ROOM in active:
+                events.append(('delta', delta, ALL_ROOM))
+
+        return events
@@ -0,0 +1,71 @@
+"""
+Escolha do modo do servidor: cooperativo (gevent/eventlet) quando instalado, senão threads
+"""
+
+import importlib
+import logging
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Ordem de preferência no modo "auto" (o eventlet está só em manutenção)
+COOPERATIVE_MODES = ('gevent', 'eventlet')
+
+
+def resolve_async_mode(mode: str = 'auto') -> str:
+    """
+    Retorna o async_mode do Flask-SocketIO a usar
+
+    Args:
+        mode: 'auto', 'gevent', 'eventlet' ou 'threading'
+
+    Returns:
+        O modo pedido, se o pacote estiver instalado; senão 'threading'
+    """
+    if mode == 'threading':
+        return mode
+
+    candidates = COOPERATIVE_MODES if mode == 'auto' else (mode,)
+    for candidate in candidates:
+        try:
+            importlib.import_module(candidate)
+            return candidate
+        except ImportError:
+            if mode != 'auto':
+                logger.warning(f"Modo '{mode}' indisponível ({candidate} não instalado), usando threads")
+    return 'threading'
+
+
+def is_cooperative(async_mode: str) -> bool:
+    """True se o servidor roda em greenlets (um laço de eventos para todos os clientes)"""
+    return async_mode in COOPERATIVE_MODES
+
+
+def monkey_patch(async_mode: str) -> None:
+    """
+    Troca threads, sockets e esperas da biblioteca padrão pelas versões cooperativas
+
+    Precisa rodar antes de qualquer thread ou socket ser criado.
+    """
+    if async_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif async_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def run_blocking(async_mode: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Executa uma chamada bloqueante (ex.: gravação no SQLite) em uma thread do sistema
+
+    No modo cooperativo, o laço de eventos continua atendendo os clientes
+    enquanto ela roda; em threads, apenas chama a função.
+    """
+    if async_mode == 'gevent':
+        from gevent import get_hub
+        return get_hub().threadpool.apply(func, args, kwargs)
+    if async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args, **kwargs)
+    return func(*args, **kwargs)
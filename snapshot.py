@@ -0,0 +1,166 @@
+"""
+Versões dos dados publicados no dashboard e cálculo de diferenças entre elas
+"""
+
+import gzip
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+from company_index import CompanyIndex
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedSnapshot(NamedTuple):
+    """Versão completa já serializada em JSON (e comprimida) para /api/data"""
+    version: int
+    body: bytes
+    gzip: bytes
+
+
+class SnapshotStore:
+    """Mantém a versão atual dos dados e calcula o delta a cada publicação"""
+
+    def __init__(self):
+        self.version = 0
+        self.data: Dict[str, Any] = {
+            'companies': [],
+            'statistics': {},
+            'last_update': None,
+            'file_path': None,
+            'version': 0
+        }
+        self._by_code: Dict[str, Dict[str, Any]] = {}
+        self._encoded: Optional[EncodedSnapshot] = None
+        self._index: Optional[CompanyIndex] = None
+        # Nome -> (versão, artefato) e um lock de geração por artefato
+        self._artifacts: Dict[str, Tuple[int, Any]] = {}
+        self._artifact_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, companies: List[Dict[str, Any]], statistics: Dict[str, Any],
+                file_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Publica uma nova versão dos dados
+
+        Args:
+            companies: Lista de empresas já com ajustes aplicados
+            statistics: Estatísticas gerais
+            file_path: Arquivo de origem (mantém o anterior se None)
+
+        Returns:
+            Delta em relação à versão anterior, com as empresas alteradas,
+            adicionadas e removidas e as novas estatísticas
+        """
+        with self._lock:
+            by_code = {company['code']: company for company in companies}
+
+            changed = []
+            added = []
+            for code, company in by_code.items():
+                previous = self._by_code.get(code)
+                if previous is None:
+                    added.append(company)
+                elif previous != company:
+                    changed.append(company)
+
+            removed = [code for code in self._by_code if code not in by_code]
+
+            base_version = self.version
+            self.version += 1
+            self._by_code = by_code
+
+            self.data['companies'] = companies
+            self.data['statistics'] = statistics
+            self.data['last_update'] = datetime.now().isoformat()
+            self.data['version'] = self.version
+            if file_path is not None:
+                self.data['file_path'] = file_path
+
+            logger.debug(f"Versão {self.version}: {len(changed)} alteradas, "
+                         f"{len(added)} adicionadas, {len(removed)} removidas")
+
+            return {
+                'version': self.version,
+                'base_version': base_version,
+                'changed': changed,
+                'added': added,
+                'removed': removed,
+                'statistics': statistics,
+                'last_update': self.data['last_update'],
+                'file_path': self.data['file_path']
+            }
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Carrega uma versão gravada (reinício do servidor) sem gerar delta
+
+        A numeração continua a partir da versão gravada.
+        """
+        with self._lock:
+            self.version = snapshot['version']
+            self._by_code = {company['code']: company for company in snapshot['companies']}
+            self.data['companies'] = snapshot['companies']
+            self.data['statistics'] = snapshot['statistics']
+            self.data['last_update'] = snapshot.get('last_update')
+            self.data['file_path'] = snapshot.get('file_path')
+            self.data['version'] = self.version
+
+    def full(self) -> Dict[str, Any]:
+        """Retorna a versão atual completa (para conexão inicial ou ressincronização)"""
+        with self._lock:
+            return dict(self.data)
+
+    def encoded(self, dumps: Callable[[Any], str]) -> EncodedSnapshot:
+        """
+        Retorna a versão atual serializada, gerando JSON e gzip uma única vez por versão
+
+        Args:
+            dumps: Função de serialização (a mesma do jsonify)
+        """
+        with self._lock:
+            if self._encoded is None or self._encoded.version != self.version:
+                body = dumps(self.data).encode('utf-8')
+                # mtime=0: mesmo conteúdo gera os mesmos bytes
+                self._encoded = EncodedSnapshot(self.version, body, gzip.compress(body, 6, mtime=0))
+            return self._encoded
+
+    def index(self) -> CompanyIndex:
+        """Retorna os índices de busca/ordenação da versão atual (montados uma vez por versão)"""
+        with self._lock:
+            if self._index is None or self._index.version != self.version:
+                self._index = CompanyIndex(self.data['companies'], self.version)
+            return self._index
+
+    def artifact(self, name: str, build: Callable[[Dict[str, Any]], Any]) -> Tuple[int, Any]:
+        """
+        Retorna um artefato derivado da versão atual (ex.: exportação), gerado uma única vez por versão
+
+        A geração roda fora do lock dos dados, pois pode demorar; pedidos
+        simultâneos do mesmo artefato esperam a primeira geração em vez de
+        repetir o trabalho. Resultado None (erro) não é guardado.
+
+        Args:
+            name: Nome do artefato
+            build: Função que recebe os dados da versão e gera o artefato
+
+        Returns:
+            (versão, artefato)
+        """
+        with self._lock:
+            build_lock = self._artifact_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                cached = self._artifacts.get(name)
+                if cached is not None and cached[0] == self.version:
+                    return cached
+                data = dict(self.data)
+
+            result = (data['version'], build(data))
+            if result[1] is not None:
+                with self._lock:
+                    self._artifacts[name] = result
+            return result
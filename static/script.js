@@ -1,22 +1,41 @@
-// Conectar ao servidor WebSocket
-const socket = io();
+// Conectar ao servidor WebSocket, já inscrito nas salas que esta tela usa
+const socket = io({
+    auth: function(callback) {
+        callback({ rooms: currentRooms() });
+    }
+});
 
 // Estado da aplicacao
 let currentData = {
     companies: [],
     statistics: {},
     last_update: null,
-    file_path: null
+    file_path: null,
+    version: 0
 };
 
+// Empresas visíveis na lista (páginas já carregadas de /api/companies)
 let filteredCompanies = [];
+let totalCompanies = 0;
 let selectedCompany = null;
 
+// Busca, filtro e ordenação são feitos no servidor; a lista carrega uma página por vez
+const PAGE_SIZE = 50;
+let listRequest = 0;
+let listLoading = false;
+let searchTimer = null;
+
+// Callbacks aguardando uma versão dos dados (recálculo é feito em segundo plano)
+let versionWaiters = [];
+
 // Elementos do DOM
 const statusDot = document.getElementById('status-dot');
 const statusLabel = document.getElementById('status-label');
 const lastSync = document.getElementById('last-sync');
 const searchInput = document.getElementById('search-input');
+const statusFilter = document.getElementById('status-filter');
+const sortSelect = document.getElementById('sort-select');
+const tableWrapper = document.querySelector('.table-wrapper');
 const companiesList = document.getElementById('companies-list');
 const tableInfo = document.getElementById('table-info');
 const companiesBadge = document.getElementById('companies-badge');
@@ -33,18 +52,98 @@ socket.on('disconnect', function() {
     updateStatus(false);
 });
 
+// Dados atuais das salas inscritas (conexão, troca de salas ou ressincronização)
 socket.on('update', function(data) {
     console.log('Dados recebidos:', data);
     if (data && typeof data === 'object') {
+        const versionChanged = data.version !== currentData.version;
         currentData = data;
-        updateUI();
+        // Só a troca de salas (mesma versão) não muda a lista
+        if (versionChanged) updateUI();
+        refreshSelectedCompany();
+        runVersionWaiters();
     }
 });
 
+// Empresas inscritas que mudaram (chega antes do resumo da mesma versão)
+socket.on('companies', function(changes) {
+    if (!changes || typeof changes !== 'object') return;
+    applyCompanyChanges(changes);
+    refreshSelectedCompany();
+});
+
+// Resumo de cada nova versão: estatísticas e número da versão
+socket.on('summary', function(summary) {
+    if (!summary || typeof summary !== 'object') return;
+
+    // Versão já conhecida
+    if (summary.version <= (currentData.version || 0)) return;
+
+    // Versão faltando: pedir os dados completos das salas
+    if (summary.base_version !== (currentData.version || 0)) {
+        console.log('Versão fora de sequência, ressincronizando');
+        socket.emit('resync');
+        return;
+    }
+
+    currentData.statistics = summary.statistics || {};
+    currentData.last_update = summary.last_update;
+    currentData.file_path = summary.file_path;
+    currentData.version = summary.version;
+    updateUI();
+    runVersionWaiters();
+});
+
+// Salas desta tela: resumo (estatísticas e lista paginada) e a empresa aberta no modal
+function currentRooms() {
+    const rooms = ['summary'];
+    if (selectedCompany) rooms.push('company:' + selectedCompany.code);
+    return rooms;
+}
+
+// Avisar o servidor quando as salas mudam (abrir/fechar modal)
+function updateSubscription() {
+    if (socket.connected) socket.emit('subscribe', { rooms: currentRooms() });
+}
+
+// Executar callback quando os dados chegarem à versão informada pelo servidor
+function waitForVersion(version, callback) {
+    if (!version || (currentData.version || 0) >= version) {
+        callback();
+        return;
+    }
+    versionWaiters.push({ version: version, callback: callback });
+}
+
+// Disparar callbacks cujas versões já chegaram
+function runVersionWaiters() {
+    const current = currentData.version || 0;
+    const ready = versionWaiters.filter(w => current >= w.version);
+    versionWaiters = versionWaiters.filter(w => current < w.version);
+    ready.forEach(w => w.callback());
+}
+
 socket.on('error', function(error) {
     console.error('Erro:', error);
 });
 
+// Aplicar às empresas inscritas as alterações recebidas
+function applyCompanyChanges(changes) {
+    const byCode = {};
+    (currentData.companies || []).forEach(company => {
+        byCode[company.code] = company;
+    });
+
+    (changes.removed || []).forEach(code => {
+        delete byCode[code];
+    });
+    (changes.changed || []).forEach(company => {
+        byCode[company.code] = company;
+    });
+
+    currentData.companies = Object.values(byCode);
+}
+
 // Atualizar status de conexão
 function updateStatus(connected) {
     if (connected) {
@@ -61,8 +160,8 @@ function updateStatus(connected) {
 // Atualizar interface
 function updateUI() {
     updateStatistics();
-    filterCompanies();
-    renderCompanies();
+    // Recarregar as empresas já visíveis, mantendo a rolagem
+    loadCompanies(false, Math.max(PAGE_SIZE, filteredCompanies.length));
     updateLastSync();
 }
 
@@ -81,24 +180,59 @@ function updateStatistics() {
     if (compCount) compCount.textContent = stats.companies_count || 0;
 }
 
-// Filtrar empresas
-function filterCompanies() {
-    const searchTerm = searchInput.value.toLowerCase();
+// Parâmetros de busca, filtro e ordenação da lista
+function listParams(offset, limit) {
+    const sort = (sortSelect ? sortSelect.value : 'name:asc').split(':');
+    const params = new URLSearchParams({
+        q: searchInput ? searchInput.value : '',
+        sort: sort[0],
+        order: sort[1],
+        offset: offset,
+        limit: limit
+    });
+    if (statusFilter && statusFilter.value) params.set('status', statusFilter.value);
+    return params.toString();
+}
+
+// Buscar empresas no servidor (append = próxima página; senão recomeça do início)
+function loadCompanies(append, limit) {
+    const offset = append ? filteredCompanies.length : 0;
+    const request = ++listRequest;
+    listLoading = true;
 
-    filteredCompanies = (currentData.companies || []).filter(company =>
-        company.name.toLowerCase().includes(searchTerm) ||
-        company.code.toLowerCase().includes(searchTerm)
-    );
+    fetch('/api/companies?' + listParams(offset, limit || PAGE_SIZE))
+        .then(function(response) {
+            if (!response.ok) throw new Error('Erro na resposta');
+            return response.json();
+        })
+        .then(function(result) {
+            // Resposta de uma busca já substituída por outra
+            if (request !== listRequest) return;
+            filteredCompanies = append ? filteredCompanies.concat(result.companies) : result.companies;
+            totalCompanies = result.total;
+            renderCompanies();
+        })
+        .catch(function(error) {
+            console.error('Erro ao carregar empresas:', error);
+        })
+        .finally(function() {
+            if (request === listRequest) listLoading = false;
+        });
+}
 
-    // Ordenar por nome
-    filteredCompanies.sort((a, b) => a.name.localeCompare(b.name));
+// Carregar a próxima página ao chegar perto do fim da lista
+function loadMoreIfNeeded() {
+    if (listLoading || filteredCompanies.length >= totalCompanies) return;
+    if (tableWrapper.scrollTop + tableWrapper.clientHeight >= tableWrapper.scrollHeight - 200) {
+        loadCompanies(true);
+    }
 }
 
 // Renderizar empresas como cards
 function renderCompanies() {
     const badge = document.getElementById('companies-badge');
     if (badge) {
-        badge.textContent = filteredCompanies.length + ' empresa' + (filteredCompanies.length !== 1 ? 's' : '');
+        badge.textContent = totalCompanies + ' empresa' + (totalCompanies !== 1 ? 's' : '');
     }
 
     if (filteredCompanies.length === 0) {
@@ -143,6 +277,7 @@ function openModal(event, companyCode) {
     if (!company) return;
 
     selectedCompany = company;
+    updateSubscription();
     const available = (company.contract_value || 0) - (company.spent_value || 0);
     const percentage = company.percentage || 0;
     const statusText = company.status === 'ok' ? 'Dentro do Orçamento' : 
@@ -186,6 +321,7 @@ function openModal(event, companyCode) {
 function closeModal() {
     detailModal.classList.remove('active');
     selectedCompany = null;
+    updateSubscription();
 }
 
 // Alternar abas
@@ -230,14 +366,8 @@ function saveAdjustment(event) {
     .then(data => {
         if (data.success) {
             alert('Alterações salvas com sucesso!');
-            // Recarregar dados
-            fetch('/api/data')
-                .then(r => r.json())
-                .then(d => {
-                    currentData = d;
-                    updateUI();
-                    closeModal();
-                });
+            // Os dados chegam pelo socket quando o recálculo terminar
+            closeModal();
         } else {
             alert('Erro ao salvar alterações');
         }
@@ -285,44 +415,8 @@ function addExpense(event) {
             // Recarregar lançamentos
             loadExpenses(selectedCompany.code);
             
-            // Recarregar dados da empresa no modal
-            setTimeout(function() {
-                fetch('/api/data')
-                    .then(r => r.json())
-                    .then(d => {
-                        currentData = d;
-                        // Atualizar empresa selecionada
-                        const updatedCompany = currentData.companies.find(c => c.code === selectedCompany.code);
-                        if (updatedCompany) {
-                            selectedCompany = updatedCompany;
-                            const available = (updatedCompany.contract_value || 0) - (updatedCompany.spent_value || 0);
-                            const percentage = updatedCompany.percentage || 0;
-                            
-                            // Atualizar valores no modal
-                            document.getElementById('modal-spent').textContent = formatCurrency(updatedCompany.spent_value || 0);
-                            document.getElementById('modal-available').textContent = formatCurrency(available);
-                            document.getElementById('modal-percentage').textContent = percentage.toFixed(1) + '%';
-                            
-                            // Atualizar progress bar
-                            const progressFill = document.getElementById('modal-progress');
-                            progressFill.style.width = Math.min(percentage, 100) + '%';
-                            progressFill.className = 'progress-fill ' + getStatusClass(percentage);
-                            
-                            // Atualizar status
-                            const statusBadge = document.getElementById('modal-status');
-                            const statusText = updatedCompany.status === 'ok' ? 'Dentro do Orçamento' : 
-                                              updatedCompany.status === 'warning' ? 'Atenção - Acima de 70%' : 
-                                              'Crítico - Acima de 90%';
-                            statusBadge.textContent = statusText;
-                            statusBadge.className = 'status-badge ' + (updatedCompany.status || 'ok');
-                            
-                            // Atualizar lista de empresas
-                            updateStatistics();
-                            filterCompanies();
-                            renderCompanies();
-                        }
-                    });
-            }, 500);
+            // Atualizar empresa no modal quando o recálculo chegar
+            waitForVersion(data.version, refreshSelectedCompany);
         } else {
             alert('Erro ao adicionar lançamento');
         }
@@ -333,6 +427,36 @@ function addExpense(event) {
     });
 }
 
+// Atualizar valores da empresa aberta no modal com os dados atuais
+function refreshSelectedCompany() {
+    if (!selectedCompany) return;
+
+    const updatedCompany = (currentData.companies || []).find(c => c.code === selectedCompany.code);
+    if (!updatedCompany) return;
+
+    selectedCompany = updatedCompany;
+    const available = (updatedCompany.contract_value || 0) - (updatedCompany.spent_value || 0);
+    const percentage = updatedCompany.percentage || 0;
+
+    // Atualizar valores no modal
+    document.getElementById('modal-spent').textContent = formatCurrency(updatedCompany.spent_value || 0);
+    document.getElementById('modal-available').textContent = formatCurrency(available);
+    document.getElementById('modal-percentage').textContent = percentage.toFixed(1) + '%';
+
+    // Atualizar progress bar
+    const progressFill = document.getElementById('modal-progress');
+    progressFill.style.width = Math.min(percentage, 100) + '%';
+    progressFill.className = 'progress-fill ' + getStatusClass(percentage);
+
+    // Atualizar status
+    const statusBadge = document.getElementById('modal-status');
+    const statusText = updatedCompany.status === 'ok' ? 'Dentro do Orçamento' : 
+                      updatedCompany.status === 'warning' ? 'Atenção - Acima de 70%' : 
+                      'Crítico - Acima de 90%';
+    statusBadge.textContent = statusText;
+    statusBadge.className = 'status-badge ' + (updatedCompany.status || 'ok');
+}
+
 // Carregar lançamentos
 function loadExpenses(companyCode) {
     fetch('/api/expenses?company_code=' + companyCode)
@@ -380,30 +504,8 @@ function deleteExpense(expenseId) {
         if (data.success && selectedCompany) {
             loadExpenses(selectedCompany.code);
             
-            // Recarregar dados da empresa
-            fetch('/api/data')
-                .then(r => r.json())
-                .then(d => {
-                    currentData = d;
-                    const updatedCompany = currentData.companies.find(c => c.code === selectedCompany.code);
-                    if (updatedCompany) {
-                        selectedCompany = updatedCompany;
-                        const available = (updatedCompany.contract_value || 0) - (updatedCompany.spent_value || 0);
-                        const percentage = updatedCompany.percentage || 0;
-                        
-                        document.getElementById('modal-spent').textContent = formatCurrency(updatedCompany.spent_value || 0);
-                        document.getElementById('modal-available').textContent = formatCurrency(available);
-                        document.getElementById('modal-percentage').textContent = percentage.toFixed(1) + '%';
-                        
-                        const progressFill = document.getElementById('modal-progress');
-                        progressFill.style.width = Math.min(percentage, 100) + '%';
-                        progressFill.className = 'progress-fill ' + getStatusClass(percentage);
-                        
-                        updateStatistics();
-                        filterCompanies();
-                        renderCompanies();
-                    }
-                });
+            // Atualizar empresa no modal quando o recálculo chegar
+            waitForVersion(data.version, refreshSelectedCompany);
         }
     })
     .catch(error => console.error('Erro:', error));
@@ -491,27 +593,28 @@ function escapeHtml(text) {
 // Event Listeners
 if (searchInput) {
     searchInput.addEventListener('input', function() {
-        filterCompanies();
-        renderCompanies();
+        // Esperar o usuário parar de digitar
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(function() { loadCompanies(false); }, 200);
     });
 }
 
+[statusFilter, sortSelect].forEach(function(select) {
+    if (select) {
+        select.addEventListener('change', function() {
+            tableWrapper.scrollTop = 0;
+            loadCompanies(false);
+        });
+    }
+});
+
+if (tableWrapper) {
+    tableWrapper.addEventListener('scroll', loadMoreIfNeeded);
+}
+
 // Inicializar
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Página carregada');
-    // Solicitar dados iniciais
-    fetch('/api/data')
-        .then(function(response) {
-            if (!response.ok) throw new Error('Erro na resposta');
-            return response.json();
-        })
-        .then(function(data) {
-            if (data && typeof data === 'object') {
-                currentData = data;
-                updateUI();
-            }
-        })
-        .catch(function(error) {
-            console.error('Erro ao carregar dados:', error);
-        });
+    // Primeira página da lista; estatísticas chegam pelo socket ao conectar
+    loadCompanies(false);
 });
@@ -0,0 +1,51 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# create_app abre o banco padrão: usar um temporário, nunca o dashboard.db do repositório
+_DB_DIR = tempfile.mkdtemp(prefix='dashboard_tests_')
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+os.environ['DASHBOARD_DB'] = os.path.join(_DB_DIR, 'dashboard.db')
+
+import pytest
+
+from database import Database
+from history import HistoryRecorder
+from rooms import RoomRouter
+from snapshot import SnapshotStore
+from workbook_set import WorkbookSet
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Banco vazio em um arquivo temporário"""
+    database = Database(str(tmp_path / 'dashboard.db'))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def dashboard(db, monkeypatch):
+    """Módulo app montado por create_app, com banco, versões, salas e planilhas novos a cada teste"""
+    import app as dashboard
+    dashboard.create_app()
+
+    store = SnapshotStore()
+    monkeypatch.setattr(dashboard, 'db', db)
+    monkeypatch.setattr(dashboard, 'history', HistoryRecorder(db))
+    monkeypatch.setattr(dashboard, 'snapshots', store)
+    monkeypatch.setattr(dashboard, 'current_data', store.data)
+    monkeypatch.setattr(dashboard, 'router', RoomRouter())
+    monkeypatch.setattr(dashboard, 'workbooks', WorkbookSet())
+    return dashboard
+
+
+@pytest.fixture
+def client(dashboard):
+    return dashboard.app.test_client()
@@ -0,0 +1,61 @@
+"""
+/api/data servido do buffer da versão: ETag, 304 e gzip
+"""
+
+import gzip
+import json
+
+COMPANIES = [{'code': '100', 'name': 'Alfa', 'contract_value': 1000.0, 'spent_value': 250.0,
+              'percentage': 25.0, 'status': 'ok'}]
+
+
+def test_etag_e_304(dashboard, client):
+    dashboard.snapshots.publish(COMPANIES, {'total_companies': 1})
+    first = client.get('/api/data')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert first.get_json()['companies'] == COMPANIES
+
+    cached = client.get('/api/data', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+    # Nova versão: o ETag antigo deixa de valer
+    dashboard.snapshots.publish(COMPANIES + [dict(COMPANIES[0], code='200')], {'total_companies': 2})
+    fresh = client.get('/api/data', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+    assert len(fresh.get_json()['companies']) == 2
+
+
+def test_gzip_conforme_accept_encoding(dashboard, client):
+    dashboard.snapshots.publish(COMPANIES, {'total_companies': 1})
+
+    compressed = client.get('/api/data', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    body = json.loads(gzip.decompress(compressed.data))
+
+    plain = client.get('/api/data', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_json() == body
+    assert body['version'] == 1
+    # Mesmo ETag nas duas codificações (fraco)
+    assert plain.headers['ETag'] == compressed.headers['ETag']
+
+
+def test_buffer_gerado_uma_vez_por_versao(dashboard, client):
+    dashboard.snapshots.publish(COMPANIES, {'total_companies': 1})
+    calls = []
+
+    def dumps(data):
+        calls.append(data['version'])
+        return json.dumps(data)
+
+    dashboard.snapshots.encoded(dumps)
+    for _ in range(3):
+        client.get('/api/data')
+    assert calls == [1]
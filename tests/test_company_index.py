@@ -0,0 +1,62 @@
+"""
+Busca, filtro, ordenação e paginação de CompanyIndex.query
+"""
+
+from company_index import CompanyIndex
+
+COMPANIES = [
+    {'code': '10450', 'name': 'Águas Claras Saneamento', 'status': 'ok',
+     'contract_value': 5000.0, 'spent_value': 1000.0, 'percentage': 20.0},
+    {'code': '20311', 'name': 'Beta Serviços Gerais', 'status': 'critical',
+     'contract_value': 1000.0, 'spent_value': 990.0, 'percentage': 99.0},
+    {'code': '30450', 'name': 'Construtora Serra Azul', 'status': 'warning',
+     'contract_value': 8000.0, 'spent_value': 6800.0, 'percentage': 85.0},
+    {'code': '40999', 'name': 'Serviços Delta', 'status': 'ok',
+     'contract_value': 2000.0, 'spent_value': 100.0, 'percentage': 5.0},
+]
+
+
+def codes(result):
+    return [company['code'] for company in result['companies']]
+
+
+def test_busca_por_inicio_de_palavra_sem_acento():
+    index = CompanyIndex(COMPANIES, version=7)
+    assert codes(index.query('aguas')) == ['10450']
+    assert codes(index.query('SERV')) == ['20311', '40999']
+    assert codes(index.query('serv delta')) == ['40999']
+    # Meio de palavra do nome não casa
+    assert codes(index.query('rvi')) == []
+    assert index.query('')['total'] == 4
+    assert index.query('aguas')['version'] == 7
+
+
+def test_busca_por_trecho_do_codigo():
+    index = CompanyIndex(COMPANIES)
+    assert codes(index.query('104')) == ['10450']
+    assert codes(index.query('450')) == ['10450', '30450']
+    assert codes(index.query('450 serra')) == ['30450']
+
+
+def test_filtro_por_status_e_contagens():
+    index = CompanyIndex(COMPANIES)
+    result = index.query(statuses=['ok', 'warning'])
+    assert codes(result) == ['10450', '30450', '40999']
+    assert result['total'] == 3
+    # Contagens consideram só a busca, não o filtro de status
+    assert result['counts'] == {'ok': 2, 'warning': 1, 'critical': 1}
+    assert index.query('serv', statuses=['ok'])['counts'] == {'ok': 1, 'warning': 0, 'critical': 1}
+
+
+def test_ordenacao_e_paginacao():
+    index = CompanyIndex(COMPANIES)
+    assert codes(index.query(sort='percentage', descending=True)) == ['20311', '30450', '10450', '40999']
+    assert codes(index.query(sort='contract')) == ['20311', '40999', '10450', '30450']
+
+    page = index.query(sort='spent', offset=1, limit=2)
+    assert codes(page) == ['20311', '10450']
+    assert (page['total'], page['offset'], page['limit']) == (4, 1, 2)
+
+    filtered = index.query(statuses=['ok'], sort='name', descending=True, offset=1, limit=5)
+    assert codes(filtered) == ['10450']
+    assert filtered['total'] == 2
@@ -0,0 +1,46 @@
+"""
+Pool de conexões: erros comuns devolvem a conexão ao pool, conexões quebradas são descartadas
+"""
+
+import sqlite3
+
+import pytest
+
+from database import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=2)
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY)')
+        conn.execute('INSERT INTO t VALUES (1)')
+    yield pool
+    pool.close_all()
+
+
+def test_erro_de_restricao_reaproveita_a_conexao(pool):
+    conn = pool._idle.queue[-1]
+    with pytest.raises(sqlite3.IntegrityError):
+        with pool.connection() as c:
+            c.execute('INSERT INTO t VALUES (2)')
+            c.execute('INSERT INTO t VALUES (1)')
+
+    assert pool._size == 1
+    assert pool.acquire() is conn
+    pool.release(conn)
+
+    # A transação com erro foi desfeita
+    with pool.connection() as c:
+        assert c.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
+
+
+def test_conexao_quebrada_e_descartada(pool):
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection() as c:
+            c.close()
+            c.execute('SELECT 1')
+
+    assert pool._size == 0
+    with pool.connection() as c:
+        assert c.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
@@ -0,0 +1,77 @@
+"""
+Importação em lote (/api/expenses/bulk): JSON e CSV, com linhas válidas e inválidas
+"""
+
+import io
+
+import pytest
+
+
+def post_csv(client, text, filename='lancamentos.csv'):
+    data = {'file': (io.BytesIO(text.encode('utf-8')), filename)}
+    return client.post('/api/expenses/bulk', data=data, content_type='multipart/form-data')
+
+
+def test_json_valido(client, db):
+    response = client.post('/api/expenses/bulk', json={'expenses': [
+        {'codigo': '100', 'empresa': 'Alfa', 'valor': 10.5, 'data': '2025-03-01'},
+        {'company_code': '100', 'company_name': 'Alfa', 'amount': '1.234,50', 'expense_date': '02/03/2025'},
+        {'code': '200', 'name': 'Beta', 'value': 3},
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 3
+    assert db.get_expense_totals_by_company() == pytest.approx({'100': 1245.0, '200': 3.0})
+    # O gasto da empresa passa a ser a soma dos lançamentos
+    assert db.get_company_adjustment('100')['spent_value'] == pytest.approx(1245.0)
+
+
+def test_json_com_linhas_invalidas_nao_grava_nada(client, db):
+    response = client.post('/api/expenses/bulk', json=[
+        {'codigo': '100', 'empresa': 'Alfa', 'valor': 10},
+        {'codigo': '', 'empresa': 'Sem código', 'valor': 1},
+        {'codigo': '300', 'valor': 1},
+        {'codigo': '100', 'empresa': 'Alfa', 'valor': 'dez'},
+        {'codigo': '100', 'empresa': 'Alfa', 'valor': 1, 'data': '31/02/2025'},
+        'não é objeto',
+    ])
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['success'] is False
+    assert body['error_count'] == 5
+    assert [error['row'] for error in body['errors']] == [2, 3, 4, 5, 6]
+    assert db.get_expenses() == []
+
+
+def test_json_sem_lista(client):
+    assert client.post('/api/expenses/bulk', json={'foo': 1}).status_code == 400
+
+
+def test_csv_valido_com_ponto_e_virgula(client, db):
+    text = ('\ufeffCódigo;Empresa;Valor;Data;Descrição\n'
+            '100;Alfa;"1.000,00";01/03/2025;Nota 1\n'
+            '\n'
+            '200;Beta;2,5;2025-03-02;Nota 2\n')
+    response = post_csv(client, text)
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 2
+    assert {e['description'] for e in db.get_expenses()} == {'Nota 1', 'Nota 2'}
+
+
+def test_csv_com_linhas_invalidas_nao_grava_nada(client, db):
+    text = ('codigo,empresa,valor\n'
+            '100,Alfa,10\n'
+            '100,Alfa,abc\n'
+            ',Beta,1\n')
+    response = post_csv(client, text)
+    assert response.status_code == 400
+    assert [error['row'] for error in response.get_json()['errors']] == [2, 3]
+    assert db.get_expenses() == []
+
+
+def test_arquivo_ilegivel(client, db):
+    data = {'file': (io.BytesIO(b'nao e um xlsx'), 'lancamentos.xlsx')}
+    response = client.post('/api/expenses/bulk', data=data, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Arquivo invalido'
+
+    assert post_csv(client, 'codigo,valor\n', 'lancamentos.txt').status_code == 400
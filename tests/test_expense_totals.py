@@ -0,0 +1,56 @@
+"""
+Totais de lançamentos mantidos por triggers: iguais à soma da tabela expenses
+"""
+
+import pytest
+
+
+def add(db, code, amount):
+    assert db.add_expense(code, f'Empresa {code}', amount, expense_date='2025-03-01')
+
+
+def expense_ids(db, code):
+    return [expense['id'] for expense in db.get_expenses(code)]
+
+
+def assert_consistent(db, totals):
+    assert db.check_expense_totals() == []
+    # Empresas sem lançamentos não aparecem nos totais
+    assert db.get_expense_totals_by_company() == pytest.approx({c: t for c, t in totals.items() if t})
+    assert db.get_total_expenses() == pytest.approx(sum(totals.values()))
+    for code, total in totals.items():
+        assert db.get_expenses_by_company(code) == pytest.approx(total)
+
+
+def test_insercao_alteracao_e_exclusao(db):
+    add(db, '100', 10.5)
+    add(db, '100', 4.5)
+    add(db, '200', 7.0)
+    assert_consistent(db, {'100': 15.0, '200': 7.0})
+    assert db.get_expense_counts_by_company() == {'100': 2, '200': 1}
+
+    first, second = sorted(expense_ids(db, '100'))
+    with db.get_connection() as conn:
+        conn.execute('UPDATE expenses SET amount = 20.0 WHERE id = ?', (first,))
+    assert_consistent(db, {'100': 24.5, '200': 7.0})
+
+    # Lançamento movido para outra empresa
+    with db.get_connection() as conn:
+        conn.execute("UPDATE expenses SET company_code = '200' WHERE id = ?", (second,))
+    assert_consistent(db, {'100': 20.0, '200': 11.5})
+
+    assert db.delete_expense(first)
+    assert_consistent(db, {'100': 0.0, '200': 11.5})
+    assert db.get_expense_counts_by_company().get('100', 0) == 0
+
+    for expense_id in expense_ids(db, '200'):
+        assert db.delete_expense(expense_id)
+    assert db.check_expense_totals() == []
+    assert db.get_total_expenses() == 0
+
+
+def test_importacao_em_lote(db):
+    rows = [(code, f'Empresa {code}', 'Lote', amount, '2025-03-01', '', '', 'teste')
+            for code, amount in [('100', 0.1), ('100', 0.2), ('300', 1.25)] * 50]
+    assert db.add_expenses_bulk(rows) == 150
+    assert_consistent(db, {'100': 15.0, '300': 62.5})
@@ -0,0 +1,62 @@
+"""
+Paginação por chave de /api/expenses: cursor de ida e volta, filtros e parâmetros inválidos
+"""
+
+import base64
+
+import pytest
+
+
+@pytest.fixture
+def expenses(db):
+    # Datas repetidas: o id desempata a ordem dentro do mesmo dia
+    for i, day in enumerate(['01', '02', '02', '02', '03', '05', '05']):
+        assert db.add_expense('100', 'Alfa', 10.0 + i, expense_date=f'2025-03-{day}')
+    db.add_expense('200', 'Beta', 1.0, expense_date='2025-03-04')
+    return db.get_expenses('100')
+
+
+def pages(client, query):
+    ids, cursor, count = [], None, 0
+    while True:
+        url = f'/api/expenses?{query}' + (f'&after={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        ids += [expense['id'] for expense in body['expenses']]
+        count += 1
+        cursor = body['next']
+        if cursor is None:
+            return ids, count
+
+
+def test_percorre_todas_as_paginas(client, expenses):
+    ids, count = pages(client, 'company_code=100&limit=3')
+    assert ids == [expense['id'] for expense in expenses]
+    assert count == 3
+
+
+def test_ultima_pagina_cheia_nao_tem_proxima(client, expenses):
+    ids, count = pages(client, 'company_code=100&limit=7')
+    assert len(ids) == 7 and count == 1
+
+
+def test_filtro_por_data(client, expenses):
+    ids, _ = pages(client, 'company_code=100&limit=2&date_from=2025-03-02&date_to=2025-03-03')
+    assert ids == [e['id'] for e in expenses if '2025-03-02' <= e['expense_date'] <= '2025-03-03']
+
+
+def test_sem_limit_lista_completa(client, expenses):
+    body = client.get('/api/expenses').get_json()
+    assert isinstance(body, list) and len(body) == 8
+
+
+@pytest.mark.parametrize('query', [
+    'limit=abc',
+    'limit=2&after=%%%',
+    'limit=2&after=' + base64.urlsafe_b64encode(b'2025-03-02').decode(),
+    'limit=2&after=' + base64.urlsafe_b64encode(b'2025-03-02|x').decode(),
+    'limit=2&after=' + base64.urlsafe_b64encode(b'\xff\xfe|1').decode(),
+])
+def test_parametros_invalidos(client, expenses, query):
+    response = client.get(f'/api/expenses?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
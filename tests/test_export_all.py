@@ -0,0 +1,94 @@
+"""
+Exportação consolidada: mesmo arquivo em série e em paralelo, gerado uma vez por versão
+"""
+
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+
+import export_excel
+from export_excel import ExcelExporter
+
+COMPANIES = [
+    {'code': str(100 + i), 'name': f'Empresa {i} / Serviços', 'status': status,
+     'contract_value': 1000.0 * (i + 1), 'spent_value': 100.0 * i, 'percentage': 10.0 * i / (i + 1)}
+    for i, status in enumerate(['ok', 'warning', 'critical', 'ok', 'ok'])
+]
+# Nomes que viram a mesma aba depois de cortados em 31 caracteres
+COMPANIES.append(dict(COMPANIES[0], name='Nome muito comprido para caber na aba A'))
+COMPANIES.append(dict(COMPANIES[0], name='Nome muito comprido para caber na aba B'))
+
+EXPENSES = {
+    '100': [{'id': 1, 'expense_date': '2025-03-01', 'description': 'Nota 1', 'amount': 10.0,
+             'category': 'Serviços', 'notes': ''}],
+    '102': [{'id': i, 'expense_date': f'2025-03-{i:02d}', 'description': f'Nota {i}', 'amount': i * 1.5,
+             'category': '', 'notes': 'obs'} for i in range(2, 20)],
+}
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 3, 10, 14, 30)
+
+
+def export(workers):
+    exporter = ExcelExporter(workers)
+    try:
+        output = exporter.export_all_companies(COMPANIES, EXPENSES, {'total_companies': len(COMPANIES)})
+        assert output is not None
+        return output.read()
+    finally:
+        exporter.close()
+
+
+def values(body):
+    wb = load_workbook(io.BytesIO(body))
+    return {ws.title: [[(cell.value, cell.number_format, cell.font.b) for cell in row] for row in ws.iter_rows()]
+            for ws in wb.worksheets}
+
+
+def test_serie_e_paralelo_iguais(monkeypatch):
+    monkeypatch.setattr(export_excel, 'datetime', FixedDatetime)
+    serial, parallel = export(1), export(2)
+
+    assert values(serial) == values(parallel)
+    with zipfile.ZipFile(io.BytesIO(serial)) as a, zipfile.ZipFile(io.BytesIO(parallel)) as b:
+        assert a.namelist() == b.namelist()
+        sheets = [name for name in a.namelist() if name.startswith('xl/worksheets/')]
+        assert len(sheets) == len(COMPANIES) + 1
+        for name in sheets:
+            assert a.read(name) == b.read(name), name
+
+    titles = list(values(serial))
+    assert titles[0] == 'Resumo'
+    assert len(set(title.lower() for title in titles)) == len(titles)
+
+
+@pytest.fixture
+def published(dashboard, db):
+    dashboard.snapshots.publish(COMPANIES[:3], {'total_companies': 3})
+    db.add_expense('100', 'Empresa 0', 10.0, expense_date='2025-03-01')
+    return dashboard
+
+
+def test_gerado_uma_vez_por_versao(published, client, monkeypatch):
+    builds = []
+    build = published.build_consolidated_export
+    monkeypatch.setattr(published, 'build_consolidated_export', lambda data: builds.append(data['version']) or build(data))
+
+    first = client.get('/api/download/companies')
+    second = client.get('/api/download/companies')
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert builds == [1]
+    assert 'Movimentos_Consolidado_v1.xlsx' in first.headers['Content-Disposition']
+    assert list(values(first.data))[:2] == ['Resumo', '100 - Empresa 0   Serviços']
+
+    published.snapshots.publish(COMPANIES[:2], {'total_companies': 2})
+    third = client.get('/api/download/companies')
+    assert builds == [1, 2]
+    assert len(values(third.data)) == 3
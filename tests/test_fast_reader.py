@@ -0,0 +1,233 @@
+"""
+Leitor rápido (FastWorkbook): mesmos valores e mesmas empresas que o openpyxl em modo read_only
+"""
+
+import zipfile
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from excel_processor import ExcelProcessor, FastWorkbook, LIQUIDACAO_SHEET, VALIDACOES_SHEET
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+# cellXfs: 0 = geral, 1 = data (formato 14), 2 = data/hora personalizada (164)
+STYLES = f'''<styleSheet xmlns="{MAIN_NS}">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>
+<fonts count="1"><font/></fonts><fills count="1"><fill><patternFill patternType="none"/></fill></fills><borders count="1"><border/></borders>
+<cellStyleXfs count="1"><xf/></cellStyleXfs>
+<cellXfs count="3"><xf numFmtId="0"/><xf numFmtId="14" applyNumberFormat="1"/><xf numFmtId="164" applyNumberFormat="1"/></cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>'''
+
+SHARED_STRINGS = [
+    '<t>Código</t>',
+    '<t>Empresa</t>',
+    '<r><t>Ri</t></r><r><rPr><b/></rPr><t>co</t></r>',     # texto formatado em partes
+    '<t>Sob_x005F_x0041_</t>',                              # escape _x005F_
+    '<t xml:space="preserve">  espaços  </t>',
+]
+
+# Aba com os casos incomuns: tipos de célula, linhas faltando, linhas e
+# células sem o atributo r e linhas além do <dimension>
+EDGE_SHEET = '''<dimension ref="A1:G8"/><sheetData>
+<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>
+<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2" t="inlineStr"><is><t>em linha</t></is></c>
+<c r="C2" t="inlineStr"><is><r><t>in</t></r><r><t>line</t></r></is></c><c r="D2" t="b"><v>1</v></c>
+<c r="E2" t="e"><v>#N/A</v></c><c r="F2" t="str"><f>A1</f><v>calculado</v></c><c r="G2"><v>12.5</v></c></row>
+<row r="4"><c r="A4" s="1"><v>45000</v></c><c r="B4" s="2"><v>45000.75</v></c><c r="C4" t="b"><v>0</v></c>
+<c r="D4"><v>7</v></c><c r="E4"><v>1E3</v></c><c r="F4" t="s"><v>3</v></c><c r="G4" t="s"><v>4</v></c></row>
+<row><c><v>1</v></c><c><v>2</v></c></row>
+<row r="6"><c r="B6"><v>3</v></c><c><v>4</v></c><c r="G6"/><c r="H6"><v>99</v></c></row>
+<row r="8"><c r="A8" t="str"><v></v></c><c r="G8"><v>-0.5</v></c></row>
+<row r="9"><c r="A9"><v>9</v></c></row>
+</sheetData>'''
+
+
+def sheet_xml(body: str) -> str:
+    return f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">{body}</worksheet>'
+
+
+def build_xlsx(path, sheets, shared_strings=(), date1904=False):
+    """
+    Monta um .xlsx mínimo à mão (o openpyxl não gera strings em linha nem omite o atributo r)
+
+    Args:
+        sheets: Lista de (nome da aba, conteúdo do <worksheet>)
+        shared_strings: Conteúdo de cada <si>
+    """
+    overrides = [
+        ('/xl/workbook.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml'),
+        ('/xl/styles.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml'),
+        ('/xl/sharedStrings.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'),
+    ] + [(f'/xl/worksheets/sheet{i}.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml')
+         for i in range(1, len(sheets) + 1)]
+    content_types = (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        + ''.join(f'<Override PartName="{part}" ContentType="{kind}"/>' for part, kind in overrides)
+        + '</Types>'
+    )
+    package_rels = (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'officeDocument" Target="xl/workbook.xml"/></Relationships>'
+    )
+    workbook = (
+        f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        + ('<workbookPr date1904="1"/>' if date1904 else '<workbookPr/>')
+        + '<sheets>'
+        + ''.join(f'<sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>' for i, (name, _) in enumerate(sheets, 1))
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + ''.join(f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                  for i in range(1, len(sheets) + 1))
+        + f'<Relationship Id="rId{len(sheets) + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+        + f'<Relationship Id="rId{len(sheets) + 2}" Type="{REL_NS}/sharedStrings" Target="sharedStrings.xml"/>'
+        + '</Relationships>'
+    )
+    strings = (
+        f'<sst xmlns="{MAIN_NS}" count="{len(shared_strings)}" uniqueCount="{len(shared_strings)}">'
+        + ''.join(f'<si>{si}</si>' for si in shared_strings)
+        + '</sst>'
+    )
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', package_rels)
+        archive.writestr('xl/workbook.xml', workbook)
+        archive.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
+        archive.writestr('xl/styles.xml', STYLES)
+        archive.writestr('xl/sharedStrings.xml', strings)
+        for i, (_, body) in enumerate(sheets, 1):
+            archive.writestr(f'xl/worksheets/sheet{i}.xml', sheet_xml(body))
+
+
+def rows_fast(path, sheet, max_col, min_row=1):
+    wb = FastWorkbook(str(path))
+    try:
+        return list(wb[sheet].iter_rows(min_row=min_row, max_col=max_col, values_only=True))
+    finally:
+        wb.close()
+
+
+def rows_openpyxl(path, sheet, max_col, min_row=1):
+    wb = load_workbook(str(path), read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(wb[sheet].iter_rows(min_row=min_row, max_col=max_col, values_only=True))
+    finally:
+        wb.close()
+
+
+def companies(path, fast):
+    processor = ExcelProcessor(use_cache=False, incremental=False, parallel_sheets=False, fast_reader=fast)
+    return processor.process_file(str(path))
+
+
+@pytest.mark.parametrize('date1904', [False, True])
+@pytest.mark.parametrize('max_col,min_row', [(7, 1), (3, 2), (8, 1)])
+def test_valores_iguais_ao_openpyxl(tmp_path, date1904, max_col, min_row):
+    path = tmp_path / 'casos.xlsx'
+    build_xlsx(path, [('Casos', EDGE_SHEET)], SHARED_STRINGS, date1904=date1904)
+
+    fast = rows_fast(path, 'Casos', max_col, min_row)
+    assert fast == rows_openpyxl(path, 'Casos', max_col, min_row)
+
+    # Conferir que os casos foram mesmo exercitados
+    if (max_col, min_row) == (7, 1):
+        assert fast[1][:4] == ('Rico', 'em linha', 'inline', True)
+        assert fast[2] == (None,) * 7
+        assert isinstance(fast[3][0], datetime)
+        assert len(fast) == 8
+
+
+def test_aba_sem_dimension(tmp_path):
+    body = EDGE_SHEET.replace('<dimension ref="A1:G8"/>', '')
+    path = tmp_path / 'sem_dimension.xlsx'
+    build_xlsx(path, [('Casos', body)], SHARED_STRINGS)
+
+    assert rows_fast(path, 'Casos', 7) == rows_openpyxl(path, 'Casos', 7)
+
+
+def write_control_openpyxl(path, date1904=False):
+    """Planilha de controle gerada pelo openpyxl (strings compartilhadas, datas, buracos)"""
+    wb = Workbook()
+    if date1904:
+        wb.epoch = CALENDAR_MAC_1904
+    ws = wb.active
+    ws.title = VALIDACOES_SHEET
+    ws.append(['Código', 'Empresa', 'C', 'D', 'E', 'F', 'Valor'])
+    ws.append(['100', 'Alfa Ltda', None, None, None, None, 1000.5])
+    ws.append([200, 'Beta S/A', datetime(2025, 1, 2), None, None, None, 2000])
+    ws.append([None, None, None, None, None, None, None])
+    ws.append(['300', 'Gama', True, None, None, None, '#N/A'])
+    ws.append(['400', 'Delta', None, None, None, None, 0])
+    ws.append(['500', 'Épsilon', None, None, None, None, 5e3])
+    ws.cell(row=20, column=1, value='600')
+    ws.cell(row=20, column=2, value='Zeta')
+    ws.cell(row=20, column=7, value=600)
+
+    ws = wb.create_sheet(LIQUIDACAO_SHEET)
+    ws.append(['Data', 'Código', 'C', 'D', 'E', 'F', 'Valor'])
+    ws.append([datetime(2025, 3, 1), '100', None, None, None, None, 10.25])
+    ws.append([datetime(2025, 3, 2), 200, None, None, None, None, 20])
+    ws.append([None, '100', None, None, None, None, 'texto'])
+    ws.append([None, '500', None, None, None, None, 1.5])
+    ws.append([None, '600', None, None, None, None, False])
+    ws.cell(row=15, column=2, value='600')
+    ws.cell(row=15, column=7, value=60)
+    wb.save(path)
+
+
+# Planilha de controle feita à mão: strings em linha, texto formatado,
+# linhas/células sem r e linha além do <dimension>
+CONTROL_VALIDACOES = '''<dimension ref="A1:G6"/><sheetData>
+<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>
+<row r="2"><c r="A2" t="inlineStr"><is><t>100</t></is></c><c r="B2" t="s"><v>2</v></c><c r="G2"><v>1000</v></c></row>
+<row><c t="inlineStr"><is><t>200</t></is></c><c t="inlineStr"><is><r><t>Be</t></r><r><t>ta</t></r></is></c>
+<c/><c/><c/><c/><c><v>2000</v></c></row>
+<row r="5"><c r="A5"><v>300</v></c><c r="B5" t="s"><v>3</v></c><c r="G5" t="str"><v>3000</v></c></row>
+<row r="6"><c r="A6" t="s"><v>4</v></c><c r="B6" t="inlineStr"><is><t>Delta</t></is></c><c r="G6"><v>4E3</v></c></row>
+<row r="7"><c r="A7"><v>700</v></c><c r="B7" t="inlineStr"><is><t>Fora</t></is></c><c r="G7"><v>7</v></c></row>
+</sheetData>'''
+
+CONTROL_LIQUIDACAO = '''<sheetData>
+<row r="1"><c r="B1" t="s"><v>0</v></c></row>
+<row r="2"><c r="A2" s="1"><v>45000</v></c><c r="B2" t="inlineStr"><is><t>100</t></is></c><c r="G2"><v>10.5</v></c></row>
+<row><c/><c><v>200</v></c><c/><c/><c/><c/><c><v>20</v></c></row>
+<row r="6"><c r="B6" t="s"><v>4</v></c><c r="G6"><v>1.25</v></c></row>
+<row r="7"><c r="B7" t="inlineStr"><is><t>100</t></is></c><c r="G7" t="b"><v>1</v></c></row>
+<row r="8"><c r="B8" t="inlineStr"><is><t>700</t></is></c><c r="G8"><v>5</v></c></row>
+</sheetData>'''
+
+
+@pytest.mark.parametrize('date1904', [False, True])
+def test_empresas_iguais_planilha_openpyxl(tmp_path, date1904):
+    path = tmp_path / 'controle.xlsx'
+    write_control_openpyxl(path, date1904)
+
+    fast = companies(path, fast=True)
+    assert fast == companies(path, fast=False)
+    assert {company['code'] for company in fast} == {'100', '200', '500', '600'}
+
+
+def test_empresas_iguais_planilha_feita_a_mao(tmp_path):
+    path = tmp_path / 'controle.xlsx'
+    strings = ['<t>Código</t>', '<t>Empresa</t>', '<r><t>Al</t></r><r><t>fa</t></r>', '<t>Gama</t>', '<t>400</t>']
+    build_xlsx(path, [(VALIDACOES_SHEET, CONTROL_VALIDACOES), (LIQUIDACAO_SHEET, CONTROL_LIQUIDACAO)], strings)
+
+    # O arquivo precisa abrir no leitor rápido (sem cair para o openpyxl)
+    FastWorkbook(str(path)).close()
+
+    fast = companies(path, fast=True)
+    assert fast == companies(path, fast=False)
+    assert [(company['code'], company['spent_value']) for company in fast] == [
+        # Em G7, VERDADEIRO conta como 1 (bool é int), nos dois leitores
+        ('100', 11.5), ('200', 20), ('400', 1.25)
+    ]
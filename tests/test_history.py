@@ -0,0 +1,47 @@
+"""
+Série do histórico: um ponto por intervalo, no máximo HISTORY_MAX_POINTS
+"""
+
+from datetime import datetime
+
+import config
+from history import HistoryRecorder
+
+START = int(datetime(2025, 3, 1).timestamp())
+HOUR = 3600
+
+
+def test_intervalo_multiplo_do_step(db):
+    end = START + 10 * HOUR
+    db.add_history([('100', START, 1000.0, 10.0, 1.0),
+                    ('100', START + 5 * HOUR, 1000.0, 50.0, 5.0),
+                    ('100', end, 1000.0, 90.0, 9.0)])
+
+    series = HistoryRecorder(db).series('100', START, end, HOUR)
+    points = series['points']
+
+    assert len(points) == 10
+    times = [point['time'] for point in points]
+    assert times == [datetime.fromtimestamp(START + (i + 1) * HOUR).isoformat() for i in range(10)]
+    # O ponto gravado em ``end`` entra no último intervalo
+    assert [point['spent_value'] for point in points] == [10.0] * 5 + [50.0] * 4 + [90.0]
+
+
+def test_intervalo_nao_multiplo(db):
+    end = START + 10 * HOUR + 1800
+    db.add_history([('100', START, 1000.0, 10.0, 1.0)])
+
+    points = HistoryRecorder(db).series('100', START, end, HOUR)['points']
+    assert len(points) == 11
+    assert points[-1]['time'] == datetime.fromtimestamp(end).isoformat()
+
+
+def test_limite_de_pontos(db, monkeypatch):
+    monkeypatch.setattr(config, 'HISTORY_MAX_POINTS', 24)
+    end = START + 48 * HOUR
+    db.add_history([('100', START, 1000.0, 10.0, 1.0)])
+
+    series = HistoryRecorder(db).series('100', START, end, 60)
+    assert series['step'] == 2 * HOUR
+    assert len(series['points']) == 24
+    assert len({point['time'] for point in series['points']}) == 24
@@ -0,0 +1,127 @@
+"""
+Soma incremental da LIQUIDAÇÃO: mesmo resultado da soma completa em cada tipo de mudança
+"""
+
+from openpyxl import Workbook
+
+import excel_processor
+from excel_processor import ExcelProcessor, LIQUIDACAO_SHEET, VALIDACOES_SHEET
+
+COMPANIES = [('100', 'Alfa', 1000.0), ('200', 'Beta', 2000.0), ('300', 'Gama', 3000.0)]
+
+
+def write_workbook(path, liquidacao):
+    """Workbook com as duas abas; ``liquidacao`` é a lista de (código, valor)"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = VALIDACOES_SHEET
+    ws.append(['Código', 'Empresa', 'C', 'D', 'E', 'F', 'Valor'])
+    for code, name, value in COMPANIES:
+        ws.append([code, name, None, None, None, None, value])
+
+    ws = wb.create_sheet(LIQUIDACAO_SHEET)
+    ws.append(['A', 'Código', 'C', 'D', 'E', 'F', 'Valor'])
+    for code, value in liquidacao:
+        ws.append([None, code, None, None, None, None, value])
+    wb.save(path)
+
+
+def spent(processor, path):
+    return {company['code']: company['spent_value'] for company in processor.process_file(str(path))}
+
+
+def full_sum(path):
+    return spent(ExcelProcessor(use_cache=False, incremental=False, parallel_sheets=False), path)
+
+
+def make_processor():
+    return ExcelProcessor(use_cache=False, incremental=True, parallel_sheets=False)
+
+
+def test_sem_linhas_de_dados(tmp_path):
+    path = tmp_path / 'controle.xlsx'
+    write_workbook(path, [])
+    processor = make_processor()
+
+    # Primeira leitura e releitura sem mudanças: empresas com gasto zero, sem erro
+    # (um erro na soma descarta o estado incremental)
+    for _ in range(2):
+        assert spent(processor, path) == {'100': 0, '200': 0, '300': 0}
+        assert processor._liquidacao_state['count'] == 0
+
+    write_workbook(path, [('100', 10.0)])
+    assert spent(processor, path) == full_sum(path)
+
+
+def test_mudancas_iguais_a_soma_completa(tmp_path):
+    path = tmp_path / 'controle.xlsx'
+    rows = [('100', 10.0), ('200', 20.0), ('100', 5.5)]
+    processor = make_processor()
+
+    steps = [
+        rows,                                   # primeira leitura
+        rows,                                   # inalterado
+        rows + [('300', 7.0), ('200', 1.0)],    # linhas acrescentadas
+        [('100', 99.0)] + rows[1:],             # linha anterior alterada
+        rows[:1],                               # linhas removidas do final
+        rows[:1] + [('', 50.0), ('200', 0)],    # linhas vazias acrescentadas
+    ]
+    for step in steps:
+        write_workbook(path, step)
+        assert spent(processor, path) == full_sum(path)
+        assert processor._liquidacao_state['count'] == len(step)
+
+
+def test_outro_arquivo_refaz_a_soma(tmp_path):
+    first, second = tmp_path / 'a.xlsx', tmp_path / 'b.xlsx'
+    write_workbook(first, [('100', 10.0)])
+    write_workbook(second, [('100', 10.0), ('200', 3.0)])
+    processor = make_processor()
+
+    assert spent(processor, first) == full_sum(first)
+    assert spent(processor, second) == full_sum(second)
+
+
+def test_acrescimo_soma_so_as_linhas_novas(monkeypatch):
+    rows = [(str(100 * (i % 3 + 1)), float(i)) for i in range(1000)]
+    processor = make_processor()
+    processor._apply_liquidacao(rows, 'controle.xlsx')
+
+    summed = []
+    add_rows = ExcelProcessor._add_liquidacao_rows
+    monkeypatch.setattr(ExcelProcessor, '_add_liquidacao_rows',
+                        staticmethod(lambda gastos, tail: summed.append(len(tail)) or add_rows(gastos, tail)))
+
+    grown = rows + [('200', 5.0), ('300', 1.0)]
+    processor._apply_liquidacao(grown, 'controle.xlsx')
+    assert summed == [2]
+
+    expected = {}
+    add_rows(expected, grown)
+    assert processor._liquidacao_state['totals'] == expected
+
+    # Linha anterior alterada: soma completa sobre as mesmas linhas, sem reler a aba
+    summed.clear()
+    processor._apply_liquidacao(iter([('100', 1.0)] + grown[1:]), 'controle.xlsx')
+    assert summed == [len(grown)]
+
+
+def test_muitos_acrescimos(monkeypatch):
+    monkeypatch.setattr(excel_processor, 'LIQUIDACAO_MAX_SEGMENTS', 4)
+    processor = make_processor()
+    rows = []
+    for i in range(10):
+        rows = rows + [(str(100 * (i % 3 + 1)), float(i + 1))] * (i % 2)
+        processor._apply_liquidacao(list(rows), 'controle.xlsx')
+        assert len(processor._liquidacao_state['bounds']) <= 4
+
+        expected = {}
+        ExcelProcessor._add_liquidacao_rows(expected, rows)
+        assert processor._liquidacao_state['totals'] == expected
+
+    # Linha do meio alterada depois de vários trechos: soma completa
+    rows[2] = ('300', 1000.0)
+    processor._apply_liquidacao(list(rows), 'controle.xlsx')
+    expected = {}
+    ExcelProcessor._add_liquidacao_rows(expected, rows)
+    assert processor._liquidacao_state['totals'] == expected
@@ -0,0 +1,88 @@
+"""
+Salas de inscrição: validação e roteamento de cada publicação só para as salas afetadas
+"""
+
+import pytest
+
+import config
+from rooms import RoomRouter, parse_rooms
+
+
+def company(code, status, spent=0.0):
+    return {'code': code, 'name': f'Empresa {code}', 'status': status, 'spent_value': spent}
+
+
+def delta(version, added=(), changed=(), removed=()):
+    return {'version': version, 'base_version': version - 1, 'added': list(added),
+            'changed': list(changed), 'removed': list(removed), 'statistics': {'total': 1},
+            'last_update': '2025-03-01T10:00:00', 'file_path': 'controle.xlsm'}
+
+
+def by_room(events):
+    return {room: (event, payload) for event, payload, room in events}
+
+
+def test_parse_rooms():
+    assert parse_rooms(['all']) == {'all'}
+    assert parse_rooms(['company:100', 'status:critical']) == {'company:100', 'status:critical', 'summary'}
+    for rooms in ([], 'all', ['company:'], ['status:unknown'], ['outra'], [1],
+                  ['company:%d' % i for i in range(config.SUBSCRIPTION_MAX_ROOMS + 1)]):
+        with pytest.raises(ValueError):
+            parse_rooms(rooms)
+
+
+def test_so_salas_com_clientes():
+    router = RoomRouter()
+    assert router.route(delta(1, added=[company('100', 'ok')])) == []
+
+    router.subscribe('a', {'company:100', 'summary'})
+    events = by_room(router.route(delta(2, changed=[company('100', 'ok', 5.0), company('200', 'ok')])))
+    assert set(events) == {'company:100', 'summary'}
+
+    event, payload = events['company:100']
+    assert event == 'companies'
+    assert payload == {'changed': [company('100', 'ok', 5.0)], 'removed': [], 'version': 2}
+    assert events['summary'][0] == 'summary'
+    assert events['summary'][1]['version'] == 2
+
+
+def test_mudanca_de_status_avisa_a_sala_anterior():
+    router = RoomRouter()
+    router.seed([company('100', 'ok')])
+    router.subscribe('a', {'status:ok', 'summary'})
+    router.subscribe('b', {'status:critical', 'summary'})
+    router.subscribe('c', {'all'})
+
+    events = router.route(delta(2, changed=[company('100', 'critical', 99.0)]))
+    rooms = by_room(events)
+    assert rooms['status:ok'][1]['removed'] == ['100']
+    assert rooms['status:critical'][1]['changed'] == [company('100', 'critical', 99.0)]
+    assert rooms['all'][0] == 'delta'
+    # Empresas antes do resumo, delta completo por último
+    assert [event for event, _, _ in events][-2:] == ['summary', 'delta']
+
+    events = by_room(router.route(delta(3, removed=['100'])))
+    assert events['status:critical'][1]['removed'] == ['100']
+    assert 'status:ok' not in events
+
+
+def test_troca_de_salas_e_desconexao():
+    router = RoomRouter()
+    assert router.subscribe('a', {'company:1', 'summary'}) == ({'company:1', 'summary'}, set())
+    router.subscribe('b', {'summary'})
+    joined, left = router.subscribe('a', {'company:2', 'summary'})
+    assert (joined, left) == ({'company:2'}, {'company:1'})
+    assert router.members() == {'company:2': 1, 'summary': 2}
+
+    router.unsubscribe('a')
+    assert router.members() == {'summary': 1}
+    assert router.rooms_of('a') == {'all'}
+
+
+def test_snapshot_filtrado_pelas_salas():
+    router = RoomRouter()
+    data = {'version': 4, 'companies': [company('100', 'ok'), company('200', 'critical'), company('300', 'ok')]}
+    filtered = router.snapshot_for({'company:300', 'status:critical', 'summary'}, data)
+    assert [c['code'] for c in filtered['companies']] == ['200', '300']
+    assert filtered['rooms'] == ['company:300', 'status:critical', 'summary']
+    assert router.snapshot_for({'all'}, data)['companies'] == data['companies']
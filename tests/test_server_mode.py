@@ -0,0 +1,76 @@
+"""
+Modo do servidor: escolha do async_mode e chamadas bloqueantes fora do laço de eventos
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from server_mode import resolve_async_mode, is_cooperative, run_blocking
+
+# Os subprocessos importam server_mode da raiz do repositório
+ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+def test_threading_explicito():
+    assert resolve_async_mode('threading') == 'threading'
+    assert not is_cooperative('threading')
+    assert run_blocking('threading', threading.get_ident) == threading.get_ident()
+
+
+def test_auto_usa_gevent():
+    pytest.importorskip('gevent')
+    assert resolve_async_mode('auto') == 'gevent'
+    assert is_cooperative('gevent')
+
+
+def test_gevent_nao_trava_o_laco():
+    gevent = pytest.importorskip('gevent')
+    ticks = []
+
+    def tick():
+        while True:
+            ticks.append(time.monotonic())
+            gevent.sleep(0.01)
+
+    ticker = gevent.spawn(tick)
+    try:
+        gevent.sleep(0)
+        # time.sleep sem monkey patch bloqueia a thread: só não trava o laço fora dela
+        assert run_blocking('gevent', lambda: time.sleep(0.2) or threading.get_ident()) != threading.get_ident()
+    finally:
+        ticker.kill()
+    assert len(ticks) > 5
+
+
+def test_eventlet_nao_trava_o_laco():
+    pytest.importorskip('eventlet')
+    code = (
+        "import threading, time, eventlet\n"
+        "from server_mode import run_blocking\n"
+        "ticks = []\n"
+        "def tick():\n"
+        "    while True:\n"
+        "        ticks.append(1); eventlet.sleep(0.01)\n"
+        "eventlet.spawn(tick); eventlet.sleep(0)\n"
+        "assert run_blocking('eventlet', lambda: time.sleep(0.2) or threading.get_ident()) != threading.get_ident()\n"
+        "assert len(ticks) > 5\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+
+
+def test_monkey_patch_gevent():
+    pytest.importorskip('gevent')
+    # Em outro processo: o monkey patch vale para o processo inteiro
+    code = (
+        "from server_mode import monkey_patch\n"
+        "monkey_patch('gevent')\n"
+        "import socket, gevent.socket\n"
+        "assert socket.socket is gevent.socket.socket\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+
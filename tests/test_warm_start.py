@@ -0,0 +1,63 @@
+"""
+Início com a última versão gravada: servida antes da primeira leitura, sem reler planilha igual
+"""
+
+from openpyxl import Workbook
+
+from excel_processor import ExcelProcessor, LIQUIDACAO_SHEET, VALIDACOES_SHEET
+from rooms import RoomRouter
+from snapshot import SnapshotStore
+from workbook_set import WorkbookSet
+
+
+def write_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = VALIDACOES_SHEET
+    ws.append(['Código', 'Empresa', 'C', 'D', 'E', 'F', 'Valor'])
+    ws.append(['100', 'Alfa', None, None, None, None, 1000.0])
+    ws.append(['200', 'Beta', None, None, None, None, 2000.0])
+    ws = wb.create_sheet(LIQUIDACAO_SHEET)
+    ws.append(['A', 'Código', 'C', 'D', 'E', 'F', 'Valor'])
+    ws.append([None, '100', None, None, None, None, 250.0])
+    wb.save(path)
+
+
+def restart(dashboard, monkeypatch):
+    """Estado em memória de um servidor recém-iniciado (o banco continua o mesmo)"""
+    store = SnapshotStore()
+    monkeypatch.setattr(dashboard, 'snapshots', store)
+    monkeypatch.setattr(dashboard, 'current_data', store.data)
+    monkeypatch.setattr(dashboard, 'router', RoomRouter())
+    monkeypatch.setattr(dashboard, 'workbooks', WorkbookSet())
+
+
+def test_sem_versao_gravada(dashboard):
+    assert dashboard.warm_start() is False
+    assert dashboard.snapshots.version == 0
+
+
+def test_restaura_versao_e_nao_rele_planilha_igual(dashboard, client, monkeypatch, tmp_path):
+    path = tmp_path / 'controle.xlsx'
+    write_workbook(path)
+    files = {'principal': str(path)}
+    dashboard.refresh_current_data(files)
+    before = client.get('/api/data').get_json()
+    assert before['version'] == 1
+
+    restart(dashboard, monkeypatch)
+    assert dashboard.warm_start() is True
+
+    after = client.get('/api/data').get_json()
+    assert after['version'] == 1
+    assert after['companies'] == before['companies']
+    assert after['statistics'] == before['statistics']
+    assert after['last_update'] == before['last_update']
+
+    # Mesma identidade de arquivo: a planilha não é relida, e a numeração continua
+    parses = []
+    monkeypatch.setattr(ExcelProcessor, 'process_table', lambda *args, **kwargs: parses.append(args))
+    delta = dashboard.refresh_current_data(files)
+    assert parses == []
+    assert delta['version'] == 2
+    assert delta['changed'] == delta['added'] == delta['removed'] == []
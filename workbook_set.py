@@ -0,0 +1,165 @@
+"""
+Leitura de várias planilhas de controle (uma por departamento) em paralelo
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+import config
+from excel_processor import ExcelProcessor, CompanyTable, EXCEL_PARSES
+
+logger = logging.getLogger(__name__)
+
+
+def parse_workbook(file_path: str, streaming: bool = True) -> CompanyTable:
+    """Lê uma planilha do zero (executado nos processos do pool)"""
+    # Já roda em um processo do pool: sem abrir outro pool para as abas
+    processor = ExcelProcessor(streaming=streaming, use_cache=False, incremental=False,
+                               parallel_sheets=False)
+    return processor.process_table(file_path)
+
+
+class WorkbookSet:
+    """Mantém o resultado de cada planilha e junta todas em uma única tabela"""
+
+    def __init__(self, workers: int = config.EXCEL_WORKERS, streaming: bool = config.EXCEL_STREAMING,
+                 isolate: bool = False):
+        """
+        Args:
+            workers: Processos para ler planilhas alteradas ao mesmo tempo
+                (0 ou 1 = lê no próprio processo)
+            streaming: Abre os workbooks em modo somente leitura
+            isolate: Lê e calcula o hash das planilhas sempre no pool, mesmo
+                uma única (servidor cooperativo: no próprio processo travaria os clientes)
+        """
+        self.workers = workers
+        self.streaming = streaming
+        self.isolate = isolate
+        # Processador por fonte (mantém cache e soma incremental da LIQUIDAÇÃO)
+        self._processors: Dict[str, ExcelProcessor] = {}
+        # Fonte -> (identidade do arquivo, tabela lida)
+        self._results: Dict[str, Tuple[Optional[Tuple], CompanyTable]] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: o servidor tem threads, e fork com threads pode travar o filho
+            self._pool = ProcessPoolExecutor(max_workers=max(1, self.workers),
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _processor(self, source: str) -> ExcelProcessor:
+        processor = self._processors.get(source)
+        if processor is None:
+            processor = self._processors[source] = ExcelProcessor(streaming=self.streaming)
+        return processor
+
+    def _identities(self, paths: List[str]) -> List[Optional[Tuple]]:
+        """Identidade (com hash do conteúdo) de cada arquivo; no modo isolado, calculada no pool"""
+        if self.isolate and paths:
+            return list(self._get_pool().map(ExcelProcessor.file_identity, paths))
+        return [ExcelProcessor.file_identity(path) for path in paths]
+
+    def update(self, files: Dict[str, str]) -> CompanyTable:
+        """
+        Relê só as planilhas que mudaram e retorna a tabela combinada
+
+        Args:
+            files: Nome da fonte -> caminho da planilha atual
+
+        Returns:
+            CompanyTable com as empresas de todas as fontes
+        """
+        # Fontes sem arquivo deixam de contribuir
+        for source in list(self._results):
+            if source not in files:
+                del self._results[source]
+                self._processors.pop(source, None)
+
+        changed: List[Tuple[str, str, Optional[Tuple]]] = []
+        identities = self._identities(list(files.values()))
+        for (source, file_path), identity in zip(files.items(), identities):
+            previous = self._results.get(source)
+            if identity is None or previous is None or previous[0] != identity:
+                changed.append((source, file_path, identity))
+
+        if changed and (self.isolate or (len(changed) > 1 and self.workers > 1)):
+            # Planilhas alteradas lidas no pool, uma por processo
+            logger.info(f"Lendo {len(changed)} planilha(s) no pool")
+            futures = [self._get_pool().submit(parse_workbook, file_path, self.streaming)
+                       for _, file_path, _ in changed]
+            for (source, file_path, identity), future in zip(changed, futures):
+                try:
+                    table = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao processar {file_path}: {e}")
+                    table = CompanyTable()
+                EXCEL_PARSES.inc()
+                self._store(source, identity, table)
+        else:
+            for source, file_path, identity in changed:
+                # Identidade já calculada acima: o arquivo é lido para o hash uma só vez
+                self._store(source, identity, self._processor(source).process_table(file_path, identity))
+
+        return self.merge([source for source in files if source in self._results])
+
+    def _store(self, source: str, identity: Optional[Tuple], table: CompanyTable) -> None:
+        # Leitura sem empresas (erro ou arquivo incompleto) é tentada de novo na próxima vez
+        self._results[source] = (identity if len(table) else None, table)
+
+    def merge(self, sources: List[str]) -> CompanyTable:
+        """
+        Junta as tabelas das fontes somando contrato e gasto das empresas repetidas
+
+        Com uma única fonte a tabela é devolvida como está; com várias, cada
+        empresa traz em ``sources`` os valores de cada planilha.
+        """
+        if len(sources) == 1:
+            return self._results[sources[0]][1].copy()
+
+        merged: Dict[str, List[Any]] = {}
+        for source in sources:
+            table = self._results[source][1]
+            for code, name, contract, spent in zip(table.codes, table.names, table.contract, table.spent):
+                entry = merged.get(code)
+                if entry is None:
+                    entry = merged[code] = [name, 0.0, 0.0, []]
+                entry[1] += contract
+                entry[2] += spent
+                entry[3].append({'source': source, 'contract_value': contract, 'spent_value': spent})
+
+        rows = sorted(merged.items(), key=lambda item: item[1][0])
+        table = CompanyTable((code for code, _ in rows), (entry[0] for _, entry in rows),
+                             (entry[1] for _, entry in rows), (entry[2] for _, entry in rows))
+        table.sources = [entry[3] for _, entry in rows]
+        return table
+
+    def export_state(self) -> Dict[str, Any]:
+        """Identidade do arquivo e leitura (sem ajustes) de cada fonte, em formato JSON"""
+        return {
+            source: {'identity': list(identity), 'table': table.to_columns()}
+            for source, (identity, table) in self._results.items()
+            if identity is not None
+        }
+
+    def seed(self, state: Dict[str, Any]) -> None:
+        """
+        Restaura o estado gravado por ``export_state``
+
+        Na próxima ``update``, as planilhas com a mesma identidade não são relidas.
+        """
+        for source, entry in state.items():
+            try:
+                self._results[source] = (tuple(entry['identity']), CompanyTable.from_columns(entry['table']))
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Estado gravado da fonte '{source}' ignorado: {e}")
+
+    def close(self) -> None:
+        """Encerra os processos do pool"""
+        for processor in self._processors.values():
+            processor.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None